@@ -1,63 +1,84 @@
-from logging.config import fileConfig
-from sqlalchemy import engine_from_config
-from sqlalchemy import pool
-from alembic import context
-from app.core.config import settings
-from app.models.base import BaseModel
-from app.models.usuario import Usuario
-from app.models.cliente import Cliente
-from app.models.fornecedor import Fornecedor
-from app.models.pagamento import Pagamento
-
-# this is the Alembic Config object, which provides
-# access to the values within the .ini file in use.
-config = context.config
-
-# Interpret the config file for Python logging.
-# This line sets up loggers basically.
-if config.config_file_name is not None:
-    fileConfig(config.config_file_name)
-
-# add your model's MetaData object here
-# for 'autogenerate' support
-target_metadata = BaseModel.metadata
-
-def get_url():
-    return str(settings.SQLALCHEMY_DATABASE_URI)
-
-def run_migrations_offline() -> None:
-    """Run migrations in 'offline' mode."""
-    url = get_url()
-    context.configure(
-        url=url,
-        target_metadata=target_metadata,
-        literal_binds=True,
-        dialect_opts={"paramstyle": "named"},
-    )
-
-    with context.begin_transaction():
-        context.run_migrations()
-
-def run_migrations_online() -> None:
-    """Run migrations in 'online' mode."""
-    configuration = config.get_section(config.config_ini_section)
-    configuration["sqlalchemy.url"] = get_url()
-    connectable = engine_from_config(
-        configuration,
-        prefix="sqlalchemy.",
-        poolclass=pool.NullPool,
-    )
-
-    with connectable.connect() as connection:
-        context.configure(
-            connection=connection,
-            target_metadata=target_metadata
-        )
-
-        with context.begin_transaction():
-            context.run_migrations()
-
-if context.is_offline_mode():
-    run_migrations_offline()
-else:
+from logging.config import fileConfig
+from sqlalchemy import engine_from_config
+from sqlalchemy import pool
+from alembic import context
+from app.core.config import settings
+from app.models.base import BaseModel
+from app.models.usuario import Usuario
+from app.models.cliente import Cliente
+from app.models.fornecedor import Fornecedor
+from app.models.pagamento import Pagamento
+from app.models.tarefa import ExecucaoTarefa
+from app.models.idempotencia import ChaveIdempotencia
+from app.models.resumo import (
+    ResumoPagamento,
+    ResumoPagamentoCliente,
+    ResumoPagamentoFornecedor,
+    ResumoPagamentoMes,
+)
+
+# this is the Alembic Config object, which provides
+# access to the values within the .ini file in use.
+config = context.config
+
+# Interpret the config file for Python logging.
+# This line sets up loggers basically.
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+# add your model's MetaData object here
+# for 'autogenerate' support
+target_metadata = BaseModel.metadata
+
+PARTICOES_PAGAMENTOS = ("pagamentos_ativos", "pagamentos_arquivo")
+
+def include_object(object, name, type_, reflected, compare_to):
+    # Os índices de trigramas dependem do pg_trgm e não estão nos modelos
+    if type_ == "index" and reflected and compare_to is None and name.endswith("_trgm"):
+        return False
+    # As partições de pagamentos (migração 0010) são criadas fora dos modelos
+    if type_ == "table" and reflected and compare_to is None and name.startswith(PARTICOES_PAGAMENTOS):
+        return False
+    return True
+
+def get_url():
+    return str(settings.SQLALCHEMY_DATABASE_URI)
+
+def run_migrations_offline() -> None:
+    """Run migrations in 'offline' mode."""
+    url = get_url()
+    context.configure(
+        url=url,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        include_object=include_object,
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online() -> None:
+    """Run migrations in 'online' mode."""
+    configuration = config.get_section(config.config_ini_section)
+    configuration["sqlalchemy.url"] = get_url()
+    connectable = engine_from_config(
+        configuration,
+        prefix="sqlalchemy.",
+        poolclass=pool.NullPool,
+    )
+
+    with connectable.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object,
+        )
+
+        with context.begin_transaction():
+            context.run_migrations()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
     run_migrations_online() 
\ No newline at end of file
@@ -0,0 +1,119 @@
+"""Esquema inicial (tabelas criadas originalmente por init_db)
+
+Revision ID: 0001
+Revises: 
+Create Date: 2024-03-30 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('clientes',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.Column('active', sa.Boolean(), nullable=False),
+    sa.Column('nome', sa.String(), nullable=False),
+    sa.Column('cnpj', sa.String(), nullable=False),
+    sa.Column('email', sa.String(), nullable=False),
+    sa.Column('telefone', sa.String(), nullable=True),
+    sa.Column('endereco', sa.String(), nullable=True),
+    sa.Column('cidade', sa.String(), nullable=True),
+    sa.Column('estado', sa.String(), nullable=True),
+    sa.Column('cep', sa.String(), nullable=True),
+    sa.Column('regime_tributario', sa.String(), nullable=True),
+    sa.Column('percentual_retencao', sa.Float(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_clientes_cnpj'), 'clientes', ['cnpj'], unique=True)
+    op.create_index(op.f('ix_clientes_email'), 'clientes', ['email'], unique=False)
+    op.create_index(op.f('ix_clientes_nome'), 'clientes', ['nome'], unique=False)
+    op.create_table('fornecedores',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.Column('active', sa.Boolean(), nullable=False),
+    sa.Column('nome', sa.String(), nullable=False),
+    sa.Column('cnpj', sa.String(), nullable=False),
+    sa.Column('email', sa.String(), nullable=False),
+    sa.Column('telefone', sa.String(), nullable=True),
+    sa.Column('endereco', sa.String(), nullable=True),
+    sa.Column('cidade', sa.String(), nullable=True),
+    sa.Column('estado', sa.String(), nullable=True),
+    sa.Column('cep', sa.String(), nullable=True),
+    sa.Column('categoria', sa.String(), nullable=True),
+    sa.Column('banco', sa.String(), nullable=True),
+    sa.Column('agencia', sa.String(), nullable=True),
+    sa.Column('conta', sa.String(), nullable=True),
+    sa.Column('pix', sa.String(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_fornecedores_cnpj'), 'fornecedores', ['cnpj'], unique=True)
+    op.create_index(op.f('ix_fornecedores_email'), 'fornecedores', ['email'], unique=False)
+    op.create_index(op.f('ix_fornecedores_nome'), 'fornecedores', ['nome'], unique=False)
+    op.create_table('usuarios',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.Column('active', sa.Boolean(), nullable=False),
+    sa.Column('email', sa.String(), nullable=False),
+    sa.Column('nome', sa.String(), nullable=False),
+    sa.Column('senha_hash', sa.String(), nullable=False),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('is_superuser', sa.Boolean(), nullable=False),
+    sa.Column('two_factor_enabled', sa.Boolean(), nullable=False),
+    sa.Column('two_factor_secret', sa.String(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_usuarios_email'), 'usuarios', ['email'], unique=True)
+    op.create_index(op.f('ix_usuarios_nome'), 'usuarios', ['nome'], unique=False)
+    op.create_table('pagamentos',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.Column('active', sa.Boolean(), nullable=False),
+    sa.Column('cliente_id', sa.Integer(), nullable=True),
+    sa.Column('fornecedor_id', sa.Integer(), nullable=False),
+    sa.Column('numero_nota', sa.String(), nullable=False),
+    sa.Column('data_emissao', sa.Date(), nullable=False),
+    sa.Column('data_vencimento', sa.Date(), nullable=False),
+    sa.Column('valor_total', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('valor_retencao', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('valor_liquido', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('data_pagamento', sa.Date(), nullable=True),
+    sa.Column('observacoes', sa.String(), nullable=True),
+    sa.Column('processado_por', sa.String(), nullable=True),
+    sa.Column('comprovante_url', sa.String(), nullable=True),
+    sa.ForeignKeyConstraint(['cliente_id'], ['clientes.id'], ),
+    sa.ForeignKeyConstraint(['fornecedor_id'], ['fornecedores.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_pagamentos_numero_nota'), 'pagamentos', ['numero_nota'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_pagamentos_numero_nota'), table_name='pagamentos')
+    op.drop_table('pagamentos')
+    op.drop_index(op.f('ix_usuarios_nome'), table_name='usuarios')
+    op.drop_index(op.f('ix_usuarios_email'), table_name='usuarios')
+    op.drop_table('usuarios')
+    op.drop_index(op.f('ix_fornecedores_nome'), table_name='fornecedores')
+    op.drop_index(op.f('ix_fornecedores_email'), table_name='fornecedores')
+    op.drop_index(op.f('ix_fornecedores_cnpj'), table_name='fornecedores')
+    op.drop_table('fornecedores')
+    op.drop_index(op.f('ix_clientes_nome'), table_name='clientes')
+    op.drop_index(op.f('ix_clientes_email'), table_name='clientes')
+    op.drop_index(op.f('ix_clientes_cnpj'), table_name='clientes')
+    op.drop_table('clientes')
\ No newline at end of file
@@ -0,0 +1,39 @@
+"""Índice (data_vencimento, id) para paginação por cursor de pagamentos
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2024-04-15 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY evita bloquear escritas na tabela durante a criação
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_pagamentos_data_vencimento_id',
+            'pagamentos',
+            ['data_vencimento', 'id'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_pagamentos_data_vencimento_id',
+            table_name='pagamentos',
+            postgresql_concurrently=True,
+        )
\ No newline at end of file
@@ -0,0 +1,99 @@
+"""Coluna termo_busca e índices de trigramas em clientes e fornecedores
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2024-04-22 00:00:00
+
+"""
+import re
+import unicodedata
+from typing import Optional, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+LOTE = 5000
+INDICES_TRIGRAMA = {
+    'clientes': 'ix_clientes_termo_busca_trgm',
+    'fornecedores': 'ix_fornecedores_termo_busca_trgm',
+}
+
+
+# Cópia da normalização de services.busca nesta revisão: a migração não
+# acompanha mudanças futuras do código da aplicação
+def _normalizar(texto: Optional[str]) -> str:
+    if not texto:
+        return ''
+    decomposto = unicodedata.normalize('NFKD', texto)
+    sem_acentos = ''.join(c for c in decomposto if not unicodedata.combining(c))
+    return re.sub(r'\s+', ' ', sem_acentos.casefold()).strip()
+
+
+def _montar_termo(nome: Optional[str], cnpj: Optional[str], email: Optional[str]) -> str:
+    digitos = re.sub(r'\D', '', cnpj or '')
+    return ' '.join(p for p in (_normalizar(nome), _normalizar(email), digitos) if p)
+
+
+def _preencher(conn, tabela: str) -> None:
+    t = sa.table(
+        tabela,
+        sa.column('id', sa.Integer),
+        sa.column('nome', sa.String),
+        sa.column('cnpj', sa.String),
+        sa.column('email', sa.String),
+        sa.column('termo_busca', sa.String),
+    )
+    ultimo = 0
+    while True:
+        linhas = conn.execute(
+            sa.select(t.c.id, t.c.nome, t.c.cnpj, t.c.email)
+            .where(t.c.id > ultimo)
+            .order_by(t.c.id)
+            .limit(LOTE)
+        ).all()
+        if not linhas:
+            break
+        conn.execute(
+            t.update().where(t.c.id == sa.bindparam('_id')),
+            [
+                {'_id': l.id, 'termo_busca': _montar_termo(l.nome, l.cnpj, l.email)}
+                for l in linhas
+            ],
+        )
+        ultimo = linhas[-1].id
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    for tabela in INDICES_TRIGRAMA:
+        op.add_column(tabela, sa.Column('termo_busca', sa.String(), nullable=True))
+        _preencher(conn, tabela)
+
+    if conn.dialect.name != 'postgresql':
+        return
+    disponivel = conn.execute(
+        sa.text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+    ).first()
+    if not disponivel:
+        # Sem pg_trgm a aplicação usa o índice de trigramas em memória
+        return
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    with op.get_context().autocommit_block():
+        for tabela, indice in INDICES_TRIGRAMA.items():
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {indice} ON {tabela} "
+                "USING gin (termo_busca gin_trgm_ops)"
+            )
+
+
+def downgrade() -> None:
+    for tabela, indice in INDICES_TRIGRAMA.items():
+        op.execute(f"DROP INDEX IF EXISTS {indice}")
+        op.drop_column(tabela, 'termo_busca')
\ No newline at end of file
@@ -0,0 +1,40 @@
+"""Índice parcial dos pagamentos pendentes para a fila de processamento
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2024-05-06 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_pagamentos_pendentes',
+            'pagamentos',
+            ['data_vencimento', 'id'],
+            unique=False,
+            postgresql_where=sa.text("status = 'PENDENTE'"),
+            sqlite_where=sa.text("status = 'PENDENTE'"),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_pagamentos_pendentes',
+            table_name='pagamentos',
+            postgresql_concurrently=True,
+        )
\ No newline at end of file
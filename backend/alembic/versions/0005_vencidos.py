@@ -0,0 +1,48 @@
+"""Coluna vencido em pagamentos e tabela execucoes_tarefas
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2024-05-13 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Com valor padrão constante o Postgres não reescreve a tabela; a primeira
+    # varredura, sem marca d'água, marca os pendentes já vencidos
+    op.add_column(
+        'pagamentos',
+        sa.Column('vencido', sa.Boolean(), server_default=sa.false(), nullable=False),
+    )
+    op.create_table(
+        'execucoes_tarefas',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.Column('active', sa.Boolean(), nullable=False),
+        sa.Column('nome', sa.String(), nullable=False),
+        sa.Column('marca', sa.Date(), nullable=True),
+        sa.Column('linhas_afetadas', sa.Integer(), nullable=False),
+        sa.Column('duracao_ms', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        op.f('ix_execucoes_tarefas_nome'), 'execucoes_tarefas', ['nome'], unique=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_execucoes_tarefas_nome'), table_name='execucoes_tarefas')
+    op.drop_table('execucoes_tarefas')
+    op.drop_column('pagamentos', 'vencido')
\ No newline at end of file
@@ -0,0 +1,82 @@
+"""Tabelas de resumo dos pagamentos
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2024-05-20 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MES = {
+    'postgresql': "CAST(date_trunc('month', data_vencimento) AS DATE)",
+    'sqlite': "date(data_vencimento, 'start of month')",
+}
+
+# Tabela -> dimensões, como em services.resumo.RESUMOS
+RESUMOS = {
+    'resumo_pagamentos_mes': ('status', 'mes'),
+    'resumo_pagamentos_fornecedor': ('status', 'fornecedor_id'),
+    'resumo_pagamentos_cliente': ('status', 'cliente_id'),
+    'resumo_pagamentos': ('status', 'mes', 'fornecedor_id', 'cliente_id'),
+}
+
+TIPOS = {
+    'status': sa.String,
+    'mes': sa.Date,
+    'fornecedor_id': sa.Integer,
+    'cliente_id': sa.Integer,
+}
+
+
+def upgrade() -> None:
+    expressoes = {
+        'status': 'status',
+        'mes': MES[op.get_bind().dialect.name],
+        'fornecedor_id': 'fornecedor_id',
+        'cliente_id': 'COALESCE(cliente_id, 0)',
+    }
+    for tabela, dimensoes in RESUMOS.items():
+        op.create_table(
+            tabela,
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=False),
+            sa.Column('active', sa.Boolean(), nullable=False),
+            sa.Column('quantidade', sa.Integer(), nullable=False),
+            sa.Column('valor_total', sa.Numeric(precision=16, scale=2), nullable=False),
+            sa.Column('valor_retencao', sa.Numeric(precision=16, scale=2), nullable=False),
+            sa.Column('valor_liquido', sa.Numeric(precision=16, scale=2), nullable=False),
+            *(sa.Column(d, TIPOS[d](), nullable=False) for d in dimensoes),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint(*dimensoes, name=f'uq_{tabela}_chave'),
+        )
+        # Mesmo cálculo de services.resumo.reconstruir_resumo
+        chave = ', '.join(expressoes[d] for d in dimensoes)
+        op.execute(
+            f"INSERT INTO {tabela} ({', '.join(dimensoes)}, quantidade, valor_total, "
+            "valor_retencao, valor_liquido, created_at, updated_at, active) "
+            f"SELECT {chave}, count(*), sum(valor_total), sum(valor_retencao), "
+            "sum(valor_liquido), CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, true "
+            f"FROM pagamentos GROUP BY {chave}"
+        )
+    op.create_index(
+        op.f('ix_resumo_pagamentos_fornecedor_id'), 'resumo_pagamentos', ['fornecedor_id'], unique=False
+    )
+    op.create_index(
+        op.f('ix_resumo_pagamentos_cliente_id'), 'resumo_pagamentos', ['cliente_id'], unique=False
+    )
+
+
+def downgrade() -> None:
+    for tabela in reversed(list(RESUMOS)):
+        op.drop_table(tabela)
\ No newline at end of file
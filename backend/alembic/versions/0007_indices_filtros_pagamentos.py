@@ -0,0 +1,43 @@
+"""Índices compostos para os filtros da listagem de pagamentos
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2024-05-27 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDICES = {
+    'ix_pagamentos_data_emissao_id': ['data_emissao', 'id'],
+    'ix_pagamentos_status_vencimento': ['status', 'data_vencimento', 'id'],
+    'ix_pagamentos_fornecedor_vencimento': ['fornecedor_id', 'data_vencimento', 'id'],
+    'ix_pagamentos_cliente_vencimento': ['cliente_id', 'data_vencimento', 'id'],
+}
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for nome, colunas in INDICES.items():
+            op.create_index(
+                nome,
+                'pagamentos',
+                colunas,
+                unique=False,
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for nome in reversed(list(INDICES)):
+            op.drop_index(nome, table_name='pagamentos', postgresql_concurrently=True)
\ No newline at end of file
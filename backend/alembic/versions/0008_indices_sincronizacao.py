@@ -0,0 +1,40 @@
+"""Índices (updated_at, id) para a sincronização incremental
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2024-06-03 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABELAS = ['clientes', 'fornecedores', 'pagamentos']
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for tabela in TABELAS:
+            op.create_index(
+                f'ix_{tabela}_updated_at_id',
+                tabela,
+                ['updated_at', 'id'],
+                unique=False,
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for tabela in reversed(TABELAS):
+            op.drop_index(
+                f'ix_{tabela}_updated_at_id', table_name=tabela, postgresql_concurrently=True
+            )
\ No newline at end of file
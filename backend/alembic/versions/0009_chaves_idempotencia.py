@@ -0,0 +1,45 @@
+"""Tabela chaves_idempotencia
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2024-06-10 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'chaves_idempotencia',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.Column('active', sa.Boolean(), nullable=False),
+        sa.Column('usuario_id', sa.Integer(), nullable=False),
+        sa.Column('operacao', sa.String(), nullable=False),
+        sa.Column('chave', sa.String(length=255), nullable=False),
+        sa.Column('hash_requisicao', sa.String(), nullable=False),
+        sa.Column('status_code', sa.Integer(), nullable=True),
+        sa.Column('resposta', sa.LargeBinary(), nullable=True),
+        sa.Column('expira_em', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('usuario_id', 'operacao', 'chave', name='uq_chaves_idempotencia_chave'),
+    )
+    op.create_index(
+        op.f('ix_chaves_idempotencia_expira_em'), 'chaves_idempotencia', ['expira_em'], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_chaves_idempotencia_expira_em'), table_name='chaves_idempotencia')
+    op.drop_table('chaves_idempotencia')
\ No newline at end of file
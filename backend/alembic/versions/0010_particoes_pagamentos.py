@@ -0,0 +1,114 @@
+"""Coluna arquivado e particionamento de pagamentos
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2024-06-17 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0010'
+down_revision: Union[str, None] = '0009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# No Postgres, pagamentos passa a ser particionada por arquivado: os ativos
+# numa partição só e os arquivados em pagamentos_arquivo, por sua vez
+# particionada por faixa de data_vencimento, um ano por partição (criadas por
+# services.arquivamento conforme a necessidade). A chave primária precisa
+# conter as colunas das partições; o id continua vindo da mesma sequência.
+#
+# A tabela é copiada inteira: rodar numa janela de manutenção.
+INDICES = {
+    'ix_pagamentos_numero_nota': (['numero_nota'], {}),
+    'ix_pagamentos_data_vencimento_id': (['data_vencimento', 'id'], {}),
+    'ix_pagamentos_data_emissao_id': (['data_emissao', 'id'], {}),
+    'ix_pagamentos_status_vencimento': (['status', 'data_vencimento', 'id'], {}),
+    'ix_pagamentos_fornecedor_vencimento': (['fornecedor_id', 'data_vencimento', 'id'], {}),
+    'ix_pagamentos_cliente_vencimento': (['cliente_id', 'data_vencimento', 'id'], {}),
+    'ix_pagamentos_updated_at_id': (['updated_at', 'id'], {}),
+    'ix_pagamentos_pendentes': (
+        ['data_vencimento', 'id'], {'postgresql_where': sa.text("status = 'PENDENTE'")}
+    ),
+}
+
+
+def _colunas(arquivado: bool) -> list:
+    colunas = [
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.Column('active', sa.Boolean(), nullable=False),
+        sa.Column('cliente_id', sa.Integer(), nullable=True),
+        sa.Column('fornecedor_id', sa.Integer(), nullable=False),
+        sa.Column('numero_nota', sa.String(), nullable=False),
+        sa.Column('data_emissao', sa.Date(), nullable=False),
+        sa.Column('data_vencimento', sa.Date(), nullable=False),
+        sa.Column('valor_total', sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.Column('valor_retencao', sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.Column('valor_liquido', sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('vencido', sa.Boolean(), server_default=sa.false(), nullable=False),
+        sa.Column('data_pagamento', sa.Date(), nullable=True),
+        sa.Column('observacoes', sa.String(), nullable=True),
+        sa.Column('processado_por', sa.String(), nullable=True),
+        sa.Column('comprovante_url', sa.String(), nullable=True),
+    ]
+    if arquivado:
+        colunas.append(sa.Column('arquivado', sa.Boolean(), server_default=sa.false(), nullable=False))
+    return colunas
+
+
+def _recriar(particionada: bool) -> None:
+    """Copia pagamentos para uma tabela nova, particionada ou não, com os mesmos índices."""
+    op.rename_table('pagamentos', 'pagamentos_antiga')
+    colunas = _colunas(arquivado=particionada)
+    if particionada:
+        op.create_table('pagamentos', *colunas, postgresql_partition_by='LIST (arquivado)')
+        op.execute("CREATE TABLE pagamentos_ativos PARTITION OF pagamentos FOR VALUES IN (false)")
+        op.execute(
+            "CREATE TABLE pagamentos_arquivo PARTITION OF pagamentos FOR VALUES IN (true) "
+            "PARTITION BY RANGE (data_vencimento)"
+        )
+    else:
+        op.create_table('pagamentos', *colunas)
+
+    # Índices e restrições só depois da cópia, e com os nomes já livres
+    nomes = ', '.join(c.name for c in colunas if c.name != 'arquivado')
+    op.execute(f"INSERT INTO pagamentos ({nomes}) SELECT {nomes} FROM pagamentos_antiga")
+    op.execute("ALTER SEQUENCE pagamentos_id_seq OWNED BY NONE")
+    op.drop_table('pagamentos_antiga')
+
+    chave = ['id', 'arquivado', 'data_vencimento'] if particionada else ['id']
+    op.create_primary_key('pagamentos_pkey', 'pagamentos', chave)
+    op.create_foreign_key('pagamentos_cliente_id_fkey', 'pagamentos', 'clientes', ['cliente_id'], ['id'])
+    op.create_foreign_key(
+        'pagamentos_fornecedor_id_fkey', 'pagamentos', 'fornecedores', ['fornecedor_id'], ['id']
+    )
+    for nome, (colunas_indice, opcoes) in INDICES.items():
+        op.create_index(nome, 'pagamentos', colunas_indice, unique=False, **opcoes)
+    op.execute("ALTER TABLE pagamentos ALTER COLUMN id SET DEFAULT nextval('pagamentos_id_seq')")
+    op.execute("ALTER SEQUENCE pagamentos_id_seq OWNED BY pagamentos.id")
+    op.execute("ANALYZE pagamentos")
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        op.add_column(
+            'pagamentos',
+            sa.Column('arquivado', sa.Boolean(), server_default=sa.false(), nullable=False),
+        )
+        return
+    _recriar(particionada=True)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        op.drop_column('pagamentos', 'arquivado')
+        return
+    _recriar(particionada=False)
\ No newline at end of file
@@ -0,0 +1,68 @@
+"""Índices parciais dos cadastros ativos
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2024-06-24 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0011'
+down_revision: Union[str, None] = '0010'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDICES = {
+    'ix_clientes_ativos_id': ('clientes', ['id']),
+    'ix_fornecedores_ativos_id': ('fornecedores', ['id']),
+    'ix_fornecedores_categoria_ativos': ('fornecedores', ['categoria', 'id']),
+}
+INDICES_TRIGRAMA = {
+    'clientes': 'ix_clientes_termo_busca_trgm',
+    'fornecedores': 'ix_fornecedores_termo_busca_trgm',
+}
+
+
+def _trocar_trigramas(filtro: str) -> None:
+    # Mesmo nome, com ou sem WHERE active: o novo índice é criado ao lado do
+    # antigo e só então o substitui, sem deixar a busca sem índice
+    conn = op.get_bind()
+    if conn.dialect.name != 'postgresql':
+        return
+    if not conn.execute(sa.text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).first():
+        return
+    for tabela, indice in INDICES_TRIGRAMA.items():
+        op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {indice}_novo")
+        op.execute(
+            f"CREATE INDEX CONCURRENTLY {indice}_novo ON {tabela} "
+            f"USING gin (termo_busca gin_trgm_ops){filtro}"
+        )
+        op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {indice}")
+        op.execute(f"ALTER INDEX {indice}_novo RENAME TO {indice}")
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for nome, (tabela, colunas) in INDICES.items():
+            op.create_index(
+                nome,
+                tabela,
+                colunas,
+                unique=False,
+                postgresql_where=sa.text('active'),
+                sqlite_where=sa.text('active = 1'),
+                postgresql_concurrently=True,
+            )
+        _trocar_trigramas(" WHERE active")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        _trocar_trigramas("")
+        for nome, (tabela, _) in reversed(list(INDICES.items())):
+            op.drop_index(nome, table_name=tabela, postgresql_concurrently=True)
\ No newline at end of file
@@ -0,0 +1,28 @@
+"""Desmarca vencido dos pagamentos fora de PENDENTE
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2024-07-01 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0012'
+down_revision: Union[str, None] = '0011'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Pagos e cancelados ficavam com a marca de quando eram pendentes; os
+    # pendentes vencidos sem a marca são pegos pela próxima varredura
+    op.execute("UPDATE pagamentos SET vencido = false WHERE vencido AND status <> 'PENDENTE'")
+
+
+def downgrade() -> None:
+    # Correção de dados, sem volta
+    pass
\ No newline at end of file
@@ -0,0 +1,39 @@
+"""Índice parcial dos pendentes não vencidos e remoção de execucoes_tarefas.marca
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2024-07-08 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0013'
+down_revision: Union[str, None] = '0012'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # A varredura de vencidos só lê os pendentes ainda não marcados. No
+    # Postgres pagamentos é particionada (0010), e CREATE INDEX CONCURRENTLY
+    # não vale para tabelas particionadas
+    op.create_index(
+        'ix_pagamentos_pendentes_nao_vencidos',
+        'pagamentos',
+        ['data_vencimento', 'id'],
+        unique=False,
+        postgresql_where=sa.text("status = 'PENDENTE' AND NOT vencido"),
+        sqlite_where=sa.text("status = 'PENDENTE' AND vencido = 0"),
+    )
+    # A marca d'água era gravada e nunca lida
+    op.drop_column('execucoes_tarefas', 'marca')
+
+
+def downgrade() -> None:
+    op.add_column('execucoes_tarefas', sa.Column('marca', sa.Date(), nullable=True))
+    op.drop_index('ix_pagamentos_pendentes_nao_vencidos', table_name='pagamentos')
\ No newline at end of file
@@ -1,9 +1,10 @@
-from fastapi import APIRouter
-from .endpoints import auth, clientes, fornecedores, pagamentos
-
-api_router = APIRouter()
-
-api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
-api_router.include_router(clientes.router, prefix="/clientes", tags=["clientes"])
-api_router.include_router(fornecedores.router, prefix="/fornecedores", tags=["fornecedores"])
-api_router.include_router(pagamentos.router, prefix="/pagamentos", tags=["pagamentos"]) 
\ No newline at end of file
+from fastapi import APIRouter
+from .endpoints import auth, clientes, fornecedores, pagamentos, sistema
+
+api_router = APIRouter()
+
+api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
+api_router.include_router(clientes.router, prefix="/clientes", tags=["clientes"])
+api_router.include_router(fornecedores.router, prefix="/fornecedores", tags=["fornecedores"])
+api_router.include_router(pagamentos.router, prefix="/pagamentos", tags=["pagamentos"])
+api_router.include_router(sistema.router, prefix="/sistema", tags=["sistema"])
\ No newline at end of file
@@ -1,136 +1,191 @@
-from datetime import timedelta
-from typing import Any
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordRequestForm
-from sqlmodel import Session, select
-from ....core import security
-from ....core.config import settings
-from ....core.deps import get_db, get_current_user, verify_2fa
-from ....models.usuario import Usuario
-from ....schemas.auth import Token, UserCreate, UserLogin, TwoFactorLogin
-
-router = APIRouter()
-
-@router.post("/login", response_model=Token)
-async def login(
-    db: Session = Depends(get_db),
-    form_data: OAuth2PasswordRequestForm = Depends()
-) -> Any:
-    """
-    Login OAuth2 com usuário e senha
-    """
-    user = db.exec(select(Usuario).where(Usuario.email == form_data.username)).first()
-    if not user or not security.verify_password(form_data.password, user.senha_hash):
-        raise HTTPException(
-            status_code=400,
-            detail="Email ou senha incorretos"
-        )
-    if not user.is_active:
-        raise HTTPException(
-            status_code=400,
-            detail="Usuário inativo"
-        )
-    
-    if user.two_factor_enabled:
-        # Retorna um token temporário para 2FA
-        access_token_expires = timedelta(minutes=5)
-        token = security.create_access_token(
-            user.id, expires_delta=access_token_expires
-        )
-        return {"access_token": token, "token_type": "bearer_2fa"}
-    
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    return {
-        "access_token": security.create_access_token(
-            user.id, expires_delta=access_token_expires
-        ),
-        "token_type": "bearer"
-    }
-
-@router.post("/login/2fa", response_model=Token)
-async def verify_2fa_login(
-    *,
-    db: Session = Depends(get_db),
-    two_factor_data: TwoFactorLogin
-) -> Any:
-    """
-    Verificação do código 2FA
-    """
-    user = db.exec(select(Usuario).where(Usuario.email == two_factor_data.email)).first()
-    if not user:
-        raise HTTPException(
-            status_code=404,
-            detail="Usuário não encontrado"
-        )
-    
-    if not await verify_2fa(user, two_factor_data.code):
-        raise HTTPException(
-            status_code=400,
-            detail="Código 2FA inválido"
-        )
-    
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    return {
-        "access_token": security.create_access_token(
-            user.id, expires_delta=access_token_expires
-        ),
-        "token_type": "bearer"
-    }
-
-@router.post("/signup", response_model=Token)
-async def create_user(
-    *,
-    db: Session = Depends(get_db),
-    user_in: UserCreate
-) -> Any:
-    """
-    Criar novo usuário
-    """
-    user = db.exec(select(Usuario).where(Usuario.email == user_in.email)).first()
-    if user:
-        raise HTTPException(
-            status_code=400,
-            detail="Email já registrado"
-        )
-    
-    user = Usuario(
-        email=user_in.email,
-        nome=user_in.nome,
-        senha_hash=security.get_password_hash(user_in.password),
-    )
-    db.add(user)
-    db.commit()
-    db.refresh(user)
-    
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    return {
-        "access_token": security.create_access_token(
-            user.id, expires_delta=access_token_expires
-        ),
-        "token_type": "bearer"
-    }
-
-@router.post("/2fa/enable")
-async def enable_2fa(
-    current_user: Usuario = Depends(get_current_user),
-    db: Session = Depends(get_db)
-) -> Any:
-    """
-    Habilitar autenticação 2FA para o usuário
-    """
-    if current_user.two_factor_enabled:
-        raise HTTPException(
-            status_code=400,
-            detail="2FA já está habilitado"
-        )
-    
-    secret = security.generate_2fa_secret()
-    current_user.two_factor_secret = secret
-    current_user.two_factor_enabled = True
-    db.add(current_user)
-    db.commit()
-    
-    return {
-        "secret": secret,
-        "qr_code": security.get_2fa_qr_code(secret, current_user.email)
+from datetime import timedelta
+from typing import Any
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from ....core import limite, security
+from ....core.config import settings
+from ....core.deps import get_async_db, get_current_user, verify_2fa
+from ....models.usuario import Usuario
+from ....schemas.auth import Token, UserCreate, UserLogin, TwoFactorLogin
+
+router = APIRouter()
+
+# Tentativas por IP (login e 2FA somados) e por conta, conferidas antes de
+# buscar o usuário e de calcular qualquer hash. Com o pool de hash
+# sobrecarregado, o login é recusado antes de gastar fichas
+limite_fila = limite.criar_limite_fila(
+    "login_fila_hash",
+    settings.PASSWORD_HASH_WORKERS + settings.LOGIN_HASH_FILA,
+    security.hashes_pendentes,
+)
+limite_ip = limite.criar_limitador("login_ip", settings.LOGIN_LIMITE_IP, settings.LOGIN_LIMITE_IP_POR_MINUTO)
+limite_login = limite.criar_limitador(
+    "login_conta", settings.LOGIN_LIMITE_CONTA, settings.LOGIN_LIMITE_CONTA_POR_MINUTO
+)
+limite_2fa = limite.criar_limitador(
+    "2fa_conta", settings.LOGIN_LIMITE_CONTA, settings.LOGIN_LIMITE_CONTA_POR_MINUTO
+)
+
+def _ip(request: Request) -> str:
+    return request.client.host if request.client else "desconhecido"
+
+def _limitar_tentativa(request: Request, limitador: limite.Limitador, conta: str) -> None:
+    if settings.LOGIN_LIMITE_ATIVO:
+        limite.exigir(limite_fila, "")
+        limite.exigir(limite_ip, _ip(request))
+        limite.exigir(limitador, conta.strip().lower())
+
+def _devolver_tentativa(request: Request, limitador: limite.Limitador, conta: str) -> None:
+    # Login bem-sucedido não conta: só as falhas esgotam os baldes
+    if settings.LOGIN_LIMITE_ATIVO:
+        limite_ip.devolver(_ip(request))
+        limitador.devolver(conta.strip().lower())
+
+@router.post("/login", response_model=Token)
+async def login(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    form_data: OAuth2PasswordRequestForm = Depends()
+) -> Any:
+    """
+    Login OAuth2 com usuário e senha
+    """
+    _limitar_tentativa(request, limite_login, form_data.username)
+    user = (await db.exec(select(Usuario).where(Usuario.email == form_data.username))).first()
+    if not user:
+        raise HTTPException(
+            status_code=400,
+            detail="Email ou senha incorretos"
+        )
+    senha_ok, novo_hash = await security.verify_and_update_password_async(
+        form_data.password, user.senha_hash
+    )
+    if not senha_ok:
+        raise HTTPException(
+            status_code=400,
+            detail="Email ou senha incorretos"
+        )
+    if not user.is_active:
+        raise HTTPException(
+            status_code=400,
+            detail="Usuário inativo"
+        )
+    
+    if novo_hash:
+        # Hash com esquema ou custo antigo: regrava com a configuração atual
+        user.senha_hash = novo_hash
+        db.add(user)
+        await db.commit()
+    
+    _devolver_tentativa(request, limite_login, form_data.username)
+    
+    if user.two_factor_enabled:
+        # Retorna um token temporário para 2FA
+        access_token_expires = timedelta(minutes=5)
+        token = security.create_access_token(
+            user.id, expires_delta=access_token_expires
+        )
+        return {"access_token": token, "token_type": "bearer_2fa"}
+    
+    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    return {
+        "access_token": security.create_access_token(
+            user.id, expires_delta=access_token_expires
+        ),
+        "token_type": "bearer"
+    }
+
+@router.post("/login/2fa", response_model=Token)
+async def verify_2fa_login(
+    *,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    two_factor_data: TwoFactorLogin
+) -> Any:
+    """
+    Verificação do código 2FA
+    """
+    _limitar_tentativa(request, limite_2fa, two_factor_data.email)
+    user = (await db.exec(select(Usuario).where(Usuario.email == two_factor_data.email))).first()
+    if not user:
+        raise HTTPException(
+            status_code=404,
+            detail="Usuário não encontrado"
+        )
+    
+    if not await verify_2fa(user, two_factor_data.code):
+        raise HTTPException(
+            status_code=400,
+            detail="Código 2FA inválido"
+        )
+    
+    _devolver_tentativa(request, limite_2fa, two_factor_data.email)
+    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    return {
+        "access_token": security.create_access_token(
+            user.id, expires_delta=access_token_expires
+        ),
+        "token_type": "bearer"
+    }
+
+@router.post("/signup", response_model=Token)
+async def create_user(
+    *,
+    db: AsyncSession = Depends(get_async_db),
+    user_in: UserCreate
+) -> Any:
+    """
+    Criar novo usuário
+    """
+    user = (await db.exec(select(Usuario).where(Usuario.email == user_in.email))).first()
+    if user:
+        raise HTTPException(
+            status_code=400,
+            detail="Email já registrado"
+        )
+    
+    user = Usuario(
+        email=user_in.email,
+        nome=user_in.nome,
+        senha_hash=await security.get_password_hash_async(user_in.password),
+    )
+    db.add(user)
+    await db.commit()
+    await db.refresh(user)
+    
+    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    return {
+        "access_token": security.create_access_token(
+            user.id, expires_delta=access_token_expires
+        ),
+        "token_type": "bearer"
+    }
+
+@router.post("/2fa/enable")
+async def enable_2fa(
+    current_user: Usuario = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+) -> Any:
+    """
+    Habilitar autenticação 2FA para o usuário
+    """
+    if current_user.two_factor_enabled:
+        raise HTTPException(
+            status_code=400,
+            detail="2FA já está habilitado"
+        )
+    
+    # current_user vem do cache de principais; a alteração é feita na linha do banco
+    user = await db.get(Usuario, current_user.id)
+    secret = security.generate_2fa_secret()
+    user.two_factor_secret = secret
+    user.two_factor_enabled = True
+    db.add(user)
+    await db.commit()
+    
+    return {
+        "secret": secret,
+        "qr_code": security.get_2fa_qr_code(secret, current_user.email)
     } 
\ No newline at end of file
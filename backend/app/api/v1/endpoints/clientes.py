@@ -1,131 +1,212 @@
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select
-from ....core.deps import get_db, get_current_user
-from ....models.usuario import Usuario
-from ....models.cliente import Cliente
-
-router = APIRouter()
-
-@router.get("/", response_model=List[Cliente])
-def read_clientes(
-    *,
-    db: Session = Depends(get_db),
-    skip: int = 0,
-    limit: int = 100,
-    current_user: Usuario = Depends(get_current_user),
-) -> Any:
-    """
-    Recuperar clientes.
-    """
-    clientes = db.exec(select(Cliente).offset(skip).limit(limit)).all()
-    return clientes
-
-@router.post("/", response_model=Cliente)
-def create_cliente(
-    *,
-    db: Session = Depends(get_db),
-    cliente_in: Cliente,
-    current_user: Usuario = Depends(get_current_user),
-) -> Any:
-    """
-    Criar novo cliente.
-    """
-    cliente = db.exec(select(Cliente).where(Cliente.cnpj == cliente_in.cnpj)).first()
-    if cliente:
-        raise HTTPException(
-            status_code=400,
-            detail="Cliente com este CNPJ já existe no sistema."
-        )
-    cliente = Cliente.from_orm(cliente_in)
-    db.add(cliente)
-    db.commit()
-    db.refresh(cliente)
-    return cliente
-
-@router.get("/{cliente_id}", response_model=Cliente)
-def read_cliente(
-    *,
-    db: Session = Depends(get_db),
-    cliente_id: int,
-    current_user: Usuario = Depends(get_current_user),
-) -> Any:
-    """
-    Obter cliente por ID.
-    """
-    cliente = db.get(Cliente, cliente_id)
-    if not cliente:
-        raise HTTPException(status_code=404, detail="Cliente não encontrado")
-    return cliente
-
-@router.put("/{cliente_id}", response_model=Cliente)
-def update_cliente(
-    *,
-    db: Session = Depends(get_db),
-    cliente_id: int,
-    cliente_in: Cliente,
-    current_user: Usuario = Depends(get_current_user),
-) -> Any:
-    """
-    Atualizar cliente.
-    """
-    cliente = db.get(Cliente, cliente_id)
-    if not cliente:
-        raise HTTPException(status_code=404, detail="Cliente não encontrado")
-    
-    # Verificar se o novo CNPJ já existe (se foi alterado)
-    if cliente_in.cnpj != cliente.cnpj:
-        existing = db.exec(select(Cliente).where(Cliente.cnpj == cliente_in.cnpj)).first()
-        if existing:
-            raise HTTPException(
-                status_code=400,
-                detail="Cliente com este CNPJ já existe no sistema."
-            )
-    
-    cliente_data = cliente_in.dict(exclude_unset=True)
-    for field in cliente_data:
-        setattr(cliente, field, cliente_data[field])
-    
-    db.add(cliente)
-    db.commit()
-    db.refresh(cliente)
-    return cliente
-
-@router.delete("/{cliente_id}")
-def delete_cliente(
-    *,
-    db: Session = Depends(get_db),
-    cliente_id: int,
-    current_user: Usuario = Depends(get_current_user),
-) -> Any:
-    """
-    Deletar cliente.
-    """
-    cliente = db.get(Cliente, cliente_id)
-    if not cliente:
-        raise HTTPException(status_code=404, detail="Cliente não encontrado")
-    
-    # Soft delete
-    cliente.active = False
-    db.add(cliente)
-    db.commit()
-    return {"ok": True}
-
-@router.get("/search/", response_model=List[Cliente])
-def search_clientes(
-    *,
-    db: Session = Depends(get_db),
-    query: str,
-    current_user: Usuario = Depends(get_current_user),
-) -> Any:
-    """
-    Pesquisar clientes por nome, CNPJ ou email.
-    """
-    clientes = db.exec(
-        select(Cliente).where(
-            (Cliente.nome.contains(query)) |
-            (Cliente.cnpj.contains(query)) |
-            (Cliente.email.contains(query))
-        )
-    ).all()
-    return clientes 
\ No newline at end of file
+from typing import Any, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from sqlmodel import Session, select
+from ....core.campos import projecao, projetar, resposta_projetada, selecionar
+from ....core.deps import get_db, get_current_user
+from ....core.paginacao import paginar
+from ....core.serializacao import RespostaJSON
+from ....models.usuario import Usuario
+from ....models.cliente import Cliente
+from ....schemas.cadastro import ResultadoImportacaoCadastros
+from ....services import busca
+from ....services.cadastros import (
+    INCLUIR_INATIVOS, invalidar_cadastro, obter_cadastro, somente_ativos, visivel
+)
+from ....services.idempotencia import Execucao, idempotencia
+from ....services.importacao import ErroImportacao, ler_requisicao
+from ....services.importacao_cadastros import importar_cadastros, ler_cadastros
+from ....services.sincronizacao import alteracoes
+
+router = APIRouter()
+
+@router.get("/", response_model=List[Cliente])
+def read_clientes(
+    *,
+    db: Session = Depends(get_db),
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    campos: List[str] = Depends(projecao(Cliente)),
+    include_inactive: bool = INCLUIR_INATIVOS,
+    current_user: Usuario = Depends(get_current_user),
+) -> Any:
+    """
+    Recuperar clientes.
+
+    Aceita paginação por ``skip``/``limit`` ou por ``cursor``; o cursor da
+    próxima página é devolvido no cabeçalho ``X-Next-Cursor``. Com
+    ``fields=id,nome`` só essas colunas são lidas e devolvidas. Os
+    desativados só aparecem com ``include_inactive=true``.
+    """
+    clientes, proximo = paginar(
+        db,
+        somente_ativos(Cliente, selecionar(Cliente, campos, (Cliente.id,)), include_inactive),
+        ordem="id",
+        colunas=(Cliente.id,),
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+    )
+    return resposta_projetada(projetar(clientes, campos), proximo)
+
+@router.post("/", response_model=Cliente)
+def create_cliente(
+    *,
+    db: Session = Depends(get_db),
+    cliente_in: Cliente,
+    current_user: Usuario = Depends(get_current_user),
+) -> Any:
+    """
+    Criar novo cliente.
+    """
+    cliente = db.exec(select(Cliente).where(Cliente.cnpj == cliente_in.cnpj)).first()
+    if cliente:
+        raise HTTPException(
+            status_code=400,
+            detail="Cliente com este CNPJ já existe no sistema."
+        )
+    cliente = Cliente.from_orm(cliente_in)
+    db.add(cliente)
+    db.commit()
+    db.refresh(cliente)
+    return cliente
+
+@router.post("/bulk", response_model=ResultadoImportacaoCadastros)
+async def create_clientes_bulk(
+    *,
+    request: Request,
+    db: Session = Depends(get_db),
+    execucao: Execucao = Depends(idempotencia("clientes.importar")),
+    current_user: Usuario = Depends(get_current_user),
+) -> Any:
+    """
+    Importar clientes em lote, criando ou atualizando pelo CNPJ.
+
+    Aceita uma lista JSON, um CSV no corpo (``text/csv``) ou um arquivo enviado
+    como ``multipart/form-data`` no campo ``arquivo``. Um CNPJ já cadastrado
+    é atualizado com os campos enviados (e reativado); o resultado traz, por
+    linha, ``criado``, ``atualizado`` ou os erros. Aceita ``Idempotency-Key``.
+    """
+    if execucao.repeticao is not None:
+        return execucao.repeticao
+    try:
+        conteudo, json_enviado = await ler_requisicao(request)
+        relatorio = await run_in_threadpool(
+            lambda: importar_cadastros(db, Cliente, ler_cadastros(Cliente, conteudo, json_enviado))
+        )
+    except ErroImportacao as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await execucao.concluir(JSONResponse(relatorio))
+
+@router.get("/changes")
+def read_clientes_changes(
+    *,
+    db: Session = Depends(get_db),
+    since: Optional[str] = None,
+    limit: int = Query(1000, ge=1, le=10000),
+    campos: List[str] = Depends(projecao(Cliente)),
+    current_user: Usuario = Depends(get_current_user),
+) -> Any:
+    """
+    Clientes criados, alterados ou desativados desde o token ``since``.
+
+    Sem ``since`` devolve todos. A resposta traz os ``itens``, o ``token`` a
+    usar na próxima chamada e ``mais``, que indica outra página disponível.
+    """
+    return RespostaJSON(alteracoes(db, Cliente, since, limit, campos))
+
+@router.get("/{cliente_id}", response_model=Cliente)
+def read_cliente(
+    *,
+    db: Session = Depends(get_db),
+    cliente_id: int,
+    include_inactive: bool = INCLUIR_INATIVOS,
+    current_user: Usuario = Depends(get_current_user),
+) -> Any:
+    """
+    Obter cliente por ID.
+
+    Lido do cache de cadastros; alterações por esta API valem na hora. Um
+    cliente desativado só é encontrado com ``include_inactive=true``.
+    """
+    cliente = visivel(obter_cadastro(db, Cliente, cliente_id), include_inactive)
+    if not cliente:
+        raise HTTPException(status_code=404, detail="Cliente não encontrado")
+    return RespostaJSON(cliente)
+
+@router.put("/{cliente_id}", response_model=Cliente)
+def update_cliente(
+    *,
+    db: Session = Depends(get_db),
+    cliente_id: int,
+    cliente_in: Cliente,
+    current_user: Usuario = Depends(get_current_user),
+) -> Any:
+    """
+    Atualizar cliente.
+    """
+    cliente = db.get(Cliente, cliente_id)
+    if not cliente:
+        raise HTTPException(status_code=404, detail="Cliente não encontrado")
+    
+    # Verificar se o novo CNPJ já existe (se foi alterado)
+    if cliente_in.cnpj != cliente.cnpj:
+        existing = db.exec(select(Cliente).where(Cliente.cnpj == cliente_in.cnpj)).first()
+        if existing:
+            raise HTTPException(
+                status_code=400,
+                detail="Cliente com este CNPJ já existe no sistema."
+            )
+    
+    cliente_data = cliente_in.dict(exclude_unset=True)
+    for field in cliente_data:
+        setattr(cliente, field, cliente_data[field])
+    
+    db.add(cliente)
+    db.commit()
+    invalidar_cadastro(Cliente, cliente_id)
+    db.refresh(cliente)
+    return cliente
+
+@router.delete("/{cliente_id}")
+def delete_cliente(
+    *,
+    db: Session = Depends(get_db),
+    cliente_id: int,
+    current_user: Usuario = Depends(get_current_user),
+) -> Any:
+    """
+    Deletar cliente.
+    """
+    cliente = db.get(Cliente, cliente_id)
+    if not cliente:
+        raise HTTPException(status_code=404, detail="Cliente não encontrado")
+    
+    # Soft delete
+    cliente.active = False
+    db.add(cliente)
+    db.commit()
+    invalidar_cadastro(Cliente, cliente_id)
+    return {"ok": True}
+
+@router.get("/search/", response_model=List[Cliente])
+def search_clientes(
+    *,
+    db: Session = Depends(get_db),
+    query: str,
+    limit: int = Query(busca.LIMITE_PADRAO, ge=1, le=100),
+    campos: List[str] = Depends(projecao(Cliente)),
+    include_inactive: bool = INCLUIR_INATIVOS,
+    current_user: Usuario = Depends(get_current_user),
+) -> Any:
+    """
+    Pesquisar clientes por nome, CNPJ ou email.
+
+    A busca ignora acentos e maiúsculas, compara CNPJ só pelos dígitos e
+    devolve os resultados mais relevantes primeiro; os desativados só com
+    ``include_inactive=true``.
+    """
+    resultados = busca.buscar(db, Cliente, query, limit, campos, include_inactive)
+    return resposta_projetada(projetar(resultados, campos))
\ No newline at end of file
@@ -1,146 +1,240 @@
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select
-from ....core.deps import get_db, get_current_user
-from ....models.usuario import Usuario
-from ....models.fornecedor import Fornecedor
-
-router = APIRouter()
-
-@router.get("/", response_model=List[Fornecedor])
-def read_fornecedores(
-    *,
-    db: Session = Depends(get_db),
-    skip: int = 0,
-    limit: int = 100,
-    current_user: Usuario = Depends(get_current_user),
-) -> Any:
-    """
-    Recuperar fornecedores.
-    """
-    fornecedores = db.exec(select(Fornecedor).offset(skip).limit(limit)).all()
-    return fornecedores
-
-@router.post("/", response_model=Fornecedor)
-def create_fornecedor(
-    *,
-    db: Session = Depends(get_db),
-    fornecedor_in: Fornecedor,
-    current_user: Usuario = Depends(get_current_user),
-) -> Any:
-    """
-    Criar novo fornecedor.
-    """
-    fornecedor = db.exec(select(Fornecedor).where(Fornecedor.cnpj == fornecedor_in.cnpj)).first()
-    if fornecedor:
-        raise HTTPException(
-            status_code=400,
-            detail="Fornecedor com este CNPJ já existe no sistema."
-        )
-    fornecedor = Fornecedor.from_orm(fornecedor_in)
-    db.add(fornecedor)
-    db.commit()
-    db.refresh(fornecedor)
-    return fornecedor
-
-@router.get("/{fornecedor_id}", response_model=Fornecedor)
-def read_fornecedor(
-    *,
-    db: Session = Depends(get_db),
-    fornecedor_id: int,
-    current_user: Usuario = Depends(get_current_user),
-) -> Any:
-    """
-    Obter fornecedor por ID.
-    """
-    fornecedor = db.get(Fornecedor, fornecedor_id)
-    if not fornecedor:
-        raise HTTPException(status_code=404, detail="Fornecedor não encontrado")
-    return fornecedor
-
-@router.put("/{fornecedor_id}", response_model=Fornecedor)
-def update_fornecedor(
-    *,
-    db: Session = Depends(get_db),
-    fornecedor_id: int,
-    fornecedor_in: Fornecedor,
-    current_user: Usuario = Depends(get_current_user),
-) -> Any:
-    """
-    Atualizar fornecedor.
-    """
-    fornecedor = db.get(Fornecedor, fornecedor_id)
-    if not fornecedor:
-        raise HTTPException(status_code=404, detail="Fornecedor não encontrado")
-    
-    # Verificar se o novo CNPJ já existe (se foi alterado)
-    if fornecedor_in.cnpj != fornecedor.cnpj:
-        existing = db.exec(select(Fornecedor).where(Fornecedor.cnpj == fornecedor_in.cnpj)).first()
-        if existing:
-            raise HTTPException(
-                status_code=400,
-                detail="Fornecedor com este CNPJ já existe no sistema."
-            )
-    
-    fornecedor_data = fornecedor_in.dict(exclude_unset=True)
-    for field in fornecedor_data:
-        setattr(fornecedor, field, fornecedor_data[field])
-    
-    db.add(fornecedor)
-    db.commit()
-    db.refresh(fornecedor)
-    return fornecedor
-
-@router.delete("/{fornecedor_id}")
-def delete_fornecedor(
-    *,
-    db: Session = Depends(get_db),
-    fornecedor_id: int,
-    current_user: Usuario = Depends(get_current_user),
-) -> Any:
-    """
-    Deletar fornecedor.
-    """
-    fornecedor = db.get(Fornecedor, fornecedor_id)
-    if not fornecedor:
-        raise HTTPException(status_code=404, detail="Fornecedor não encontrado")
-    
-    # Soft delete
-    fornecedor.active = False
-    db.add(fornecedor)
-    db.commit()
-    return {"ok": True}
-
-@router.get("/search/", response_model=List[Fornecedor])
-def search_fornecedores(
-    *,
-    db: Session = Depends(get_db),
-    query: str,
-    current_user: Usuario = Depends(get_current_user),
-) -> Any:
-    """
-    Pesquisar fornecedores por nome, CNPJ ou email.
-    """
-    fornecedores = db.exec(
-        select(Fornecedor).where(
-            (Fornecedor.nome.contains(query)) |
-            (Fornecedor.cnpj.contains(query)) |
-            (Fornecedor.email.contains(query))
-        )
-    ).all()
-    return fornecedores
-
-@router.get("/categoria/{categoria}", response_model=List[Fornecedor])
-def get_fornecedores_by_categoria(
-    *,
-    db: Session = Depends(get_db),
-    categoria: str,
-    current_user: Usuario = Depends(get_current_user),
-) -> Any:
-    """
-    Obter fornecedores por categoria.
-    """
-    fornecedores = db.exec(
-        select(Fornecedor).where(Fornecedor.categoria == categoria)
-    ).all()
-    return fornecedores 
\ No newline at end of file
+from typing import Any, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from sqlmodel import Session, select
+from ....core.campos import projecao, projetar, resposta_projetada, selecionar
+from ....core.deps import get_db, get_current_user
+from ....core.paginacao import paginar
+from ....core.serializacao import RespostaJSON
+from ....models.usuario import Usuario
+from ....models.fornecedor import Fornecedor
+from ....schemas.cadastro import ResultadoImportacaoCadastros
+from ....services import busca
+from ....services.cadastros import (
+    INCLUIR_INATIVOS,
+    fornecedores_da_categoria,
+    invalidar_cadastro,
+    invalidar_categorias,
+    obter_cadastro,
+    somente_ativos,
+    visivel,
+)
+from ....services.idempotencia import Execucao, idempotencia
+from ....services.importacao import ErroImportacao, ler_requisicao
+from ....services.importacao_cadastros import importar_cadastros, ler_cadastros
+from ....services.sincronizacao import alteracoes
+
+router = APIRouter()
+
+@router.get("/", response_model=List[Fornecedor])
+def read_fornecedores(
+    *,
+    db: Session = Depends(get_db),
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    campos: List[str] = Depends(projecao(Fornecedor)),
+    include_inactive: bool = INCLUIR_INATIVOS,
+    current_user: Usuario = Depends(get_current_user),
+) -> Any:
+    """
+    Recuperar fornecedores.
+
+    Aceita paginação por ``skip``/``limit`` ou por ``cursor``; o cursor da
+    próxima página é devolvido no cabeçalho ``X-Next-Cursor``. Com
+    ``fields=id,nome`` só essas colunas são lidas e devolvidas. Os
+    desativados só aparecem com ``include_inactive=true``.
+    """
+    fornecedores, proximo = paginar(
+        db,
+        somente_ativos(Fornecedor, selecionar(Fornecedor, campos, (Fornecedor.id,)), include_inactive),
+        ordem="id",
+        colunas=(Fornecedor.id,),
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+    )
+    return resposta_projetada(projetar(fornecedores, campos), proximo)
+
+@router.post("/", response_model=Fornecedor)
+def create_fornecedor(
+    *,
+    db: Session = Depends(get_db),
+    fornecedor_in: Fornecedor,
+    current_user: Usuario = Depends(get_current_user),
+) -> Any:
+    """
+    Criar novo fornecedor.
+    """
+    fornecedor = db.exec(select(Fornecedor).where(Fornecedor.cnpj == fornecedor_in.cnpj)).first()
+    if fornecedor:
+        raise HTTPException(
+            status_code=400,
+            detail="Fornecedor com este CNPJ já existe no sistema."
+        )
+    fornecedor = Fornecedor.from_orm(fornecedor_in)
+    db.add(fornecedor)
+    db.commit()
+    invalidar_categorias(fornecedor.categoria)
+    db.refresh(fornecedor)
+    return fornecedor
+
+@router.post("/bulk", response_model=ResultadoImportacaoCadastros)
+async def create_fornecedores_bulk(
+    *,
+    request: Request,
+    db: Session = Depends(get_db),
+    execucao: Execucao = Depends(idempotencia("fornecedores.importar")),
+    current_user: Usuario = Depends(get_current_user),
+) -> Any:
+    """
+    Importar fornecedores em lote, criando ou atualizando pelo CNPJ.
+
+    Aceita uma lista JSON, um CSV no corpo (``text/csv``) ou um arquivo enviado
+    como ``multipart/form-data`` no campo ``arquivo``. Um CNPJ já cadastrado
+    é atualizado com os campos enviados (e reativado); o resultado traz, por
+    linha, ``criado``, ``atualizado`` ou os erros. Aceita ``Idempotency-Key``.
+    """
+    if execucao.repeticao is not None:
+        return execucao.repeticao
+    try:
+        conteudo, json_enviado = await ler_requisicao(request)
+        relatorio = await run_in_threadpool(
+            lambda: importar_cadastros(db, Fornecedor, ler_cadastros(Fornecedor, conteudo, json_enviado))
+        )
+    except ErroImportacao as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await execucao.concluir(JSONResponse(relatorio))
+
+@router.get("/changes")
+def read_fornecedores_changes(
+    *,
+    db: Session = Depends(get_db),
+    since: Optional[str] = None,
+    limit: int = Query(1000, ge=1, le=10000),
+    campos: List[str] = Depends(projecao(Fornecedor)),
+    current_user: Usuario = Depends(get_current_user),
+) -> Any:
+    """
+    Fornecedores criados, alterados ou desativados desde o token ``since``.
+
+    Sem ``since`` devolve todos. A resposta traz os ``itens``, o ``token`` a
+    usar na próxima chamada e ``mais``, que indica outra página disponível.
+    """
+    return RespostaJSON(alteracoes(db, Fornecedor, since, limit, campos))
+
+@router.get("/{fornecedor_id}", response_model=Fornecedor)
+def read_fornecedor(
+    *,
+    db: Session = Depends(get_db),
+    fornecedor_id: int,
+    include_inactive: bool = INCLUIR_INATIVOS,
+    current_user: Usuario = Depends(get_current_user),
+) -> Any:
+    """
+    Obter fornecedor por ID.
+
+    Lido do cache de cadastros; alterações por esta API valem na hora. Um
+    fornecedor desativado só é encontrado com ``include_inactive=true``.
+    """
+    fornecedor = visivel(obter_cadastro(db, Fornecedor, fornecedor_id), include_inactive)
+    if not fornecedor:
+        raise HTTPException(status_code=404, detail="Fornecedor não encontrado")
+    return RespostaJSON(fornecedor)
+
+@router.put("/{fornecedor_id}", response_model=Fornecedor)
+def update_fornecedor(
+    *,
+    db: Session = Depends(get_db),
+    fornecedor_id: int,
+    fornecedor_in: Fornecedor,
+    current_user: Usuario = Depends(get_current_user),
+) -> Any:
+    """
+    Atualizar fornecedor.
+    """
+    fornecedor = db.get(Fornecedor, fornecedor_id)
+    if not fornecedor:
+        raise HTTPException(status_code=404, detail="Fornecedor não encontrado")
+    
+    # Verificar se o novo CNPJ já existe (se foi alterado)
+    if fornecedor_in.cnpj != fornecedor.cnpj:
+        existing = db.exec(select(Fornecedor).where(Fornecedor.cnpj == fornecedor_in.cnpj)).first()
+        if existing:
+            raise HTTPException(
+                status_code=400,
+                detail="Fornecedor com este CNPJ já existe no sistema."
+            )
+    
+    fornecedor_data = fornecedor_in.dict(exclude_unset=True)
+    categoria_anterior = fornecedor.categoria
+    for field in fornecedor_data:
+        setattr(fornecedor, field, fornecedor_data[field])
+    
+    db.add(fornecedor)
+    db.commit()
+    invalidar_cadastro(Fornecedor, fornecedor_id)
+    invalidar_categorias(categoria_anterior, fornecedor.categoria)
+    db.refresh(fornecedor)
+    return fornecedor
+
+@router.delete("/{fornecedor_id}")
+def delete_fornecedor(
+    *,
+    db: Session = Depends(get_db),
+    fornecedor_id: int,
+    current_user: Usuario = Depends(get_current_user),
+) -> Any:
+    """
+    Deletar fornecedor.
+    """
+    fornecedor = db.get(Fornecedor, fornecedor_id)
+    if not fornecedor:
+        raise HTTPException(status_code=404, detail="Fornecedor não encontrado")
+    
+    # Soft delete
+    fornecedor.active = False
+    db.add(fornecedor)
+    db.commit()
+    invalidar_cadastro(Fornecedor, fornecedor_id)
+    invalidar_categorias(fornecedor.categoria)
+    return {"ok": True}
+
+@router.get("/search/", response_model=List[Fornecedor])
+def search_fornecedores(
+    *,
+    db: Session = Depends(get_db),
+    query: str,
+    limit: int = Query(busca.LIMITE_PADRAO, ge=1, le=100),
+    campos: List[str] = Depends(projecao(Fornecedor)),
+    include_inactive: bool = INCLUIR_INATIVOS,
+    current_user: Usuario = Depends(get_current_user),
+) -> Any:
+    """
+    Pesquisar fornecedores por nome, CNPJ ou email.
+
+    A busca ignora acentos e maiúsculas, compara CNPJ só pelos dígitos e
+    devolve os resultados mais relevantes primeiro; os desativados só com
+    ``include_inactive=true``.
+    """
+    resultados = busca.buscar(db, Fornecedor, query, limit, campos, include_inactive)
+    return resposta_projetada(projetar(resultados, campos))
+
+@router.get("/categoria/{categoria}", response_model=List[Fornecedor])
+def get_fornecedores_by_categoria(
+    *,
+    db: Session = Depends(get_db),
+    categoria: str,
+    campos: List[str] = Depends(projecao(Fornecedor)),
+    include_inactive: bool = INCLUIR_INATIVOS,
+    current_user: Usuario = Depends(get_current_user),
+) -> Any:
+    """
+    Obter fornecedores por categoria.
+
+    A lista dos ativos da categoria vem do cache de cadastros; com
+    ``include_inactive=true`` é lida do banco.
+    """
+    fornecedores = fornecedores_da_categoria(db, categoria, include_inactive)
+    return RespostaJSON([{campo: f[campo] for campo in campos} for f in fornecedores])
\ No newline at end of file
@@ -1,175 +1,479 @@
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
-from sqlmodel import Session, select
-from datetime import date
-from ....core.deps import get_db, get_current_user
-from ....models.usuario import Usuario
-from ....models.pagamento import Pagamento
-from ....models.cliente import Cliente
-from ....models.fornecedor import Fornecedor
-from ....services.pagamento import processar_pagamento, calcular_retencao
-
-router = APIRouter()
-
-@router.get("/", response_model=List[Pagamento])
-def read_pagamentos(
-    *,
-    db: Session = Depends(get_db),
-    skip: int = 0,
-    limit: int = 100,
-    current_user: Usuario = Depends(get_current_user),
-) -> Any:
-    """
-    Recuperar pagamentos.
-    """
-    pagamentos = db.exec(select(Pagamento).offset(skip).limit(limit)).all()
-    return pagamentos
-
-@router.post("/", response_model=Pagamento)
-async def create_pagamento(
-    *,
-    db: Session = Depends(get_db),
-    pagamento_in: Pagamento,
-    background_tasks: BackgroundTasks,
-    current_user: Usuario = Depends(get_current_user),
-) -> Any:
-    """
-    Criar novo pagamento.
-    """
-    # Verificar se o fornecedor existe
-    fornecedor = db.get(Fornecedor, pagamento_in.fornecedor_id)
-    if not fornecedor:
-        raise HTTPException(
-            status_code=404,
-            detail="Fornecedor não encontrado"
-        )
-    
-    # Verificar se o cliente existe (se fornecido)
-    if pagamento_in.cliente_id:
-        cliente = db.get(Cliente, pagamento_in.cliente_id)
-        if not cliente:
-            raise HTTPException(
-                status_code=404,
-                detail="Cliente não encontrado"
-            )
-        
-        # Calcular retenção baseado no regime tributário do cliente
-        valor_retencao = calcular_retencao(
-            valor_total=pagamento_in.valor_total,
-            percentual_retencao=cliente.percentual_retencao
-        )
-        pagamento_in.valor_retencao = valor_retencao
-        pagamento_in.valor_liquido = pagamento_in.valor_total - valor_retencao
-    
-    pagamento = Pagamento.from_orm(pagamento_in)
-    pagamento.processado_por = current_user.email
-    
-    db.add(pagamento)
-    db.commit()
-    db.refresh(pagamento)
-    
-    # Processar pagamento em background se estiver pendente
-    if pagamento.status == "PENDENTE":
-        background_tasks.add_task(processar_pagamento, pagamento.id)
-    
-    return pagamento
-
-@router.get("/{pagamento_id}", response_model=Pagamento)
-def read_pagamento(
-    *,
-    db: Session = Depends(get_db),
-    pagamento_id: int,
-    current_user: Usuario = Depends(get_current_user),
-) -> Any:
-    """
-    Obter pagamento por ID.
-    """
-    pagamento = db.get(Pagamento, pagamento_id)
-    if not pagamento:
-        raise HTTPException(status_code=404, detail="Pagamento não encontrado")
-    return pagamento
-
-@router.put("/{pagamento_id}", response_model=Pagamento)
-def update_pagamento(
-    *,
-    db: Session = Depends(get_db),
-    pagamento_id: int,
-    pagamento_in: Pagamento,
-    current_user: Usuario = Depends(get_current_user),
-) -> Any:
-    """
-    Atualizar pagamento.
-    """
-    pagamento = db.get(Pagamento, pagamento_id)
-    if not pagamento:
-        raise HTTPException(status_code=404, detail="Pagamento não encontrado")
-    
-    if pagamento.status != "PENDENTE":
-        raise HTTPException(
-            status_code=400,
-            detail="Apenas pagamentos pendentes podem ser atualizados"
-        )
-    
-    pagamento_data = pagamento_in.dict(exclude_unset=True)
-    for field in pagamento_data:
-        setattr(pagamento, field, pagamento_data[field])
-    
-    db.add(pagamento)
-    db.commit()
-    db.refresh(pagamento)
-    return pagamento
-
-@router.delete("/{pagamento_id}")
-def delete_pagamento(
-    *,
-    db: Session = Depends(get_db),
-    pagamento_id: int,
-    current_user: Usuario = Depends(get_current_user),
-) -> Any:
-    """
-    Cancelar pagamento.
-    """
-    pagamento = db.get(Pagamento, pagamento_id)
-    if not pagamento:
-        raise HTTPException(status_code=404, detail="Pagamento não encontrado")
-    
-    if pagamento.status not in ["PENDENTE", "PROCESSANDO"]:
-        raise HTTPException(
-            status_code=400,
-            detail="Apenas pagamentos pendentes ou em processamento podem ser cancelados"
-        )
-    
-    pagamento.status = "CANCELADO"
-    db.add(pagamento)
-    db.commit()
-    return {"ok": True}
-
-@router.get("/vencimento/{data}", response_model=List[Pagamento])
-def get_pagamentos_by_vencimento(
-    *,
-    db: Session = Depends(get_db),
-    data: date,
-    current_user: Usuario = Depends(get_current_user),
-) -> Any:
-    """
-    Obter pagamentos por data de vencimento.
-    """
-    pagamentos = db.exec(
-        select(Pagamento).where(Pagamento.data_vencimento == data)
-    ).all()
-    return pagamentos
-
-@router.get("/status/{status}", response_model=List[Pagamento])
-def get_pagamentos_by_status(
-    *,
-    db: Session = Depends(get_db),
-    status: str,
-    current_user: Usuario = Depends(get_current_user),
-) -> Any:
-    """
-    Obter pagamentos por status.
-    """
-    pagamentos = db.exec(
-        select(Pagamento).where(Pagamento.status == status)
-    ).all()
-    return pagamentos 
\ No newline at end of file
+from typing import Any, List, Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import false
+from sqlalchemy.orm import selectinload
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from datetime import date
+from decimal import Decimal
+from ....core.campos import campos_permitidos, projecao, projetar, resposta_projetada, selecionar
+from ....core.database import fabrica_sessoes_async
+from ....core.deps import get_async_db, get_db, get_current_user
+from ....core.paginacao import paginar
+from ....core.serializacao import RespostaJSON
+from ....models.usuario import Usuario
+from ....models.pagamento import Pagamento
+from ....models.cliente import Cliente
+from ....models.fornecedor import Fornecedor
+from ....schemas.pagamento import LinhaResumo, ResultadoImportacao
+from ....services.cadastros import obter_cadastro_async, visivel
+from ....services.idempotencia import Execucao, idempotencia
+from ....services.pagamento import processar_pagamentos_lote
+from ....services.sincronizacao import alteracoes
+from ....services.resumo import DIMENSOES, consultar_resumo
+from ....services.retencao import regras_para
+from ....services.importacao import (
+    ErroImportacao, importar_pagamentos, ler_csv, ler_json, ler_requisicao
+)
+from ....services.exportacao import gerar_csv, gerar_ndjson
+
+router = APIRouter()
+
+# Chaves de ordenação aceitas na listagem; todas terminam em id para serem únicas.
+# Com o prefixo "-" a ordem é decrescente.
+ORDENS_PAGAMENTO = {
+    "id": (Pagamento.id,),
+    "vencimento": (Pagamento.data_vencimento, Pagamento.id),
+    "emissao": (Pagamento.data_emissao, Pagamento.id),
+    "valor": (Pagamento.valor_total, Pagamento.id),
+}
+OrdemPagamento = Literal[
+    "id", "-id", "vencimento", "-vencimento", "emissao", "-emissao", "valor", "-valor"
+]
+
+# Sem include_archived as consultas ficam nos pagamentos ativos (no Postgres,
+# só a partição dos ativos é lida); ver services.arquivamento
+INCLUIR_ARQUIVADOS = Query(False, description="Inclui os pagamentos arquivados")
+
+def _ativos(consulta: Any, include_archived: bool) -> Any:
+    return consulta if include_archived else consulta.where(Pagamento.arquivado == false())
+
+# Relacionamentos que podem vir embutidos na resposta com ?expand=
+EXPANSOES = {
+    "fornecedor": Pagamento.fornecedor,
+    "cliente": Pagamento.cliente,
+}
+
+def expansoes_pagamento(
+    expand: Optional[str] = Query(None, description="fornecedor, cliente, separados por vírgula"),
+) -> List[str]:
+    pedidas = list(dict.fromkeys(e.strip() for e in (expand or "").split(",") if e.strip()))
+    invalidas = sorted(set(pedidas) - set(EXPANSOES))
+    if invalidas:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Expansão inválida: {', '.join(invalidas)}"
+        )
+    return pedidas
+
+def _carregar_expansoes(expandir: List[str]) -> list:
+    # Uma consulta IN por relacionamento, qualquer que seja o tamanho da
+    # página; cada fornecedor ou cliente vem uma vez só, mesmo repetido
+    return [selectinload(EXPANSOES[nome]) for nome in expandir]
+
+def _com_expansoes(pagamento: Pagamento, expandir: List[str]) -> dict:
+    dados = jsonable_encoder(pagamento)
+    for nome in expandir:
+        dados[nome] = jsonable_encoder(getattr(pagamento, nome))
+    return dados
+
+def _projetar_com_expansoes(db: Session, linhas: List[Any], campos: List[str], expandir: List[str]) -> List[dict]:
+    """
+    Expansões sobre as linhas da listagem, que não são objetos do ORM: como no
+    selectinload, uma consulta IN por relacionamento.
+    """
+    itens = projetar(linhas, campos)
+    for nome in expandir:
+        chave = f"{nome}_id"
+        modelo = EXPANSOES[nome].property.mapper.class_
+        ids = {getattr(linha, chave) for linha in linhas} - {None}
+        por_id = {}
+        if ids:
+            campos_modelo = campos_permitidos(modelo)
+            relacionados = db.exec(
+                selecionar(modelo, campos_modelo, (modelo.id,)).where(modelo.id.in_(ids))
+            ).all()
+            por_id = {r.id: item for r, item in zip(relacionados, projetar(relacionados, campos_modelo))}
+        for item, linha in zip(itens, linhas):
+            item[nome] = por_id.get(getattr(linha, chave))
+    return itens
+
+def filtros_pagamentos(
+    status: Optional[List[str]] = Query(None, description="Um ou mais status, repetidos ou separados por vírgula"),
+    vencimento_de: Optional[date] = None,
+    vencimento_ate: Optional[date] = None,
+    emissao_de: Optional[date] = None,
+    emissao_ate: Optional[date] = None,
+    fornecedor_id: Optional[int] = None,
+    cliente_id: Optional[int] = None,
+    valor_min: Optional[Decimal] = None,
+    valor_max: Optional[Decimal] = None,
+    include_archived: bool = INCLUIR_ARQUIVADOS,
+) -> List[Any]:
+    """Condições da listagem e da exportação; os filtros informados são combinados com AND."""
+    filtros = [] if include_archived else [Pagamento.arquivado == false()]
+    if status:
+        valores = {s.strip() for item in status for s in item.split(",") if s.strip()}
+        filtros.append(Pagamento.status.in_(sorted(valores)))
+    if vencimento_de:
+        filtros.append(Pagamento.data_vencimento >= vencimento_de)
+    if vencimento_ate:
+        filtros.append(Pagamento.data_vencimento <= vencimento_ate)
+    if emissao_de:
+        filtros.append(Pagamento.data_emissao >= emissao_de)
+    if emissao_ate:
+        filtros.append(Pagamento.data_emissao <= emissao_ate)
+    if fornecedor_id is not None:
+        filtros.append(Pagamento.fornecedor_id == fornecedor_id)
+    if cliente_id is not None:
+        filtros.append(Pagamento.cliente_id == cliente_id)
+    if valor_min is not None:
+        filtros.append(Pagamento.valor_total >= valor_min)
+    if valor_max is not None:
+        filtros.append(Pagamento.valor_total <= valor_max)
+    return filtros
+
+@router.get("/", response_model=List[Pagamento])
+def read_pagamentos(
+    *,
+    db: Session = Depends(get_db),
+    filtros: List[Any] = Depends(filtros_pagamentos),
+    expandir: List[str] = Depends(expansoes_pagamento),
+    campos: List[str] = Depends(projecao(Pagamento)),
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    ordem: OrdemPagamento = "id",
+    current_user: Usuario = Depends(get_current_user),
+) -> Any:
+    """
+    Recuperar pagamentos, com filtros combináveis.
+
+    Filtra por um ou mais ``status``, faixas de vencimento (``vencimento_de``,
+    ``vencimento_ate``), de emissão (``emissao_de``, ``emissao_ate``) e de
+    ``valor_total`` (``valor_min``, ``valor_max``), ``fornecedor_id`` e
+    ``cliente_id``. Ordena por ``id``, ``vencimento``, ``emissao`` ou ``valor``
+    (desempate por ``id``), com ``-`` na frente para ordem decrescente. Os
+    pagamentos arquivados só aparecem com ``include_archived=true``.
+
+    Aceita paginação por ``skip``/``limit`` ou por ``cursor``; o cursor da
+    próxima página é devolvido no cabeçalho ``X-Next-Cursor`` e vale para os
+    mesmos filtros.
+
+    Com ``expand=fornecedor,cliente`` cada pagamento traz os objetos
+    relacionados, carregados com uma consulta por relacionamento. Com
+    ``fields=id,valor_total`` só essas colunas são lidas e devolvidas.
+    """
+    colunas = ORDENS_PAGAMENTO[ordem.lstrip("-")]
+    # A chave de ordenação sustenta o cursor e as chaves estrangeiras, as expansões
+    chaves = [*colunas, *(getattr(Pagamento, f"{nome}_id") for nome in expandir)]
+    pagamentos, proximo = paginar(
+        db,
+        selecionar(Pagamento, campos, chaves).where(*filtros),
+        ordem=ordem,
+        colunas=colunas,
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+        descendente=ordem.startswith("-"),
+    )
+    return resposta_projetada(_projetar_com_expansoes(db, pagamentos, campos, expandir), proximo)
+
+@router.post("/", response_model=Pagamento)
+async def create_pagamento(
+    *,
+    db: AsyncSession = Depends(get_async_db),
+    pagamento_in: Pagamento,
+    background_tasks: BackgroundTasks,
+    execucao: Execucao = Depends(idempotencia("pagamentos.criar")),
+    current_user: Usuario = Depends(get_current_user),
+) -> Any:
+    """
+    Criar novo pagamento.
+
+    Com o cabeçalho ``Idempotency-Key``, repetições com a mesma chave recebem
+    a resposta da primeira sem criar outro pagamento.
+    """
+    if execucao.repeticao is not None:
+        return execucao.repeticao
+
+    # Verificar se o fornecedor existe e está ativo
+    abrir_sessao = fabrica_sessoes_async(db)
+    fornecedor = visivel(
+        await obter_cadastro_async(abrir_sessao, Fornecedor, pagamento_in.fornecedor_id), False
+    )
+    if not fornecedor:
+        raise HTTPException(
+            status_code=404,
+            detail="Fornecedor não encontrado"
+        )
+    
+    # Verificar se o cliente existe e está ativo (se fornecido)
+    if pagamento_in.cliente_id:
+        cliente = visivel(await obter_cadastro_async(abrir_sessao, Cliente, pagamento_in.cliente_id), False)
+        if not cliente:
+            raise HTTPException(
+                status_code=404,
+                detail="Cliente não encontrado"
+            )
+        
+        # Calcular retenção baseado no regime tributário do cliente
+        regras = regras_para(cliente["regime_tributario"], cliente["percentual_retencao"])
+        valor_retencao = regras.total(pagamento_in.valor_total)
+        pagamento_in.valor_retencao = valor_retencao
+        pagamento_in.valor_liquido = pagamento_in.valor_total - valor_retencao
+    
+    pagamento = Pagamento.from_orm(pagamento_in)
+    pagamento.processado_por = current_user.email
+    
+    db.add(pagamento)
+    await db.flush()
+    await db.refresh(pagamento)
+    
+    # O pagamento e a resposta da chave de idempotência vão no mesmo commit
+    resposta = await execucao.concluir(pagamento)
+    
+    # Enfileira o processamento depois da resposta; a reivindicação impede
+    # que a tarefa periódica o envie também
+    if pagamento.status == "PENDENTE":
+        background_tasks.add_task(processar_pagamentos_lote.delay, [pagamento.id])
+    
+    return resposta
+
+@router.post("/bulk", response_model=ResultadoImportacao)
+async def create_pagamentos_bulk(
+    *,
+    request: Request,
+    db: Session = Depends(get_db),
+    background_tasks: BackgroundTasks,
+    execucao: Execucao = Depends(idempotencia("pagamentos.importar")),
+    current_user: Usuario = Depends(get_current_user),
+) -> Any:
+    """
+    Importar pagamentos em lote.
+
+    Aceita uma lista JSON, um CSV no corpo (``text/csv``) ou um arquivo enviado
+    como ``multipart/form-data`` no campo ``arquivo``. Linhas inválidas não
+    impedem a importação das demais; o resultado traz o status de cada linha.
+    Aceita ``Idempotency-Key`` como a criação unitária.
+    """
+    if execucao.repeticao is not None:
+        return execucao.repeticao
+
+    def importar():
+        linhas = ler_json(conteudo) if json_enviado else ler_csv(conteudo)
+        relatorio, pendentes = importar_pagamentos(db, linhas, current_user.email, commit=False)
+        # Resposta já montada, gravada na chave no mesmo commit dos pagamentos;
+        # evita revalidar milhares de linhas no response_model
+        return execucao.concluir_sincrono(db, JSONResponse(relatorio)), pendentes
+
+    try:
+        conteudo, json_enviado = await ler_requisicao(request)
+        # Validação e inserção são síncronas e pesadas: ficam fora do event loop
+        resposta, pendentes = await run_in_threadpool(importar)
+    except ErroImportacao as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if pendentes:
+        # Uma mensagem só para o Celery, publicada depois da resposta; se o
+        # broker falhar, a tarefa periódica processar_pendentes os pega
+        background_tasks.add_task(processar_pagamentos_lote.delay, pendentes)
+    return resposta
+
+@router.get("/export")
+def export_pagamentos(
+    *,
+    db: Session = Depends(get_db),
+    formato: Literal["csv", "ndjson"] = Query("csv", alias="format"),
+    filtros: List[Any] = Depends(filtros_pagamentos),
+    data_vencimento: Optional[date] = None,
+    current_user: Usuario = Depends(get_current_user),
+) -> Any:
+    """
+    Exportar pagamentos em CSV ou NDJSON.
+
+    Aceita os mesmos filtros da listagem e ainda ``data_vencimento`` exata.
+    As linhas são transmitidas em blocos a partir de um cursor do servidor,
+    sem carregar o resultado inteiro em memória.
+    """
+    if data_vencimento:
+        filtros.append(Pagamento.data_vencimento == data_vencimento)
+
+    if formato == "csv":
+        conteudo, media_type = gerar_csv(db, filtros), "text/csv; charset=utf-8"
+    else:
+        conteudo, media_type = gerar_ndjson(db, filtros), "application/x-ndjson"
+    return StreamingResponse(
+        conteudo,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="pagamentos.{formato}"'},
+    )
+
+@router.get("/resumo", response_model=List[LinhaResumo])
+def read_resumo(
+    *,
+    db: Session = Depends(get_db),
+    agrupar: str = "status",
+    status: Optional[str] = None,
+    fornecedor_id: Optional[int] = None,
+    cliente_id: Optional[int] = None,
+    mes_inicio: Optional[date] = None,
+    mes_fim: Optional[date] = None,
+    current_user: Usuario = Depends(get_current_user),
+) -> Any:
+    """
+    Totais dos pagamentos para o painel.
+
+    ``agrupar`` lista, separadas por vírgula, as dimensões entre ``status``,
+    ``mes`` (de vencimento), ``fornecedor_id`` e ``cliente_id``; vazio devolve
+    o total geral. Lê a tabela de resumo, sem percorrer os pagamentos.
+    """
+    dimensoes = [d.strip() for d in agrupar.split(",") if d.strip()]
+    invalidas = sorted(set(dimensoes) - set(DIMENSOES))
+    if invalidas:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Agrupamento inválido: {', '.join(invalidas)}"
+        )
+    return consultar_resumo(
+        db,
+        dimensoes,
+        status=status,
+        fornecedor_id=fornecedor_id,
+        cliente_id=cliente_id,
+        mes_inicio=mes_inicio,
+        mes_fim=mes_fim,
+    )
+
+@router.get("/changes")
+def read_pagamentos_changes(
+    *,
+    db: Session = Depends(get_db),
+    since: Optional[str] = None,
+    limit: int = Query(1000, ge=1, le=10000),
+    campos: List[str] = Depends(projecao(Pagamento)),
+    current_user: Usuario = Depends(get_current_user),
+) -> Any:
+    """
+    Pagamentos criados, alterados ou desativados desde o token ``since``.
+
+    Sem ``since`` devolve todos. A resposta traz os ``itens``, o ``token`` a
+    usar na próxima chamada e ``mais``, que indica outra página disponível.
+    """
+    return RespostaJSON(alteracoes(db, Pagamento, since, limit, campos))
+
+@router.get("/{pagamento_id}", response_model=Pagamento)
+def read_pagamento(
+    *,
+    db: Session = Depends(get_db),
+    pagamento_id: int,
+    expandir: List[str] = Depends(expansoes_pagamento),
+    include_archived: bool = INCLUIR_ARQUIVADOS,
+    current_user: Usuario = Depends(get_current_user),
+) -> Any:
+    """
+    Obter pagamento por ID.
+
+    Aceita ``expand=fornecedor,cliente`` como a listagem. Um pagamento
+    arquivado só é encontrado com ``include_archived=true``.
+    """
+    pagamento = db.get(Pagamento, pagamento_id, options=_carregar_expansoes(expandir))
+    if not pagamento or (pagamento.arquivado and not include_archived):
+        raise HTTPException(status_code=404, detail="Pagamento não encontrado")
+    if expandir:
+        return JSONResponse(_com_expansoes(pagamento, expandir))
+    return pagamento
+
+@router.put("/{pagamento_id}", response_model=Pagamento)
+def update_pagamento(
+    *,
+    db: Session = Depends(get_db),
+    pagamento_id: int,
+    pagamento_in: Pagamento,
+    current_user: Usuario = Depends(get_current_user),
+) -> Any:
+    """
+    Atualizar pagamento.
+    """
+    pagamento = db.get(Pagamento, pagamento_id)
+    if not pagamento:
+        raise HTTPException(status_code=404, detail="Pagamento não encontrado")
+    
+    if pagamento.status != "PENDENTE":
+        raise HTTPException(
+            status_code=400,
+            detail="Apenas pagamentos pendentes podem ser atualizados"
+        )
+    
+    pagamento_data = pagamento_in.dict(exclude_unset=True)
+    for field in pagamento_data:
+        setattr(pagamento, field, pagamento_data[field])
+    
+    db.add(pagamento)
+    db.commit()
+    db.refresh(pagamento)
+    return pagamento
+
+@router.delete("/{pagamento_id}")
+def delete_pagamento(
+    *,
+    db: Session = Depends(get_db),
+    pagamento_id: int,
+    current_user: Usuario = Depends(get_current_user),
+) -> Any:
+    """
+    Cancelar pagamento.
+    """
+    pagamento = db.get(Pagamento, pagamento_id)
+    if not pagamento:
+        raise HTTPException(status_code=404, detail="Pagamento não encontrado")
+    
+    if pagamento.status not in ["PENDENTE", "PROCESSANDO"]:
+        raise HTTPException(
+            status_code=400,
+            detail="Apenas pagamentos pendentes ou em processamento podem ser cancelados"
+        )
+    
+    pagamento.status = "CANCELADO"
+    db.add(pagamento)
+    db.commit()
+    return {"ok": True}
+
+@router.get("/vencimento/{data}", response_model=List[Pagamento])
+def get_pagamentos_by_vencimento(
+    *,
+    db: Session = Depends(get_db),
+    data: date,
+    campos: List[str] = Depends(projecao(Pagamento)),
+    include_archived: bool = INCLUIR_ARQUIVADOS,
+    current_user: Usuario = Depends(get_current_user),
+) -> Any:
+    """
+    Obter pagamentos por data de vencimento.
+    """
+    consulta = _ativos(selecionar(Pagamento, campos), include_archived)
+    pagamentos = db.exec(
+        consulta.where(Pagamento.data_vencimento == data)
+    ).all()
+    return resposta_projetada(projetar(pagamentos, campos))
+
+@router.get("/status/{status}", response_model=List[Pagamento])
+def get_pagamentos_by_status(
+    *,
+    db: Session = Depends(get_db),
+    status: str,
+    campos: List[str] = Depends(projecao(Pagamento)),
+    include_archived: bool = INCLUIR_ARQUIVADOS,
+    current_user: Usuario = Depends(get_current_user),
+) -> Any:
+    """
+    Obter pagamentos por status.
+    """
+    consulta = _ativos(selecionar(Pagamento, campos), include_archived)
+    pagamentos = db.exec(
+        consulta.where(Pagamento.status == status)
+    ).all()
+    return resposta_projetada(projetar(pagamentos, campos))
\ No newline at end of file
@@ -0,0 +1,36 @@
+from typing import Any
+from fastapi import APIRouter, Depends
+from ....core import cache, limite, metricas_banco
+from ....core.deps import get_current_active_superuser
+from ....models.usuario import Usuario
+
+router = APIRouter()
+
+@router.get("/cache")
+def read_cache_stats(
+    current_user: Usuario = Depends(get_current_active_superuser),
+) -> Any:
+    """
+    Acertos, faltas, invalidações e taxa de acerto de cada cache
+    """
+    return cache.estatisticas()
+
+@router.get("/pool")
+def read_pool_stats(
+    current_user: Usuario = Depends(get_current_active_superuser),
+) -> Any:
+    """
+    Conexões em uso, ociosas e em overflow de cada pool, com a espera média e
+    máxima por uma conexão, os checkouts que estouraram o timeout e as
+    instruções SQL lentas
+    """
+    return metricas_banco.estatisticas()
+
+@router.get("/limites")
+def read_limit_stats(
+    current_user: Usuario = Depends(get_current_active_superuser),
+) -> Any:
+    """
+    Tentativas permitidas e recusadas por cada limitador de taxa
+    """
+    return limite.estatisticas()
\ No newline at end of file
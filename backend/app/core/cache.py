@@ -0,0 +1,288 @@
+"""
+Caches de curta duração compartilhados pela aplicação.
+
+``criar_cache`` devolve um cache em memória, por processo, ou no Redis,
+compartilhado entre os workers, conforme ``CACHE_BACKEND``. Os valores precisam
+ser serializáveis em JSON para que os dois backends se comportem igual. Cada
+cache conta acertos, faltas, invalidações e cargas, expostos por
+``estatisticas``.
+
+``obter`` e ``obter_async`` leem do cache e, na falta, carregam e gravam o
+valor (read-through). Faltas simultâneas da mesma chave fazem uma única carga
+(proteção contra stampede): no processo, quem chega depois espera a carga em
+andamento; no Redis, uma trava por chave (``SET NX``) também segura os
+demais workers, que esperam o valor aparecer por até ``ESPERA_CARGA``
+segundos antes de carregar por conta própria.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+import redis
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class EstatisticasCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.faltas = 0
+        self.invalidacoes = 0
+        self.cargas = 0
+
+    def contar(self, campo: str) -> None:
+        with self._lock:
+            setattr(self, campo, getattr(self, campo) + 1)
+
+    def como_dict(self) -> Dict[str, Any]:
+        consultas = self.acertos + self.faltas
+        return {
+            "acertos": self.acertos,
+            "faltas": self.faltas,
+            "invalidacoes": self.invalidacoes,
+            "cargas": self.cargas,
+            "taxa_acerto": round(self.acertos / consultas, 4) if consultas else 0.0,
+        }
+
+
+# Travas por chave para as cargas no processo, distribuídas por hash
+TRAVAS_CARGA = 64
+ESPERA_CARGA = 0.5  # segundos esperando a carga de outro worker (Redis)
+INTERVALO_ESPERA = 0.01
+
+
+class LeituraComCarga:
+    """
+    Read-through com uma carga por chave de cada vez. As subclasses
+    implementam ``_ler`` (sem contar estatísticas), ``get``, ``set`` e,
+    quando há outros processos, ``_reservar_carga``/``_liberar_carga``.
+    """
+
+    def _iniciar_cargas(self) -> None:
+        self._travas = [threading.Lock() for _ in range(TRAVAS_CARGA)]
+        self._cargas_async: Dict[str, "asyncio.Task"] = {}
+
+    def _reservar_carga(self, chave: str) -> bool:
+        return True
+
+    def _liberar_carga(self, chave: str) -> None:
+        pass
+
+    def _gravar_carga(self, chave: str, valor: Any, ttl: Optional[int]) -> Any:
+        self.estatisticas.contar("cargas")
+        # Ausências não ficam no cache: None é indistinguível de uma falta
+        if valor is not None:
+            self.set(chave, valor, ttl)
+        return valor
+
+    def obter(self, chave: str, carregar: Callable[[], Any], ttl: Optional[int] = None) -> Any:
+        valor = self.get(chave)
+        if valor is not None:
+            return valor
+        with self._travas[hash(chave) % TRAVAS_CARGA]:
+            # Quem esperou a trava encontra o valor gravado por quem carregou
+            valor = self._ler(chave)
+            if valor is not None:
+                return valor
+            reservada = self._reservar_carga(chave)
+            try:
+                if not reservada:
+                    limite = time.monotonic() + ESPERA_CARGA
+                    while time.monotonic() < limite:
+                        time.sleep(INTERVALO_ESPERA)
+                        valor = self._ler(chave)
+                        if valor is not None:
+                            return valor
+                return self._gravar_carga(chave, carregar(), ttl)
+            finally:
+                if reservada:
+                    self._liberar_carga(chave)
+
+    async def obter_async(
+        self, chave: str, carregar: Callable[[], Awaitable[Any]], ttl: Optional[int] = None
+    ) -> Any:
+        valor = self.get(chave)
+        if valor is not None:
+            return valor
+        loop = asyncio.get_running_loop()
+        tarefa = self._cargas_async.get(chave)
+        if tarefa is None or tarefa.get_loop() is not loop:
+            tarefa = loop.create_task(self._carregar_async(chave, carregar, ttl))
+            self._cargas_async[chave] = tarefa
+
+            def encerrar(concluida: "asyncio.Task") -> None:
+                if self._cargas_async.get(chave) is concluida:
+                    del self._cargas_async[chave]
+
+            tarefa.add_done_callback(encerrar)
+        # shield: o cancelamento de um dos que esperam não cancela a carga dos demais
+        return await asyncio.shield(tarefa)
+
+    async def _carregar_async(
+        self, chave: str, carregar: Callable[[], Awaitable[Any]], ttl: Optional[int]
+    ) -> Any:
+        reservada = self._reservar_carga(chave)
+        try:
+            if not reservada:
+                limite = time.monotonic() + ESPERA_CARGA
+                while time.monotonic() < limite:
+                    await asyncio.sleep(INTERVALO_ESPERA)
+                    valor = self._ler(chave)
+                    if valor is not None:
+                        return valor
+            return self._gravar_carga(chave, await carregar(), ttl)
+        finally:
+            if reservada:
+                self._liberar_carga(chave)
+
+
+class CacheMemoria(LeituraComCarga):
+    """Cache LRU com TTL no próprio processo."""
+
+    backend = "memoria"
+
+    def __init__(self, nome: str, ttl: int, maximo: int = 10_000):
+        self.nome = nome
+        self.ttl = ttl
+        self.maximo = maximo
+        self.estatisticas = EstatisticasCache()
+        self._lock = threading.Lock()
+        self._itens: "OrderedDict[str, tuple]" = OrderedDict()
+        self._iniciar_cargas()
+
+    def _ler(self, chave: str) -> Optional[Any]:
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is not None and item[0] > time.monotonic():
+                self._itens.move_to_end(chave)
+                return item[1]
+            if item is not None:
+                del self._itens[chave]
+        return None
+
+    def get(self, chave: str) -> Optional[Any]:
+        valor = self._ler(chave)
+        self.estatisticas.contar("faltas" if valor is None else "acertos")
+        return valor
+
+    def set(self, chave: str, valor: Any, ttl: Optional[int] = None) -> None:
+        expira = time.monotonic() + (ttl or self.ttl)
+        with self._lock:
+            self._itens[chave] = (expira, valor)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.maximo:
+                self._itens.popitem(last=False)
+
+    def delete(self, chave: str) -> None:
+        with self._lock:
+            self._itens.pop(chave, None)
+        self.estatisticas.contar("invalidacoes")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._itens.clear()
+
+
+class CacheRedis(LeituraComCarga):
+    """
+    Cache no Redis, com as chaves prefixadas por ``cache:<nome>:``.
+
+    Falhas de conexão são tratadas como falta: o chamador segue para o banco
+    em vez de devolver erro. As estatísticas são do processo. ``cliente``
+    permite usar outro cliente com a mesma interface (nos testes, um dublê
+    em memória).
+    """
+
+    backend = "redis"
+
+    def __init__(self, nome: str, ttl: int, cliente: Optional[redis.Redis] = None):
+        self.nome = nome
+        self.ttl = ttl
+        self.estatisticas = EstatisticasCache()
+        self._prefixo = f"cache:{nome}:"
+        self._cliente = cliente or redis.Redis(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            db=settings.REDIS_CACHE_DB,
+            socket_timeout=settings.REDIS_CACHE_TIMEOUT,
+            socket_connect_timeout=settings.REDIS_CACHE_TIMEOUT,
+        )
+        self._iniciar_cargas()
+
+    def _ler(self, chave: str) -> Optional[Any]:
+        try:
+            bruto = self._cliente.get(self._prefixo + chave)
+        except redis.RedisError:
+            logger.warning("Redis indisponível ao ler o cache %s", self.nome, exc_info=True)
+            return None
+        return None if bruto is None else json.loads(bruto)
+
+    def get(self, chave: str) -> Optional[Any]:
+        valor = self._ler(chave)
+        self.estatisticas.contar("faltas" if valor is None else "acertos")
+        return valor
+
+    def _reservar_carga(self, chave: str) -> bool:
+        try:
+            # Expira sozinha se o worker morrer no meio da carga
+            return bool(self._cliente.set(
+                f"{self._prefixo}carga:{chave}", 1, nx=True, px=int(ESPERA_CARGA * 2000)
+            ))
+        except redis.RedisError:
+            # Sem Redis não há como coordenar: carrega
+            return True
+
+    def _liberar_carga(self, chave: str) -> None:
+        try:
+            self._cliente.delete(f"{self._prefixo}carga:{chave}")
+        except redis.RedisError:
+            logger.warning("Redis indisponível ao liberar a carga de %s", self.nome, exc_info=True)
+
+    def set(self, chave: str, valor: Any, ttl: Optional[int] = None) -> None:
+        try:
+            self._cliente.set(self._prefixo + chave, json.dumps(valor), ex=ttl or self.ttl)
+        except redis.RedisError:
+            logger.warning("Redis indisponível ao gravar o cache %s", self.nome, exc_info=True)
+
+    def delete(self, chave: str) -> None:
+        try:
+            self._cliente.delete(self._prefixo + chave)
+        except redis.RedisError:
+            logger.warning("Redis indisponível ao invalidar o cache %s", self.nome, exc_info=True)
+        self.estatisticas.contar("invalidacoes")
+
+    def clear(self) -> None:
+        try:
+            for chave in self._cliente.scan_iter(match=self._prefixo + "*"):
+                self._cliente.delete(chave)
+        except redis.RedisError:
+            logger.warning("Redis indisponível ao limpar o cache %s", self.nome, exc_info=True)
+
+
+_caches: Dict[str, Any] = {}
+
+def criar_cache(nome: str, ttl: int, maximo: int = 10_000) -> Any:
+    """Cria (ou devolve o já criado) cache ``nome`` no backend configurado."""
+    if nome not in _caches:
+        if settings.CACHE_BACKEND == "redis":
+            _caches[nome] = CacheRedis(nome, ttl)
+        else:
+            _caches[nome] = CacheMemoria(nome, ttl, maximo)
+    return _caches[nome]
+
+def estatisticas() -> Dict[str, Dict[str, Any]]:
+    return {
+        nome: {"backend": cache.backend, "ttl": cache.ttl, **cache.estatisticas.como_dict()}
+        for nome, cache in _caches.items()
+    }
+
+def limpar_caches() -> None:
+    """Esvazia todos os caches e zera as estatísticas."""
+    for cache in _caches.values():
+        cache.clear()
+        cache.estatisticas = EstatisticasCache()
\ No newline at end of file
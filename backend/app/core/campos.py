@@ -0,0 +1,70 @@
+"""
+Projeção de colunas (sparse fieldsets) nas listagens.
+
+As listagens selecionam colunas, não entidades: sem ``fields``, todas as
+colunas visíveis do modelo; com ``fields=id,nome``, só essas. A resposta é
+montada direto das linhas do banco, sem instanciar os modelos do ORM nem
+revalidá-los no ``response_model``, e codificada com orjson. Campos que não
+são colunas do modelo, ou que o modelo marca com ``exclude=True`` (como
+``termo_busca``), são recusados.
+"""
+from functools import lru_cache
+from typing import Any, Callable, Iterable, List, Optional, Sequence, Type
+from fastapi import HTTPException, Query
+from sqlalchemy import select
+from .paginacao import CURSOR_HEADER
+from .serializacao import RespostaJSON
+
+@lru_cache(maxsize=None)
+def campos_permitidos(modelo: Type[Any]) -> List[str]:
+    """Colunas do modelo que podem ser pedidas, na ordem de declaração."""
+    colunas = modelo.__table__.c
+    return [
+        nome for nome, campo in modelo.__fields__.items()
+        if nome in colunas and not campo.field_info.exclude
+    ]
+
+def projecao(modelo: Type[Any]) -> Callable[..., List[str]]:
+    """Dependência que lê ``fields``; sem ele, devolve todos os campos permitidos."""
+    permitidos = campos_permitidos(modelo)
+
+    def campos_pedidos(
+        fields: Optional[str] = Query(
+            None, description=f"Campos separados por vírgula: {', '.join(permitidos)}"
+        ),
+    ) -> List[str]:
+        if fields is None:
+            return permitidos
+        pedidos = list(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+        invalidos = sorted(set(pedidos) - set(permitidos))
+        if invalidos:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Campo inválido: {', '.join(invalidos)}"
+            )
+        if not pedidos:
+            raise HTTPException(status_code=400, detail="Informe ao menos um campo")
+        return pedidos
+
+    return campos_pedidos
+
+def selecionar(modelo: Type[Any], campos: Sequence[str], extras: Iterable[Any] = ()) -> Any:
+    """
+    ``SELECT`` só das colunas pedidas e das ``extras`` (chave de ordenação do
+    cursor, chaves estrangeiras das expansões), sem repetir. Sempre devolve
+    linhas, mesmo com uma coluna só (o ``select`` do SQLModel daria escalares).
+    """
+    colunas = modelo.__table__.c
+    nomes = dict.fromkeys([*campos, *(c.key for c in extras)])
+    return select(*[colunas[nome] for nome in nomes])
+
+def projetar(linhas: Iterable[Any], campos: Sequence[str]) -> List[dict]:
+    """
+    Linhas de ``selecionar`` como dicionários só com os campos pedidos (que
+    vêm primeiro na linha; as colunas extras ficam de fora).
+    """
+    return [dict(zip(campos, linha)) for linha in linhas]
+
+def resposta_projetada(itens: List[dict], proximo: Optional[str] = None) -> RespostaJSON:
+    # Os itens já têm só os campos pedidos; não passam pelo response_model
+    return RespostaJSON(itens, headers={CURSOR_HEADER: proximo} if proximo else None)
\ No newline at end of file
@@ -1,25 +1,52 @@
-from celery import Celery
-from .config import settings
-
-celery_app = Celery(
-    "worker",
-    broker=f"redis://{settings.REDIS_HOST}:{settings.REDIS_PORT}/0",
-    include=["app.services.pagamento"]
-)
-
-# Configurações opcionais
-celery_app.conf.update(
-    task_serializer="json",
-    accept_content=["json"],
-    result_serializer="json",
-    timezone="America/Sao_Paulo",
-    enable_utc=True,
-)
-
-# Configurar tarefas periódicas
-celery_app.conf.beat_schedule = {
-    'verificar-pagamentos-vencidos': {
-        'task': 'app.services.pagamento.verificar_pagamentos_vencidos',
-        'schedule': 3600.0,  # Executa a cada hora
-    },
-} 
\ No newline at end of file
+from celery import Celery
+from celery.signals import worker_init, worker_process_init
+from .config import settings
+from .database import usar_perfil_worker
+from .metricas import servir_metricas_worker
+
+celery_app = Celery(
+    "worker",
+    broker=f"redis://{settings.REDIS_HOST}:{settings.REDIS_PORT}/0",
+    include=["app.services.pagamento"]
+)
+
+# Configurações opcionais
+celery_app.conf.update(
+    task_serializer="json",
+    accept_content=["json"],
+    result_serializer="json",
+    timezone="America/Sao_Paulo",
+    enable_utc=True,
+)
+
+# Configurar tarefas periódicas
+celery_app.conf.beat_schedule = {
+    'verificar-pagamentos-vencidos': {
+        'task': 'app.services.pagamento.verificar_pagamentos_vencidos',
+        'schedule': 3600.0,  # Executa a cada hora
+    },
+    'processar-pagamentos-pendentes': {
+        'task': 'app.services.pagamento.processar_pendentes',
+        'schedule': 60.0,  # Executa a cada minuto
+    },
+    'limpar-chaves-idempotencia': {
+        'task': 'app.services.pagamento.limpar_chaves_idempotencia',
+        'schedule': 3600.0,  # Executa a cada hora
+    },
+    'arquivar-pagamentos-quitados': {
+        'task': 'app.services.pagamento.arquivar_pagamentos_quitados',
+        'schedule': 86400.0,  # Executa uma vez por dia
+    },
+}
+
+# Perfil de pool dos workers: no processo principal (pool solo ou threads) e
+# em cada processo filho do prefork, que não pode reutilizar as conexões do pai
+@worker_init.connect
+@worker_process_init.connect
+def configurar_processo_worker(**kwargs) -> None:
+    usar_perfil_worker()
+
+@worker_init.connect
+def iniciar_metricas_worker(**kwargs) -> None:
+    if settings.METRICAS_CELERY_PORTA:
+        servir_metricas_worker(settings.METRICAS_CELERY_PORTA)
\ No newline at end of file
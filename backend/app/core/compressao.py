@@ -0,0 +1,116 @@
+"""
+Compressão das respostas com brotli ou gzip, conforme o ``Accept-Encoding``.
+
+Respostas menores que ``COMPRESSAO_MINIMO`` bytes e respostas que já têm
+``Content-Encoding`` passam sem alteração. Respostas em streaming (como a
+exportação) são comprimidas bloco a bloco, com um flush a cada bloco para
+que o cliente receba os dados sem esperar o fim.
+"""
+import zlib
+from typing import Optional
+import brotli
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from .config import settings
+
+# Em ordem de preferência
+CODIFICACOES = ("br", "gzip")
+
+def escolher_codificacao(accept_encoding: str) -> Optional[str]:
+    aceitas = set()
+    for item in accept_encoding.lower().split(","):
+        nome, _, parametro = item.partition(";")
+        chave, _, valor = parametro.strip().partition("=")
+        try:
+            if chave == "q" and float(valor) == 0:
+                continue  # recusada explicitamente
+        except ValueError:
+            continue
+        aceitas.add(nome.strip())
+    return next((c for c in CODIFICACOES if c in aceitas), None)
+
+class _Compressor:
+    def __init__(self, codificacao: str):
+        if codificacao == "br":
+            compressor = brotli.Compressor(quality=settings.BROTLI_QUALIDADE)
+            self.comprimir = compressor.process
+            self.descarregar = compressor.flush
+            self.terminar = compressor.finish
+        else:
+            # wbits=31: cabeçalho e rodapé gzip
+            compressor = zlib.compressobj(settings.GZIP_NIVEL, zlib.DEFLATED, 31)
+            self.comprimir = compressor.compress
+            self.descarregar = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+            self.terminar = compressor.flush
+
+class CompressaoMiddleware:
+    def __init__(self, app: ASGIApp, minimo: int = 1024) -> None:
+        self.app = app
+        self.minimo = minimo
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            codificacao = escolher_codificacao(Headers(scope=scope).get("accept-encoding", ""))
+            if codificacao:
+                await _Compressao(self.app, codificacao, self.minimo)(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+class _Compressao:
+    def __init__(self, app: ASGIApp, codificacao: str, minimo: int) -> None:
+        self.app = app
+        self.codificacao = codificacao
+        self.minimo = minimo
+        self.send: Optional[Send] = None
+        self.inicio: Message = {}
+        self.compressor: Optional[_Compressor] = None
+        self.repassar = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.enviar)
+
+    def _cabecalhos_comprimidos(self) -> MutableHeaders:
+        headers = MutableHeaders(raw=self.inicio["headers"])
+        headers["Content-Encoding"] = self.codificacao
+        headers.add_vary_header("Accept-Encoding")
+        return headers
+
+    async def enviar(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            # Os cabeçalhos só vão depois de decidir se o corpo será comprimido
+            self.inicio = message
+            self.repassar = "content-encoding" in Headers(raw=message["headers"])
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        corpo = message.get("body", b"")
+        continua = message.get("more_body", False)
+        if self.repassar:
+            if self.inicio:
+                await self.send(self.inicio)
+                self.inicio = {}
+            await self.send(message)
+        elif self.compressor is None and not continua:
+            # Corpo inteiro numa mensagem só
+            if len(corpo) < self.minimo:
+                await self.send(self.inicio)
+                await self.send(message)
+                return
+            compressor = _Compressor(self.codificacao)
+            corpo = compressor.comprimir(corpo) + compressor.terminar()
+            headers = self._cabecalhos_comprimidos()
+            headers["Content-Length"] = str(len(corpo))
+            await self.send(self.inicio)
+            await self.send({"type": "http.response.body", "body": corpo})
+        else:
+            if self.compressor is None:
+                self.compressor = _Compressor(self.codificacao)
+                headers = self._cabecalhos_comprimidos()
+                del headers["Content-Length"]
+                await self.send(self.inicio)
+            dados = self.compressor.comprimir(corpo)
+            dados += self.compressor.descarregar() if continua else self.compressor.terminar()
+            await self.send({"type": "http.response.body", "body": dados, "more_body": continua})
\ No newline at end of file
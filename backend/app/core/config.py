@@ -1,49 +1,142 @@
-from typing import Any, Dict, Optional
-from pydantic import BaseSettings, PostgresDsn, validator
-from pydantic.networks import AnyHttpUrl
-
-class Settings(BaseSettings):
-    PROJECT_NAME: str = "Sistema Claudio Figueiredo"
-    API_V1_STR: str = "/api/v1"
-    
-    # SECURITY
-    SECRET_KEY: str = "your-secret-key-here"  # change in production
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8  # 8 days
-    
-    # DATABASE
-    POSTGRES_SERVER: str = "localhost"
-    POSTGRES_USER: str = "postgres"
-    POSTGRES_PASSWORD: str = "postgres"
-    POSTGRES_DB: str = "sistema_claudio"
-    SQLALCHEMY_DATABASE_URI: Optional[PostgresDsn] = None
-
-    @validator("SQLALCHEMY_DATABASE_URI", pre=True)
-    def assemble_db_connection(cls, v: Optional[str], values: Dict[str, Any]) -> Any:
-        if isinstance(v, str):
-            return v
-        return PostgresDsn.build(
-            scheme="postgresql",
-            user=values.get("POSTGRES_USER"),
-            password=values.get("POSTGRES_PASSWORD"),
-            host=values.get("POSTGRES_SERVER"),
-            path=f"/{values.get('POSTGRES_DB') or ''}",
-        )
-    
-    # REDIS
-    REDIS_HOST: str = "localhost"
-    REDIS_PORT: int = 6379
-    
-    # CORS
-    BACKEND_CORS_ORIGINS: list[AnyHttpUrl] = []
-
-    @validator("BACKEND_CORS_ORIGINS", pre=True)
-    def assemble_cors_origins(cls, v: str | list[str]) -> list[str]:
-        if isinstance(v, str):
-            return [i.strip() for i in v.split(",")]
-        return v
-
-    class Config:
-        case_sensitive = True
-        env_file = ".env"
-
+import os
+from typing import Any, Dict, Optional
+from pydantic import BaseSettings, PostgresDsn, validator
+from pydantic.networks import AnyHttpUrl
+
+class Settings(BaseSettings):
+    PROJECT_NAME: str = "Sistema Claudio Figueiredo"
+    API_V1_STR: str = "/api/v1"
+    
+    # SECURITY
+    SECRET_KEY: str = "your-secret-key-here"  # change in production
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8  # 8 days
+
+    # Hash de senhas: o primeiro esquema é usado para novos hashes; os demais
+    # continuam aceitos e são convertidos no próximo login bem-sucedido
+    PASSWORD_SCHEMES: list[str] = ["bcrypt"]
+    BCRYPT_ROUNDS: int = 12
+    ARGON2_TIME_COST: int = 3
+    ARGON2_MEMORY_COST: int = 65536  # KiB
+    ARGON2_PARALLELISM: int = 1
+    # Threads dedicadas ao hash; limita quantos hashes rodam ao mesmo tempo.
+    # Por padrão metade das CPUs, para sobrar processador ao event loop
+    PASSWORD_HASH_WORKERS: Optional[int] = None
+
+    @validator("PASSWORD_HASH_WORKERS", pre=True, always=True)
+    def default_password_hash_workers(cls, v: Optional[int]) -> int:
+        if v:
+            return int(v)
+        return max(1, (os.cpu_count() or 1) // 2)
+    
+    # LIMITE DE TENTATIVAS de login e 2FA, antes de qualquer hash de senha:
+    # balde por IP e por conta, com a rajada e a reposição por minuto. Logins
+    # bem-sucedidos devolvem a ficha; só as falhas esgotam o balde
+    LOGIN_LIMITE_ATIVO: bool = True
+    LOGIN_LIMITE_IP: int = 30
+    LOGIN_LIMITE_IP_POR_MINUTO: float = 30
+    LOGIN_LIMITE_CONTA: int = 5
+    LOGIN_LIMITE_CONTA_POR_MINUTO: float = 1
+    # Hashes aguardando uma thread livre, por processo, além dos em execução;
+    # com a fila cheia o login é recusado na hora em vez de esperar
+    LOGIN_HASH_FILA: int = 8
+
+    # DATABASE
+    POSTGRES_SERVER: str = "localhost"
+    POSTGRES_USER: str = "postgres"
+    POSTGRES_PASSWORD: str = "postgres"
+    POSTGRES_DB: str = "sistema_claudio"
+    SQLALCHEMY_DATABASE_URI: Optional[PostgresDsn] = None
+
+    @validator("SQLALCHEMY_DATABASE_URI", pre=True)
+    def assemble_db_connection(cls, v: Optional[str], values: Dict[str, Any]) -> Any:
+        if isinstance(v, str):
+            return v
+        return PostgresDsn.build(
+            scheme="postgresql",
+            user=values.get("POSTGRES_USER"),
+            password=values.get("POSTGRES_PASSWORD"),
+            host=values.get("POSTGRES_SERVER"),
+            path=f"/{values.get('POSTGRES_DB') or ''}",
+        )
+
+    # POOL DE CONEXÕES, por processo. A API usa o perfil principal; os
+    # workers do Celery, que rodam uma tarefa por processo, o DB_WORKER_*
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 10  # segundos esperando uma conexão livre
+    DB_POOL_RECYCLE: int = 1800  # segundos; reabre conexões mais antigas
+    DB_WORKER_POOL_SIZE: int = 2
+    DB_WORKER_MAX_OVERFLOW: int = 2
+    # LOG DE SQL: echo escreve todas as instruções (só para desenvolvimento);
+    # em produção, as lentas e uma fração das demais vão para o logger app.sql
+    DB_ECHO: bool = False
+    DB_SQL_LENTO_MS: Optional[float] = 500
+    DB_SQL_AMOSTRA: float = 0.0  # 0 a 1
+
+    # Endpoints assíncronos usam AsyncSession (asyncpg/aiosqlite) quando
+    # ligado; desligado, usam a sessão síncrona executada no threadpool
+    DATABASE_ASYNC: bool = True
+    ASYNC_SQLALCHEMY_DATABASE_URI: Optional[str] = None
+
+    @validator("ASYNC_SQLALCHEMY_DATABASE_URI", pre=True)
+    def assemble_async_db_connection(cls, v: Optional[str], values: Dict[str, Any]) -> Any:
+        if isinstance(v, str):
+            return v
+        uri = str(values.get("SQLALCHEMY_DATABASE_URI") or "")
+        return uri.replace("postgresql://", "postgresql+asyncpg://", 1)
+    
+    # SINCRONIZAÇÃO INCREMENTAL: só entrega alterações mais antigas que isto,
+    # para não pular escritas cujo commit ainda não aconteceu
+    SINCRONIZACAO_MARGEM: int = 5  # segundos
+
+    # PROCESSAMENTO DE PAGAMENTOS
+    PAGAMENTO_LOTE: int = 100  # pagamentos reivindicados por vez por worker
+    PAGAMENTO_CONCORRENCIA: int = 20  # envios simultâneos ao gateway por worker
+    # Segundos em PROCESSANDO até a reivindicação expirar e o pagamento voltar
+    # a PENDENTE (worker que caiu no meio do lote); bem acima da duração de um lote
+    PAGAMENTO_REIVINDICACAO_MAX: int = 600
+    # Quitados (PAGO, CANCELADO) com vencimento há mais de tantos meses vão
+    # para a partição de arquivo, fora das consultas sem include_archived
+    ARQUIVAMENTO_MESES: int = 12
+
+    # IDEMPOTÊNCIA das criações (cabeçalho Idempotency-Key)
+    IDEMPOTENCIA_TTL: int = 86400  # segundos que a resposta fica guardada
+    IDEMPOTENCIA_ESPERA: float = 10  # segundos aguardando a mesma chave em execução
+    IDEMPOTENCIA_EXECUCAO_MAX: int = 300  # segundos até uma execução abandonada liberar a chave
+
+    # REDIS
+    REDIS_HOST: str = "localhost"
+    REDIS_PORT: int = 6379
+
+    # CACHE: "memoria" (por processo) ou "redis" (compartilhado entre workers)
+    CACHE_BACKEND: str = "memoria"
+    REDIS_CACHE_DB: int = 1
+    REDIS_CACHE_TIMEOUT: float = 0.1  # segundos
+    # Usuário autenticado em cache; alterações pelo ORM invalidam na hora
+    PRINCIPAL_CACHE_TTL: int = 60
+    # Clientes e fornecedores lidos por id e por categoria; os endpoints de
+    # escrita invalidam na hora
+    CADASTRO_CACHE_TTL: int = 300
+    
+    # COMPRESSÃO das respostas (brotli ou gzip, conforme o Accept-Encoding)
+    COMPRESSAO_MINIMO: int = 1024  # bytes; respostas menores vão sem compressão
+    GZIP_NIVEL: int = 6
+    BROTLI_QUALIDADE: int = 4
+
+    # MÉTRICAS: porta do /metrics dos workers do Celery (a API usa a própria)
+    METRICAS_CELERY_PORTA: Optional[int] = 9808
+
+    # CORS
+    BACKEND_CORS_ORIGINS: list[AnyHttpUrl] = []
+
+    @validator("BACKEND_CORS_ORIGINS", pre=True)
+    def assemble_cors_origins(cls, v: str | list[str]) -> list[str]:
+        if isinstance(v, str):
+            return [i.strip() for i in v.split(",")]
+        return v
+
+    class Config:
+        case_sensitive = True
+        env_file = ".env"
+
 settings = Settings() 
\ No newline at end of file
@@ -1,15 +1,142 @@
-from sqlmodel import SQLModel, create_engine, Session
-from .config import settings
-
-engine = create_engine(
-    str(settings.SQLALCHEMY_DATABASE_URI),
-    echo=True,
-    pool_pre_ping=True
-)
-
-def init_db() -> None:
-    SQLModel.metadata.create_all(engine)
-
-def get_session():
-    with Session(engine) as session:
-        yield session 
\ No newline at end of file
+from contextlib import asynccontextmanager
+from typing import Any, AsyncContextManager, AsyncGenerator, AsyncIterator, Callable, Dict
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from . import metricas_banco
+from .config import settings
+
+def opcoes_pool(perfil: str = "api") -> Dict[str, Any]:
+    """Opções de pool e log das engines do perfil ``api`` ou ``worker``."""
+    worker = perfil == "worker"
+    return {
+        "echo": settings.DB_ECHO,
+        "pool_pre_ping": True,
+        "pool_size": settings.DB_WORKER_POOL_SIZE if worker else settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_WORKER_MAX_OVERFLOW if worker else settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+
+def criar_engine(perfil: str = "api") -> Engine:
+    engine = create_engine(
+        str(settings.SQLALCHEMY_DATABASE_URI),
+        poolclass=metricas_banco.QueuePoolMedido,
+        **opcoes_pool(perfil),
+    )
+    metricas_banco.instrumentar_sql(engine)
+    metricas_banco.registrar(perfil, engine)
+    return engine
+
+def criar_async_engine(perfil: str = "api") -> Any:
+    engine = create_async_engine(
+        settings.ASYNC_SQLALCHEMY_DATABASE_URI,
+        poolclass=metricas_banco.AsyncQueuePoolMedido,
+        **opcoes_pool(perfil),
+    )
+    metricas_banco.instrumentar_sql(engine.sync_engine)
+    metricas_banco.registrar(f"{perfil}_async", engine.sync_engine)
+    return engine
+
+engine = criar_engine()
+
+async_engine = criar_async_engine() if settings.DATABASE_ASYNC else None
+
+def usar_perfil_worker() -> None:
+    """
+    Troca a engine do processo pela do perfil ``worker``. Chamada no início
+    de cada processo do Celery: as conexões herdadas do processo pai no fork
+    são abandonadas sem fechar, porque pertencem a ele.
+    """
+    global engine
+    engine.dispose(close=False)
+    metricas_banco.remover("api")
+    engine = criar_engine("worker")
+
+def init_db() -> None:
+    from ..services.busca import criar_indices_trigrama
+
+    SQLModel.metadata.create_all(engine)
+    criar_indices_trigrama(engine)
+
+def get_session():
+    with Session(engine) as session:
+        yield session
+
+class SessaoEmThreadpool:
+    """
+    Mesma interface do ``AsyncSession`` sobre uma ``Session`` síncrona.
+
+    Cada operação que toca o banco roda no threadpool, então o event loop
+    continua livre mesmo sem driver assíncrono (``DATABASE_ASYNC=False``).
+    """
+
+    def __init__(self, session: Session):
+        self.sync_session = session
+
+    def add(self, instance: Any) -> None:
+        self.sync_session.add(instance)
+
+    def add_all(self, instances: Any) -> None:
+        self.sync_session.add_all(instances)
+
+    def expunge(self, instance: Any) -> None:
+        self.sync_session.expunge(instance)
+
+    async def exec(self, statement: Any, **kwargs: Any) -> Any:
+        return await run_in_threadpool(self.sync_session.exec, statement, **kwargs)
+
+    async def execute(self, statement: Any, *args: Any, **kwargs: Any) -> Any:
+        return await run_in_threadpool(self.sync_session.execute, statement, *args, **kwargs)
+
+    async def get(self, *args: Any, **kwargs: Any) -> Any:
+        return await run_in_threadpool(self.sync_session.get, *args, **kwargs)
+
+    async def refresh(self, instance: Any, *args: Any, **kwargs: Any) -> None:
+        await run_in_threadpool(self.sync_session.refresh, instance, *args, **kwargs)
+
+    async def delete(self, instance: Any) -> None:
+        await run_in_threadpool(self.sync_session.delete, instance)
+
+    async def flush(self) -> None:
+        await run_in_threadpool(self.sync_session.flush)
+
+    async def commit(self) -> None:
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self) -> None:
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def close(self) -> None:
+        await run_in_threadpool(self.sync_session.close)
+
+    async def run_sync(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
+
+def fabrica_sessoes_async(db: Any) -> Callable[[], AsyncContextManager]:
+    """
+    Abre sessões novas na engine de ``db`` (``AsyncSession`` ou
+    ``SessaoEmThreadpool``), para trabalho compartilhado entre requisições:
+    fechar ``db`` quando a sua requisição termina não afeta essas sessões.
+    """
+    if isinstance(db, SessaoEmThreadpool):
+        engine_sync = db.sync_session.bind
+
+        @asynccontextmanager
+        async def abrir() -> AsyncIterator[SessaoEmThreadpool]:
+            with Session(engine_sync, expire_on_commit=False) as session:
+                yield SessaoEmThreadpool(session)
+
+        return abrir
+    engine_async = db.bind
+    return lambda: AsyncSession(engine_async, expire_on_commit=False)
+
+async def get_async_session() -> AsyncGenerator:
+    if async_engine is not None:
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            yield session
+    else:
+        with Session(engine, expire_on_commit=False) as session:
+            yield SessaoEmThreadpool(session)
\ No newline at end of file
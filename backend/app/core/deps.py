@@ -1,65 +1,110 @@
-from typing import Generator, Optional
-from fastapi import Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer
-from jose import jwt, JWTError
-from sqlmodel import Session
-from .database import get_session
-from .config import settings
-from .security import verify_2fa_code
-from ..models.usuario import Usuario
-from ..schemas.auth import TokenPayload
-
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
-
-def get_db() -> Generator:
-    try:
-        db = next(get_session())
-        yield db
-    finally:
-        db.close()
-
-async def get_current_user(
-    db: Session = Depends(get_db),
-    token: str = Depends(oauth2_scheme)
-) -> Usuario:
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Não foi possível validar as credenciais",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=["HS256"]
-        )
-        token_data = TokenPayload(**payload)
-    except JWTError:
-        raise credentials_exception
-    
-    user = db.get(Usuario, token_data.sub)
-    if not user:
-        raise credentials_exception
-    if not user.is_active:
-        raise HTTPException(status_code=400, detail="Usuário inativo")
-    return user
-
-def get_current_active_superuser(
-    current_user: Usuario = Depends(get_current_user),
-) -> Usuario:
-    if not current_user.is_superuser:
-        raise HTTPException(
-            status_code=400, detail="O usuário não tem privilégios suficientes"
-        )
-    return current_user
-
-async def verify_2fa(
-    user: Usuario,
-    code: str,
-) -> bool:
-    if not user.two_factor_enabled:
-        return True
-    if not user.two_factor_secret:
-        raise HTTPException(
-            status_code=400,
-            detail="2FA está habilitado mas não configurado corretamente"
-        )
-    return verify_2fa_code(user.two_factor_secret, code) 
\ No newline at end of file
+from typing import Any, AsyncGenerator, Dict, Generator
+from fastapi import Depends, HTTPException, status
+from fastapi.security import OAuth2PasswordBearer
+from jose import jwt, JWTError
+from sqlalchemy import event
+from sqlalchemy.orm import Session as SessaoOrm, object_session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from .cache import criar_cache
+from .database import get_async_session, get_session
+from .config import settings
+from .security import verify_2fa_code
+from ..models.usuario import Usuario
+from ..schemas.auth import TokenPayload
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
+
+def get_db() -> Generator:
+    try:
+        db = next(get_session())
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db() -> AsyncGenerator:
+    async for db in get_async_session():
+        yield db
+
+# Dados do usuário autenticado por id, para não reler a linha a cada requisição
+cache_principais = criar_cache("principais", settings.PRINCIPAL_CACHE_TTL)
+CAMPOS_PRINCIPAL = ("id", "email", "nome", "is_active", "is_superuser", "two_factor_enabled")
+
+def _principal(user: Usuario) -> Dict[str, Any]:
+    return {campo: getattr(user, campo) for campo in CAMPOS_PRINCIPAL}
+
+def invalidar_principal(user_id: int) -> None:
+    cache_principais.delete(str(user_id))
+
+async def get_current_user(
+    db: AsyncSession = Depends(get_async_db),
+    token: str = Depends(oauth2_scheme)
+) -> Usuario:
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Não foi possível validar as credenciais",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    try:
+        payload = jwt.decode(
+            token, settings.SECRET_KEY, algorithms=["HS256"]
+        )
+        token_data = TokenPayload(**payload)
+    except JWTError:
+        raise credentials_exception
+    
+    chave = str(token_data.sub)
+    principal = cache_principais.get(chave)
+    if principal is None:
+        user = await db.get(Usuario, token_data.sub)
+        # Devolve a conexão ao pool antes do endpoint; o usuário continua carregado
+        await db.close()
+        if not user:
+            raise credentials_exception
+        principal = _principal(user)
+        cache_principais.set(chave, principal)
+    if not principal["is_active"]:
+        raise HTTPException(status_code=400, detail="Usuário inativo")
+    # Instância desanexada com os dados do cache; para alterar o usuário,
+    # carregue-o da sessão do endpoint
+    return Usuario(**principal)
+
+def get_current_active_superuser(
+    current_user: Usuario = Depends(get_current_user),
+) -> Usuario:
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=400, detail="O usuário não tem privilégios suficientes"
+        )
+    return current_user
+
+async def verify_2fa(
+    user: Usuario,
+    code: str,
+) -> bool:
+    if not user.two_factor_enabled:
+        return True
+    if not user.two_factor_secret:
+        raise HTTPException(
+            status_code=400,
+            detail="2FA está habilitado mas não configurado corretamente"
+        )
+    return verify_2fa_code(user.two_factor_secret, code) 
+
+def _marcar_principal_alterado(mapper: Any, connection: Any, alvo: Usuario) -> None:
+    sessao = object_session(alvo)
+    if sessao is not None:
+        sessao.info.setdefault("principais_alterados", set()).add(alvo.id)
+
+def _invalidar_principais_alterados(sessao: SessaoOrm) -> None:
+    # Só depois do commit, para que uma leitura concorrente não recoloque no
+    # cache a versão anterior ao UPDATE
+    for user_id in sessao.info.pop("principais_alterados", ()):
+        invalidar_principal(user_id)
+
+def _descartar_principais_alterados(sessao: SessaoOrm, *args: Any) -> None:
+    sessao.info.pop("principais_alterados", None)
+
+event.listen(Usuario, "after_update", _marcar_principal_alterado)
+event.listen(Usuario, "after_delete", _marcar_principal_alterado)
+event.listen(SessaoOrm, "after_commit", _invalidar_principais_alterados)
+event.listen(SessaoOrm, "after_soft_rollback", _descartar_principais_alterados)
\ No newline at end of file
@@ -0,0 +1,250 @@
+"""
+Limitadores de taxa por balde de fichas (token bucket).
+
+Cada chave (uma conta, um IP) tem um balde com ``capacidade`` fichas que se
+repõe à razão de ``por_minuto`` fichas por minuto. ``consumir`` tira uma
+ficha e devolve 0, ou, com o balde vazio, os segundos até a próxima ficha,
+sem gastar nada além de um acesso ao dicionário ou ao Redis. ``devolver``
+põe a ficha de volta (o login bem-sucedido não conta contra o limite).
+
+``criar_limitador`` segue o ``CACHE_BACKEND``: em memória, por processo, ou no
+Redis, compartilhado entre os workers, com a atualização do balde atômica num
+script Lua e o relógio do próprio Redis. Falhas do Redis liberam a tentativa:
+o limitador protege o processador, não é o controle de acesso.
+
+``criar_limite_fila`` não tem balde: recusa enquanto o trabalho pendente no
+processo (por exemplo, hashes de senha na fila) estiver no máximo, então o
+limite aperta sozinho quando a máquina está ocupada. Permitidas e recusadas
+são contadas por limitador em ``estatisticas`` e no Prometheus.
+"""
+import logging
+import math
+from abc import ABC, abstractmethod
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+import redis
+from fastapi import HTTPException
+from .config import settings
+from .metricas import limite_tentativas
+
+logger = logging.getLogger(__name__)
+
+
+class EstatisticasLimite:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.permitidas = 0
+        self.recusadas = 0
+
+    def contar(self, campo: str) -> None:
+        with self._lock:
+            setattr(self, campo, getattr(self, campo) + 1)
+
+    def como_dict(self) -> Dict[str, Any]:
+        return {"permitidas": self.permitidas, "recusadas": self.recusadas}
+
+
+class Limitador(ABC):
+    """Contagem comum aos backends, que implementam ``_atualizar``."""
+
+    def __init__(self, nome: str, capacidade: int, por_minuto: Optional[float]):
+        self.nome = nome
+        self.capacidade = capacidade
+        self.por_minuto = por_minuto
+        self.estatisticas = EstatisticasLimite()
+        self._series = {
+            resultado: limite_tentativas.labels(nome, resultado)
+            for resultado in ("permitida", "recusada")
+        }
+
+    @abstractmethod
+    def _atualizar(self, chave: str, fichas: float) -> float:
+        """Tira ``fichas`` (ou as devolve, se negativo); devolve 0 ou os segundos de espera."""
+
+    def consumir(self, chave: str) -> float:
+        """Tira uma ficha de ``chave``; devolve 0 ou os segundos de espera."""
+        espera = self._atualizar(chave, 1)
+        self._contar(espera)
+        return espera
+
+    def _contar(self, espera: float) -> None:
+        resultado = "permitidas" if espera <= 0 else "recusadas"
+        self.estatisticas.contar(resultado)
+        self._series[resultado[:-1]].inc()
+
+    def devolver(self, chave: str) -> None:
+        self._atualizar(chave, -1)
+
+
+class LimitadorMemoria(Limitador):
+    """Baldes no próprio processo; as chaves menos usadas saem além de ``maximo``."""
+
+    backend = "memoria"
+
+    def __init__(
+        self,
+        nome: str,
+        capacidade: int,
+        por_minuto: float,
+        maximo: int = 100_000,
+        relogio: Callable[[], float] = time.monotonic,
+    ):
+        super().__init__(nome, capacidade, por_minuto)
+        self.maximo = maximo
+        self._relogio = relogio
+        self._lock = threading.Lock()
+        # chave -> [fichas, instante da última atualização]
+        self._baldes: "OrderedDict[str, List[float]]" = OrderedDict()
+
+    def _atualizar(self, chave: str, fichas: float) -> float:
+        taxa = self.por_minuto / 60
+        with self._lock:
+            agora = self._relogio()
+            balde = self._baldes.get(chave)
+            if balde is None:
+                balde = self._baldes[chave] = [float(self.capacidade), agora]
+                if len(self._baldes) > self.maximo:
+                    self._baldes.popitem(last=False)
+            else:
+                self._baldes.move_to_end(chave)
+            disponiveis = min(self.capacidade, balde[0] + (agora - balde[1]) * taxa)
+            balde[1] = agora
+            if disponiveis >= fichas:
+                balde[0] = min(self.capacidade, disponiveis - fichas)
+                return 0.0
+            balde[0] = disponiveis
+            return (fichas - disponiveis) / taxa
+
+    def clear(self) -> None:
+        with self._lock:
+            self._baldes.clear()
+
+
+# Mesmo cálculo do LimitadorMemoria, atômico no Redis. O número volta como
+# texto: o Redis converte números do Lua em inteiros
+SCRIPT_BALDE = """
+local capacidade = tonumber(ARGV[1])
+local taxa = tonumber(ARGV[2])
+local fichas = tonumber(ARGV[3])
+local relogio = redis.call('TIME')
+local agora = tonumber(relogio[1]) + tonumber(relogio[2]) / 1000000
+local balde = redis.call('HMGET', KEYS[1], 'fichas', 'em')
+local disponiveis = tonumber(balde[1]) or capacidade
+local em = tonumber(balde[2]) or agora
+disponiveis = math.min(capacidade, disponiveis + math.max(0, agora - em) * taxa)
+local espera = 0
+if disponiveis >= fichas then
+    disponiveis = math.min(capacidade, disponiveis - fichas)
+else
+    espera = (fichas - disponiveis) / taxa
+end
+redis.call('HSET', KEYS[1], 'fichas', tostring(disponiveis), 'em', tostring(agora))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacidade / taxa * 1000))
+return tostring(espera)
+"""
+
+class LimitadorRedis(Limitador):
+    """Baldes no Redis, com as chaves prefixadas por ``limite:<nome>:``."""
+
+    backend = "redis"
+
+    def __init__(self, nome: str, capacidade: int, por_minuto: float, cliente: Optional[redis.Redis] = None):
+        super().__init__(nome, capacidade, por_minuto)
+        self._prefixo = f"limite:{nome}:"
+        self._cliente = cliente or redis.Redis(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            db=settings.REDIS_CACHE_DB,
+            socket_timeout=settings.REDIS_CACHE_TIMEOUT,
+            socket_connect_timeout=settings.REDIS_CACHE_TIMEOUT,
+        )
+        self._script = self._cliente.register_script(SCRIPT_BALDE)
+
+    def _atualizar(self, chave: str, fichas: float) -> float:
+        try:
+            return float(self._script(
+                keys=[self._prefixo + chave], args=[self.capacidade, self.por_minuto / 60, fichas]
+            ))
+        except redis.RedisError:
+            logger.warning("Redis indisponível no limitador %s", self.nome, exc_info=True)
+            return 0.0
+
+    def clear(self) -> None:
+        try:
+            for chave in self._cliente.scan_iter(match=self._prefixo + "*"):
+                self._cliente.delete(chave)
+        except redis.RedisError:
+            logger.warning("Redis indisponível ao limpar o limitador %s", self.nome, exc_info=True)
+
+
+class LimiteFila(Limitador):
+    """Recusa enquanto ``pendentes()`` estiver em ``maximo`` ou acima, qualquer que seja a chave."""
+
+    backend = "processo"
+
+    def __init__(self, nome: str, maximo: int, pendentes: Callable[[], int], espera: float = 1.0):
+        super().__init__(nome, maximo, None)
+        self._pendentes = pendentes
+        self._espera = espera
+
+    def _atualizar(self, chave: str, fichas: float) -> float:
+        # Não há fichas a devolver: só o consumo olha a fila
+        if fichas > 0 and self._pendentes() >= self.capacidade:
+            return self._espera
+        return 0.0
+
+    def consumir(self, chave: str = "") -> float:
+        return super().consumir(chave)
+
+    def devolver(self, chave: str = "") -> None:
+        super().devolver(chave)
+
+    def clear(self) -> None:
+        pass
+
+
+_limitadores: Dict[str, Any] = {}
+
+def criar_limitador(nome: str, capacidade: int, por_minuto: float) -> Any:
+    """Cria (ou devolve o já criado) limitador ``nome`` no backend configurado."""
+    if nome not in _limitadores:
+        if settings.CACHE_BACKEND == "redis":
+            _limitadores[nome] = LimitadorRedis(nome, capacidade, por_minuto)
+        else:
+            _limitadores[nome] = LimitadorMemoria(nome, capacidade, por_minuto)
+    return _limitadores[nome]
+
+def criar_limite_fila(nome: str, maximo: int, pendentes: Callable[[], int]) -> LimiteFila:
+    """Cria (ou devolve o já criado) limite ``nome`` sobre o trabalho pendente no processo."""
+    if nome not in _limitadores:
+        _limitadores[nome] = LimiteFila(nome, maximo, pendentes)
+    return _limitadores[nome]
+
+def exigir(limitador: Limitador, chave: str) -> None:
+    """Consome uma ficha ou recusa com 429 e ``Retry-After``."""
+    espera = limitador.consumir(chave)
+    if espera > 0:
+        raise HTTPException(
+            status_code=429,
+            detail="Muitas tentativas; tente novamente mais tarde",
+            headers={"Retry-After": str(max(1, math.ceil(espera)))},
+        )
+
+def estatisticas() -> Dict[str, Dict[str, Any]]:
+    return {
+        nome: {
+            "backend": limitador.backend,
+            "capacidade": limitador.capacidade,
+            "por_minuto": limitador.por_minuto,
+            **limitador.estatisticas.como_dict(),
+        }
+        for nome, limitador in _limitadores.items()
+    }
+
+def limpar_limitadores() -> None:
+    """Enche todos os baldes e zera as estatísticas."""
+    for limitador in _limitadores.values():
+        limitador.clear()
+        limitador.estatisticas = EstatisticasLimite()
\ No newline at end of file
@@ -0,0 +1,210 @@
+"""
+Métricas no formato do Prometheus, expostas em ``GET /metrics``.
+
+- ``MetricasMiddleware`` mede cada requisição HTTP por método, modelo de rota
+  (``/api/v1/pagamentos/{pagamento_id}``, não o caminho com o id) e status,
+  e quantas instruções SQL ela executou e quanto tempo passou no banco. A
+  contagem vem do hook de ``metricas_banco.instrumentar_sql``, que soma no
+  ``contexto_sql`` da requisição corrente.
+- Os sinais do Celery medem a duração de cada tarefa e a espera na fila, do
+  envio ao início da execução (o envio grava o horário no cabeçalho
+  ``enviado_em`` da mensagem).
+- ``limite_tentativas_total`` conta as tentativas permitidas e recusadas por
+  cada limitador de taxa (``core.limite``).
+- ``varredura_vencidos_linhas_total`` e ``varredura_vencidos_segundos``
+  medem os pagamentos marcados e a duração de cada varredura de vencidos
+  (``services.vencimento``).
+
+Com vários processos (``uvicorn --workers``, prefork do Celery), defina
+``PROMETHEUS_MULTIPROC_DIR`` com um diretório compartilhado por todos: cada
+processo grava ali e ``/metrics`` agrega. Os workers do Celery servem as
+próprias métricas na porta ``METRICAS_CELERY_PORTA``.
+"""
+import os
+import time
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+from celery.signals import before_task_publish, task_postrun, task_prerun
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+    start_http_server,
+)
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_CONSULTAS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+BUCKETS_TAREFA = (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0)
+
+requisicao_segundos = Histogram(
+    "http_requisicao_segundos",
+    "Latência das requisições HTTP",
+    ["metodo", "rota", "status"],
+    buckets=BUCKETS_LATENCIA,
+)
+requisicao_sql_consultas = Histogram(
+    "http_requisicao_sql_consultas",
+    "Instruções SQL executadas por requisição",
+    ["metodo", "rota"],
+    buckets=BUCKETS_CONSULTAS,
+)
+requisicao_sql_segundos = Histogram(
+    "http_requisicao_sql_segundos",
+    "Tempo no banco por requisição",
+    ["metodo", "rota"],
+    buckets=BUCKETS_LATENCIA,
+)
+tarefa_segundos = Histogram(
+    "celery_tarefa_segundos",
+    "Duração das tarefas do Celery",
+    ["tarefa", "estado"],
+    buckets=BUCKETS_TAREFA,
+)
+tarefa_espera_fila_segundos = Histogram(
+    "celery_tarefa_espera_fila_segundos",
+    "Tempo entre o envio da tarefa e o início da execução",
+    ["tarefa"],
+    buckets=BUCKETS_TAREFA,
+)
+limite_tentativas = Counter(
+    "limite_tentativas",
+    "Tentativas avaliadas pelos limitadores de taxa",
+    ["limite", "resultado"],
+)
+varredura_vencidos_linhas = Counter(
+    "varredura_vencidos_linhas",
+    "Pagamentos marcados como vencidos pela varredura periódica",
+)
+varredura_vencidos_segundos = Histogram(
+    "varredura_vencidos_segundos",
+    "Duração da varredura de vencidos",
+    buckets=BUCKETS_TAREFA,
+)
+
+
+class ContextoSql:
+    __slots__ = ("consultas", "segundos")
+
+    def __init__(self):
+        self.consultas = 0
+        self.segundos = 0.0
+
+
+# Contexto da requisição corrente; o threadpool dos endpoints síncronos e as
+# sessões assíncronas enxergam o mesmo objeto
+contexto_sql: ContextVar[Optional[ContextoSql]] = ContextVar("contexto_sql", default=None)
+
+def registrar_sql(segundos: float) -> None:
+    contexto = contexto_sql.get()
+    if contexto is not None:
+        contexto.consultas += 1
+        contexto.segundos += segundos
+
+
+# Rota das requisições que não casaram com nenhuma, para não criar uma série
+# por caminho inexistente
+ROTA_DESCONHECIDA = "desconhecida"
+
+# Séries já rotuladas por (método, rota, status): labels() custa quase tanto
+# quanto observe() e é chamado três vezes por requisição
+_series_por_chave: Dict[Tuple[str, str, int], Tuple[Any, Any, Any]] = {}
+
+def _series(metodo: str, rota: str, status: int) -> Tuple[Any, Any, Any]:
+    series = _series_por_chave.get((metodo, rota, status))
+    if series is None:
+        series = _series_por_chave[(metodo, rota, status)] = (
+            requisicao_segundos.labels(metodo, rota, str(status)),
+            requisicao_sql_consultas.labels(metodo, rota),
+            requisicao_sql_segundos.labels(metodo, rota),
+        )
+    return series
+
+class MetricasMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        inicio = time.perf_counter()
+        contexto = ContextoSql()
+        token = contexto_sql.set(contexto)
+        status = 500
+
+        def observar() -> None:
+            duracao, latencia, consultas, tempo_sql = time.perf_counter() - inicio, *_series(
+                scope["method"], getattr(scope.get("route"), "path", ROTA_DESCONHECIDA), status
+            )
+            latencia.observe(duracao)
+            consultas.observe(contexto.consultas)
+            tempo_sql.observe(contexto.segundos)
+
+        observada = False
+
+        async def enviar(mensagem: Message) -> None:
+            nonlocal status, observada
+            if mensagem["type"] == "http.response.start":
+                status = mensagem["status"]
+            await send(mensagem)
+            # Mede até o último byte enviado; tarefas em background que rodam
+            # depois da resposta ficam de fora
+            if mensagem["type"] == "http.response.body" and not mensagem.get("more_body"):
+                observada = True
+                observar()
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            contexto_sql.reset(token)
+            if not observada:
+                observar()
+
+
+def _registro() -> CollectorRegistry:
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+    registro = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registro)
+    return registro
+
+def gerar() -> bytes:
+    """Métricas no formato texto do Prometheus."""
+    return generate_latest(_registro())
+
+def servir_metricas_worker(porta: int) -> None:
+    """Servidor HTTP de ``/metrics`` no processo principal do worker do Celery."""
+    start_http_server(porta, registry=_registro())
+
+
+# Celery: horário de envio no cabeçalho e duração por id de tarefa
+_inicios: Dict[str, float] = {}
+
+@before_task_publish.connect
+def _marcar_envio(headers: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+    if headers is not None:
+        headers.setdefault("enviado_em", time.time())
+
+@task_prerun.connect
+def _inicio_tarefa(task_id: str, task: Any, **kwargs: Any) -> None:
+    _inicios[task_id] = time.perf_counter()
+    # Tarefas agendadas (eta/countdown) esperam na fila a partir do horário marcado
+    eta = task.request.eta
+    referencia = (
+        datetime.fromisoformat(eta).timestamp() if eta
+        else getattr(task.request, "enviado_em", None)
+    )
+    if referencia is not None:
+        tarefa_espera_fila_segundos.labels(task.name).observe(max(time.time() - referencia, 0.0))
+
+@task_postrun.connect
+def _fim_tarefa(task_id: str, task: Any, state: Optional[str] = None, **kwargs: Any) -> None:
+    inicio = _inicios.pop(task_id, None)
+    if inicio is not None:
+        tarefa_segundos.labels(task.name, state or "DESCONHECIDO").observe(time.perf_counter() - inicio)
\ No newline at end of file
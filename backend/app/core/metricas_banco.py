@@ -0,0 +1,140 @@
+"""
+Instrumentação das engines: uso do pool de conexões e instruções SQL lentas.
+
+As engines de ``core.database`` usam ``QueuePoolMedido`` (ou a variante
+assíncrona), que mede quanto cada checkout esperou por uma conexão e conta os
+que estouraram ``pool_timeout``. ``estatisticas`` junta isso ao estado atual
+de cada pool (conexões em uso, overflow), e ``GET /sistema/pool`` expõe o
+resultado. Os números são do processo.
+
+``instrumentar_sql`` registra no logger ``app.sql`` as instruções acima de
+``DB_SQL_LENTO_MS`` e uma amostra (``DB_SQL_AMOSTRA``) das demais, sem o
+custo do ``echo``, que escreve todas, e soma cada instrução nas métricas da
+requisição corrente (``core.metricas``).
+"""
+import logging
+import random
+import threading
+import time
+from typing import Any, Dict
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as TimeoutPool
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from .config import settings
+from .metricas import registrar_sql
+
+logger = logging.getLogger(__name__)
+logger_sql = logging.getLogger("app.sql")
+
+
+class EstatisticasPool:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.espera_total = 0.0
+        self.espera_max = 0.0
+        self.sql_lentas = 0
+
+    def registrar_checkout(self, espera: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.espera_total += espera
+            self.espera_max = max(self.espera_max, espera)
+
+    def registrar_timeout(self, espera: float) -> None:
+        with self._lock:
+            self.timeouts += 1
+            self.espera_max = max(self.espera_max, espera)
+
+    def contar(self, campo: str) -> None:
+        with self._lock:
+            setattr(self, campo, getattr(self, campo) + 1)
+
+    def como_dict(self) -> Dict[str, Any]:
+        return {
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "espera_media_ms": round(self.espera_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+            "espera_max_ms": round(self.espera_max * 1000, 3),
+            "sql_lentas": self.sql_lentas,
+        }
+
+
+class _MedicaoCheckout:
+    """Mede o tempo de obtenção de conexão em ``_do_get`` do ``QueuePool``."""
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.estatisticas = EstatisticasPool()
+
+    def _do_get(self) -> Any:
+        inicio = time.perf_counter()
+        try:
+            conexao = super()._do_get()
+        except TimeoutPool:
+            self.estatisticas.registrar_timeout(time.perf_counter() - inicio)
+            logger.warning("Pool de conexões esgotado: %s", self.status())
+            raise
+        self.estatisticas.registrar_checkout(time.perf_counter() - inicio)
+        return conexao
+
+    def recreate(self) -> Any:
+        # dispose() troca o pool; as estatísticas continuam as mesmas
+        novo = super().recreate()
+        novo.estatisticas = self.estatisticas
+        return novo
+
+
+class QueuePoolMedido(_MedicaoCheckout, QueuePool):
+    pass
+
+
+class AsyncQueuePoolMedido(_MedicaoCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+_engines: Dict[str, Engine] = {}
+
+def registrar(nome: str, engine: Engine) -> None:
+    """Inclui a engine (síncrona; das assíncronas, a ``sync_engine``) nas estatísticas."""
+    _engines[nome] = engine
+
+def remover(nome: str) -> None:
+    _engines.pop(nome, None)
+
+def instrumentar_sql(engine: Engine) -> None:
+    def antes(conn, cursor, statement, parameters, context, executemany):
+        conn.info["inicio_sql"] = time.perf_counter()
+
+    def depois(conn, cursor, statement, parameters, context, executemany):
+        duracao = time.perf_counter() - conn.info["inicio_sql"]
+        registrar_sql(duracao)
+        duracao_ms = duracao * 1000
+        if settings.DB_SQL_LENTO_MS is not None and duracao_ms >= settings.DB_SQL_LENTO_MS:
+            estatisticas = getattr(engine.pool, "estatisticas", None)
+            if estatisticas is not None:
+                estatisticas.contar("sql_lentas")
+            logger_sql.warning("SQL lenta (%.1f ms): %s", duracao_ms, statement)
+        elif settings.DB_SQL_AMOSTRA and random.random() < settings.DB_SQL_AMOSTRA:
+            logger_sql.info("SQL (%.1f ms): %s", duracao_ms, statement)
+
+    event.listen(engine, "before_cursor_execute", antes)
+    event.listen(engine, "after_cursor_execute", depois)
+
+def estatisticas() -> Dict[str, Dict[str, Any]]:
+    resultado = {}
+    for nome, engine in _engines.items():
+        pool = engine.pool
+        resultado[nome] = {
+            "tamanho": pool.size(),
+            "em_uso": pool.checkedout(),
+            "ociosas": pool.checkedin(),
+            # overflow() é negativo enquanto o pool não abriu todas as conexões
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+            "timeout_s": pool.timeout(),
+            **pool.estatisticas.como_dict(),
+        }
+    return resultado
\ No newline at end of file
@@ -0,0 +1,94 @@
+"""
+Paginação por cursor (keyset).
+
+O cursor é um token opaco com a ordenação usada e os valores da chave de
+ordenação do último item da página. A próxima página é buscada com
+``WHERE (chave) > (valores do cursor)``, o que usa o índice da chave em vez
+de descartar linhas como o OFFSET.
+"""
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, List, Optional, Sequence, Tuple
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+from sqlmodel import Session
+
+CURSOR_HEADER = "X-Next-Cursor"
+
+def _serializar(valor: Any) -> Any:
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return str(valor)
+    return valor
+
+def _desserializar(coluna: Any, valor: Any) -> Any:
+    tipo = coluna.type.python_type
+    if valor is None:
+        return None
+    if tipo is datetime:
+        return datetime.fromisoformat(valor)
+    if tipo is date:
+        return date.fromisoformat(valor)
+    if tipo is Decimal:
+        return Decimal(valor)
+    return tipo(valor)
+
+def codificar_cursor(ordem: str, valores: Sequence[Any]) -> str:
+    """Gera o token opaco a partir da ordenação e dos valores da chave."""
+    dados = json.dumps([ordem, [_serializar(v) for v in valores]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(dados.encode()).decode().rstrip("=")
+
+def decodificar_cursor(token: str, ordem: str, colunas: Sequence[Any]) -> List[Any]:
+    """Recupera os valores da chave de um token, validando a ordenação."""
+    try:
+        preenchimento = "=" * (-len(token) % 4)
+        ordem_token, valores = json.loads(base64.urlsafe_b64decode(token + preenchimento))
+        if ordem_token != ordem or len(valores) != len(colunas):
+            raise ValueError
+        return [_desserializar(c, v) for c, v in zip(colunas, valores)]
+    except (ValueError, TypeError, json.JSONDecodeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+def paginar(
+    db: Session,
+    statement: Any,
+    *,
+    ordem: str,
+    colunas: Sequence[Any],
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    descendente: bool = False,
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    Executa ``statement`` ordenado por ``colunas`` (todas crescentes ou, com
+    ``descendente``, todas decrescentes) e devolve a página e o cursor da
+    próxima página (``None`` quando não há mais itens).
+
+    Sem ``cursor`` a paginação por ``skip`` continua funcionando; a primeira
+    página já traz o cursor para o cliente seguir em modo keyset.
+    """
+    if cursor is not None:
+        if skip:
+            raise HTTPException(
+                status_code=400,
+                detail="Use skip ou cursor, não ambos"
+            )
+        valores = decodificar_cursor(cursor, ordem, colunas)
+        chave = colunas[0] if len(colunas) == 1 else tuple_(*colunas)
+        apos = valores[0] if len(colunas) == 1 else tuple_(*valores)
+        statement = statement.where(chave < apos if descendente else chave > apos)
+    elif skip:
+        statement = statement.offset(skip)
+
+    ordenacao = [c.desc() for c in colunas] if descendente else list(colunas)
+    itens = db.exec(statement.order_by(*ordenacao).limit(limit)).all()
+
+    proximo = None
+    if limit and len(itens) == limit:
+        ultimo = itens[-1]
+        proximo = codificar_cursor(ordem, [getattr(ultimo, c.key) for c in colunas])
+    return itens, proximo
\ No newline at end of file
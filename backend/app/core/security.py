@@ -1,38 +1,89 @@
-from datetime import datetime, timedelta
-from typing import Any, Union, Optional
-from jose import jwt
-from passlib.context import CryptContext
-from .config import settings
-import pyotp
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-def create_access_token(subject: Union[str, Any], expires_delta: timedelta = None) -> str:
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    
-    to_encode = {"exp": expire, "sub": str(subject)}
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm="HS256")
-    return encoded_jwt
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
-
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
-
-def generate_2fa_secret() -> str:
-    """Gera um segredo para autenticação 2FA"""
-    return pyotp.random_base32()
-
-def verify_2fa_code(secret: str, code: str) -> bool:
-    """Verifica se o código 2FA é válido"""
-    totp = pyotp.TOTP(secret)
-    return totp.verify(code)
-
-def get_2fa_qr_code(secret: str, email: str) -> str:
-    """Gera a URL do QR code para configuração do 2FA"""
-    totp = pyotp.TOTP(secret)
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Union, Optional, Tuple
+from jose import jwt
+from passlib.context import CryptContext
+from .config import settings
+import pyotp
+
+def criar_contexto_senha() -> CryptContext:
+    """
+    Contexto de hash a partir das configurações.
+
+    O custo configurado também é o mínimo aceito, então hashes gerados com
+    custo menor (ou por um esquema que deixou de ser o primeiro) são
+    marcados por ``needs_update``.
+    """
+    opcoes: dict = {}
+    if "bcrypt" in settings.PASSWORD_SCHEMES:
+        opcoes["bcrypt__rounds"] = settings.BCRYPT_ROUNDS
+        opcoes["bcrypt__min_rounds"] = settings.BCRYPT_ROUNDS
+    if "argon2" in settings.PASSWORD_SCHEMES:
+        opcoes["argon2__time_cost"] = settings.ARGON2_TIME_COST
+        opcoes["argon2__memory_cost"] = settings.ARGON2_MEMORY_COST
+        opcoes["argon2__parallelism"] = settings.ARGON2_PARALLELISM
+    return CryptContext(schemes=settings.PASSWORD_SCHEMES, deprecated="auto", **opcoes)
+
+pwd_context = criar_contexto_senha()
+
+# bcrypt e argon2 liberam o GIL, então threads bastam para tirar o hash do
+# event loop; o tamanho do pool limita a CPU gasta com hashes simultâneos
+_executor_senha = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="hash-senha"
+)
+# Hashes em execução ou na fila do pool; só o event loop altera
+_hashes_pendentes = 0
+
+def hashes_pendentes() -> int:
+    return _hashes_pendentes
+
+async def _no_executor_senha(fn: Any, *args: Any) -> Any:
+    global _hashes_pendentes
+    _hashes_pendentes += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_executor_senha, fn, *args)
+    finally:
+        _hashes_pendentes -= 1
+
+def create_access_token(subject: Union[str, Any], expires_delta: timedelta = None) -> str:
+    if expires_delta:
+        expire = datetime.utcnow() + expires_delta
+    else:
+        expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    
+    to_encode = {"exp": expire, "sub": str(subject)}
+    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm="HS256")
+    return encoded_jwt
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+def get_password_hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verifica a senha e, se o hash estiver desatualizado, devolve um novo."""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+async def verify_and_update_password_async(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    return await _no_executor_senha(verify_and_update_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    return await _no_executor_senha(get_password_hash, password)
+
+def generate_2fa_secret() -> str:
+    """Gera um segredo para autenticação 2FA"""
+    return pyotp.random_base32()
+
+def verify_2fa_code(secret: str, code: str) -> bool:
+    """Verifica se o código 2FA é válido"""
+    totp = pyotp.TOTP(secret)
+    return totp.verify(code)
+
+def get_2fa_qr_code(secret: str, email: str) -> str:
+    """Gera a URL do QR code para configuração do 2FA"""
+    totp = pyotp.TOTP(secret)
     return totp.provisioning_uri(email, issuer_name=settings.PROJECT_NAME) 
\ No newline at end of file
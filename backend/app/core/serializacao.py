@@ -0,0 +1,25 @@
+"""
+Codificação JSON das respostas grandes com orjson.
+
+As listagens montam dicionários direto das linhas do banco e os entregam a
+``RespostaJSON``, sem passar pela validação do ``response_model`` nem pelo
+``jsonable_encoder``. Datas e horários saem em ISO 8601, como antes; valores
+``Decimal`` saem como número JSON com as casas gravadas no banco, sem passar
+por float.
+"""
+from decimal import Decimal
+from typing import Any
+import orjson
+from fastapi.responses import JSONResponse
+
+def _padrao(valor: Any) -> Any:
+    if isinstance(valor, Decimal):
+        return orjson.Fragment(format(valor, "f"))
+    raise TypeError(f"Tipo não serializável: {type(valor).__name__}")
+
+def dumps(conteudo: Any) -> bytes:
+    return orjson.dumps(conteudo, default=_padrao)
+
+class RespostaJSON(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
\ No newline at end of file
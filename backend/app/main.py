@@ -1,37 +1,51 @@
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from .core.config import settings
-from .core.database import init_db
-from .api.v1.api import api_router
-
-app = FastAPI(
-    title=settings.PROJECT_NAME,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
-)
-
-# Configurar CORS
-if settings.BACKEND_CORS_ORIGINS:
-    app.add_middleware(
-        CORSMiddleware,
-        allow_origins=[str(origin) for origin in settings.BACKEND_CORS_ORIGINS],
-        allow_credentials=True,
-        allow_methods=["*"],
-        allow_headers=["*"],
-    )
-
-# Incluir rotas da API
-app.include_router(api_router, prefix=settings.API_V1_STR)
-
-# Inicializar banco de dados
-@app.on_event("startup")
-async def on_startup():
-    init_db()
-
-# Rota de teste
-@app.get("/")
-async def root():
-    return {
-        "message": "Sistema Claudio Figueiredo API",
-        "docs_url": "/docs",
-        "redoc_url": "/redoc"
-    } 
\ No newline at end of file
+from fastapi import FastAPI, Response
+from fastapi.middleware.cors import CORSMiddleware
+from prometheus_client import CONTENT_TYPE_LATEST
+from .core.compressao import CompressaoMiddleware
+from .core.config import settings
+from .core.database import init_db
+from .core.metricas import MetricasMiddleware, gerar
+from .core.paginacao import CURSOR_HEADER
+from .api.v1.api import api_router
+
+app = FastAPI(
+    title=settings.PROJECT_NAME,
+    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+)
+
+# Configurar CORS
+if settings.BACKEND_CORS_ORIGINS:
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=[str(origin) for origin in settings.BACKEND_CORS_ORIGINS],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=[CURSOR_HEADER],
+    )
+
+app.add_middleware(CompressaoMiddleware, minimo=settings.COMPRESSAO_MINIMO)
+# Por último, para ser o mais externo: mede também a compressão e o CORS
+app.add_middleware(MetricasMiddleware)
+
+# Incluir rotas da API
+app.include_router(api_router, prefix=settings.API_V1_STR)
+
+# Inicializar banco de dados
+@app.on_event("startup")
+async def on_startup():
+    init_db()
+
+# Rota de teste
+@app.get("/")
+async def root():
+    return {
+        "message": "Sistema Claudio Figueiredo API",
+        "docs_url": "/docs",
+        "redoc_url": "/redoc"
+    }
+
+# Métricas para o Prometheus; restrinja o acesso no proxy
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(gerar(), media_type=CONTENT_TYPE_LATEST)
\ No newline at end of file
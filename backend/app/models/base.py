@@ -1,12 +1,16 @@
-from datetime import datetime
-from typing import Optional
-from sqlmodel import SQLModel, Field
-
-class BaseModel(SQLModel):
-    id: Optional[int] = Field(default=None, primary_key=True)
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
-    active: bool = Field(default=True)
-
-    class Config:
+from datetime import datetime
+from typing import Optional
+from sqlmodel import SQLModel, Field
+
+class BaseModel(SQLModel):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    # Toda escrita pelo ORM ou por update() do Core sem o campo o atualiza;
+    # é a chave da sincronização incremental (services.sincronizacao)
+    updated_at: datetime = Field(
+        default_factory=datetime.utcnow, sa_column_kwargs={"onupdate": datetime.utcnow}
+    )
+    active: bool = Field(default=True)
+
+    class Config:
         arbitrary_types_allowed = True 
\ No newline at end of file
@@ -1,34 +1,48 @@
-from typing import Optional, List
-from sqlmodel import SQLModel, Field, Relationship
-from .base import BaseModel
-
-class Cliente(BaseModel, table=True):
-    __tablename__ = "clientes"
-    
-    nome: str = Field(index=True)
-    cnpj: str = Field(unique=True, index=True)
-    email: str = Field(index=True)
-    telefone: Optional[str] = None
-    endereco: Optional[str] = None
-    cidade: Optional[str] = None
-    estado: Optional[str] = None
-    cep: Optional[str] = None
-    
-    # Campos específicos para retenção
-    regime_tributario: Optional[str] = None
-    percentual_retencao: Optional[float] = Field(default=0.0)
-    
-    # Relacionamentos
-    pagamentos: List["Pagamento"] = Relationship(back_populates="cliente")
-    
-    class Config:
-        schema_extra = {
-            "example": {
-                "nome": "Empresa XYZ Ltda",
-                "cnpj": "12.345.678/0001-90",
-                "email": "contato@xyz.com",
-                "telefone": "(11) 1234-5678",
-                "regime_tributario": "SIMPLES",
-                "percentual_retencao": 0.0
-            }
+from typing import Optional, List
+from sqlalchemy import Index, text
+from sqlmodel import SQLModel, Field, Relationship
+from .base import BaseModel
+
+class Cliente(BaseModel, table=True):
+    __tablename__ = "clientes"
+    __table_args__ = (
+        # Chave da sincronização incremental (GET /clientes/changes)
+        Index("ix_clientes_updated_at_id", "updated_at", "id"),
+        # Listagem por id só dos ativos; os desativados ficam fora do índice
+        Index(
+            "ix_clientes_ativos_id",
+            "id",
+            postgresql_where=text("active"),
+            sqlite_where=text("active = 1"),
+        ),
+    )
+    
+    nome: str = Field(index=True)
+    cnpj: str = Field(unique=True, index=True)
+    email: str = Field(index=True)
+    telefone: Optional[str] = None
+    endereco: Optional[str] = None
+    cidade: Optional[str] = None
+    estado: Optional[str] = None
+    cep: Optional[str] = None
+    
+    # Campos específicos para retenção: sem percentual, vale a tabela do regime
+    regime_tributario: Optional[str] = None
+    percentual_retencao: Optional[float] = None
+    
+    # Nome, email e CNPJ normalizados para a busca (mantido por services.busca)
+    termo_busca: Optional[str] = Field(default=None, exclude=True)
+    
+    # Relacionamentos
+    pagamentos: List["Pagamento"] = Relationship(back_populates="cliente")
+    
+    class Config:
+        schema_extra = {
+            "example": {
+                "nome": "Empresa XYZ Ltda",
+                "cnpj": "12.345.678/0001-90",
+                "email": "contato@xyz.com",
+                "telefone": "(11) 1234-5678",
+                "regime_tributario": "SIMPLES"
+            }
         } 
\ No newline at end of file
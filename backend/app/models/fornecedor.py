@@ -1,40 +1,62 @@
-from typing import Optional, List
-from sqlmodel import SQLModel, Field, Relationship
-from .base import BaseModel
-
-class Fornecedor(BaseModel, table=True):
-    __tablename__ = "fornecedores"
-    
-    nome: str = Field(index=True)
-    cnpj: str = Field(unique=True, index=True)
-    email: str = Field(index=True)
-    telefone: Optional[str] = None
-    endereco: Optional[str] = None
-    cidade: Optional[str] = None
-    estado: Optional[str] = None
-    cep: Optional[str] = None
-    
-    # Campos específicos para fornecedor
-    categoria: Optional[str] = None
-    banco: Optional[str] = None
-    agencia: Optional[str] = None
-    conta: Optional[str] = None
-    pix: Optional[str] = None
-    
-    # Relacionamentos
-    pagamentos: List["Pagamento"] = Relationship(back_populates="fornecedor")
-    
-    class Config:
-        schema_extra = {
-            "example": {
-                "nome": "Fornecedor ABC Ltda",
-                "cnpj": "98.765.432/0001-10",
-                "email": "financeiro@abc.com",
-                "telefone": "(11) 9876-5432",
-                "categoria": "SERVIÇOS",
-                "banco": "001",
-                "agencia": "1234",
-                "conta": "12345-6",
-                "pix": "98765432000110"
-            }
+from typing import Optional, List
+from sqlalchemy import Index, text
+from sqlmodel import SQLModel, Field, Relationship
+from .base import BaseModel
+
+class Fornecedor(BaseModel, table=True):
+    __tablename__ = "fornecedores"
+    __table_args__ = (
+        # Chave da sincronização incremental (GET /fornecedores/changes)
+        Index("ix_fornecedores_updated_at_id", "updated_at", "id"),
+        # Listagem por id e por categoria só dos ativos; os desativados ficam fora dos índices
+        Index(
+            "ix_fornecedores_ativos_id",
+            "id",
+            postgresql_where=text("active"),
+            sqlite_where=text("active = 1"),
+        ),
+        Index(
+            "ix_fornecedores_categoria_ativos",
+            "categoria",
+            "id",
+            postgresql_where=text("active"),
+            sqlite_where=text("active = 1"),
+        ),
+    )
+    
+    nome: str = Field(index=True)
+    cnpj: str = Field(unique=True, index=True)
+    email: str = Field(index=True)
+    telefone: Optional[str] = None
+    endereco: Optional[str] = None
+    cidade: Optional[str] = None
+    estado: Optional[str] = None
+    cep: Optional[str] = None
+    
+    # Campos específicos para fornecedor
+    categoria: Optional[str] = None
+    banco: Optional[str] = None
+    agencia: Optional[str] = None
+    conta: Optional[str] = None
+    pix: Optional[str] = None
+    
+    # Nome, email e CNPJ normalizados para a busca (mantido por services.busca)
+    termo_busca: Optional[str] = Field(default=None, exclude=True)
+    
+    # Relacionamentos
+    pagamentos: List["Pagamento"] = Relationship(back_populates="fornecedor")
+    
+    class Config:
+        schema_extra = {
+            "example": {
+                "nome": "Fornecedor ABC Ltda",
+                "cnpj": "98.765.432/0001-10",
+                "email": "financeiro@abc.com",
+                "telefone": "(11) 9876-5432",
+                "categoria": "SERVIÇOS",
+                "banco": "001",
+                "agencia": "1234",
+                "conta": "12345-6",
+                "pix": "98765432000110"
+            }
         } 
\ No newline at end of file
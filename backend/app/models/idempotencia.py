@@ -0,0 +1,23 @@
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import Column, LargeBinary, UniqueConstraint
+from sqlmodel import Field
+from .base import BaseModel
+
+class ChaveIdempotencia(BaseModel, table=True):
+    """
+    Requisição feita com ``Idempotency-Key`` (mantida por
+    services.idempotencia). Sem ``status_code``, ainda está em execução.
+    """
+    __tablename__ = "chaves_idempotencia"
+    __table_args__ = (
+        UniqueConstraint("usuario_id", "operacao", "chave", name="uq_chaves_idempotencia_chave"),
+    )
+
+    usuario_id: int
+    operacao: str
+    chave: str = Field(max_length=255)
+    hash_requisicao: str
+    status_code: Optional[int] = None
+    resposta: Optional[bytes] = Field(default=None, sa_column=Column(LargeBinary))
+    expira_em: datetime = Field(index=True)
\ No newline at end of file
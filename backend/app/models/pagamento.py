@@ -1,46 +1,79 @@
-from datetime import date
-from typing import Optional
-from decimal import Decimal
-from sqlmodel import SQLModel, Field, Relationship
-from .base import BaseModel
-
-class Pagamento(BaseModel, table=True):
-    __tablename__ = "pagamentos"
-    
-    # Relacionamentos
-    cliente_id: Optional[int] = Field(default=None, foreign_key="clientes.id")
-    fornecedor_id: int = Field(foreign_key="fornecedores.id")
-    
-    cliente: Optional["Cliente"] = Relationship(back_populates="pagamentos")
-    fornecedor: "Fornecedor" = Relationship(back_populates="pagamentos")
-    
-    # Campos do pagamento
-    numero_nota: str = Field(index=True)
-    data_emissao: date
-    data_vencimento: date
-    valor_total: Decimal = Field(max_digits=10, decimal_places=2)
-    valor_retencao: Decimal = Field(default=0, max_digits=10, decimal_places=2)
-    valor_liquido: Decimal = Field(max_digits=10, decimal_places=2)
-    
-    # Status e controle
-    status: str = Field(default="PENDENTE")  # PENDENTE, PROCESSANDO, PAGO, CANCELADO
-    data_pagamento: Optional[date] = None
-    observacoes: Optional[str] = None
-    
-    # Campos de auditoria
-    processado_por: Optional[str] = None
-    comprovante_url: Optional[str] = None
-    
-    class Config:
-        schema_extra = {
-            "example": {
-                "numero_nota": "NF-123456",
-                "data_emissao": "2024-03-30",
-                "data_vencimento": "2024-04-30",
-                "valor_total": 1000.00,
-                "valor_retencao": 150.00,
-                "valor_liquido": 850.00,
-                "status": "PENDENTE",
-                "observacoes": "Pagamento referente a serviços prestados"
-            }
+from datetime import date
+from typing import Optional
+from decimal import Decimal
+from sqlalchemy import Index, false, text
+from sqlmodel import SQLModel, Field, Relationship
+from .base import BaseModel
+
+class Pagamento(BaseModel, table=True):
+    __tablename__ = "pagamentos"
+    __table_args__ = (
+        # Chave da paginação por cursor ordenada por vencimento
+        Index("ix_pagamentos_data_vencimento_id", "data_vencimento", "id"),
+        Index("ix_pagamentos_data_emissao_id", "data_emissao", "id"),
+        # Filtros da listagem por igualdade, seguidos da faixa/ordem de vencimento
+        Index("ix_pagamentos_status_vencimento", "status", "data_vencimento", "id"),
+        Index("ix_pagamentos_fornecedor_vencimento", "fornecedor_id", "data_vencimento", "id"),
+        Index("ix_pagamentos_cliente_vencimento", "cliente_id", "data_vencimento", "id"),
+        # Chave da sincronização incremental (GET /pagamentos/changes)
+        Index("ix_pagamentos_updated_at_id", "updated_at", "id"),
+        # Fila de processamento: só os pendentes, na ordem em que são reivindicados
+        Index(
+            "ix_pagamentos_pendentes",
+            "data_vencimento",
+            "id",
+            postgresql_where=text("status = 'PENDENTE'"),
+            sqlite_where=text("status = 'PENDENTE'"),
+        ),
+        # Varredura de vencidos: só os pendentes ainda não marcados
+        Index(
+            "ix_pagamentos_pendentes_nao_vencidos",
+            "data_vencimento",
+            "id",
+            postgresql_where=text("status = 'PENDENTE' AND NOT vencido"),
+            sqlite_where=text("status = 'PENDENTE' AND vencido = 0"),
+        ),
+    )
+    
+    # Relacionamentos
+    cliente_id: Optional[int] = Field(default=None, foreign_key="clientes.id")
+    fornecedor_id: int = Field(foreign_key="fornecedores.id")
+    
+    cliente: Optional["Cliente"] = Relationship(back_populates="pagamentos")
+    fornecedor: "Fornecedor" = Relationship(back_populates="pagamentos")
+    
+    # Campos do pagamento
+    numero_nota: str = Field(index=True)
+    data_emissao: date
+    data_vencimento: date
+    valor_total: Decimal = Field(max_digits=10, decimal_places=2)
+    valor_retencao: Decimal = Field(default=0, max_digits=10, decimal_places=2)
+    valor_liquido: Decimal = Field(max_digits=10, decimal_places=2)
+    
+    # Status e controle
+    status: str = Field(default="PENDENTE")  # PENDENTE, PROCESSANDO, PAGO, CANCELADO
+    # Pendente com vencimento passado (mantido por services.vencimento)
+    vencido: bool = Field(default=False, sa_column_kwargs={"server_default": false()})
+    # Quitado há mais de ARQUIVAMENTO_MESES (mantido por services.arquivamento);
+    # no Postgres fica na partição fria, fora das consultas sem include_archived
+    arquivado: bool = Field(default=False, sa_column_kwargs={"server_default": false()})
+    data_pagamento: Optional[date] = None
+    observacoes: Optional[str] = None
+    
+    # Campos de auditoria
+    processado_por: Optional[str] = None
+    comprovante_url: Optional[str] = None
+    
+    class Config:
+        schema_extra = {
+            "example": {
+                "numero_nota": "NF-123456",
+                "data_emissao": "2024-03-30",
+                "data_vencimento": "2024-04-30",
+                "valor_total": 1000.00,
+                "valor_retencao": 150.00,
+                "valor_liquido": 850.00,
+                "status": "PENDENTE",
+                "observacoes": "Pagamento referente a serviços prestados"
+            }
         } 
\ No newline at end of file
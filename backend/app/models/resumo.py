@@ -0,0 +1,56 @@
+from datetime import date
+from decimal import Decimal
+from sqlalchemy import UniqueConstraint
+from sqlmodel import Field
+from .base import BaseModel
+
+class TotaisResumo(BaseModel):
+    """Totais comuns às tabelas de resumo (mantidas por services.resumo)."""
+    quantidade: int = Field(default=0)
+    valor_total: Decimal = Field(default=0, max_digits=16, decimal_places=2)
+    valor_retencao: Decimal = Field(default=0, max_digits=16, decimal_places=2)
+    valor_liquido: Decimal = Field(default=0, max_digits=16, decimal_places=2)
+
+class ResumoPagamentoMes(TotaisResumo, table=True):
+    """Totais por status e mês de vencimento."""
+    __tablename__ = "resumo_pagamentos_mes"
+    __table_args__ = (
+        UniqueConstraint("status", "mes", name="uq_resumo_pagamentos_mes_chave"),
+    )
+
+    status: str
+    mes: date  # primeiro dia do mês de vencimento
+
+class ResumoPagamentoFornecedor(TotaisResumo, table=True):
+    """Totais por status e fornecedor."""
+    __tablename__ = "resumo_pagamentos_fornecedor"
+    __table_args__ = (
+        UniqueConstraint("status", "fornecedor_id", name="uq_resumo_pagamentos_fornecedor_chave"),
+    )
+
+    status: str
+    fornecedor_id: int
+
+class ResumoPagamentoCliente(TotaisResumo, table=True):
+    """Totais por status e cliente."""
+    __tablename__ = "resumo_pagamentos_cliente"
+    __table_args__ = (
+        UniqueConstraint("status", "cliente_id", name="uq_resumo_pagamentos_cliente_chave"),
+    )
+
+    status: str
+    cliente_id: int = Field(default=0)  # 0: pagamentos sem cliente
+
+class ResumoPagamento(TotaisResumo, table=True):
+    """Totais por status, mês de vencimento, fornecedor e cliente."""
+    __tablename__ = "resumo_pagamentos"
+    __table_args__ = (
+        UniqueConstraint(
+            "status", "mes", "fornecedor_id", "cliente_id", name="uq_resumo_pagamentos_chave"
+        ),
+    )
+
+    status: str
+    mes: date
+    fornecedor_id: int = Field(index=True)
+    cliente_id: int = Field(default=0, index=True)
\ No newline at end of file
@@ -0,0 +1,10 @@
+from sqlmodel import Field
+from .base import BaseModel
+
+class ExecucaoTarefa(BaseModel, table=True):
+    """Métricas da última execução de uma tarefa periódica."""
+    __tablename__ = "execucoes_tarefas"
+
+    nome: str = Field(unique=True, index=True)
+    linhas_afetadas: int = Field(default=0)
+    duracao_ms: float = Field(default=0.0)
\ No newline at end of file
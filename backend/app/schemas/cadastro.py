@@ -0,0 +1,31 @@
+from typing import List, Optional
+from pydantic import BaseModel, constr
+from .pagamento import ResultadoLinha
+
+class CadastroImportacao(BaseModel):
+    nome: constr(strip_whitespace=True, min_length=1)
+    cnpj: constr(strip_whitespace=True, min_length=1)
+    email: constr(strip_whitespace=True, min_length=1)
+    telefone: Optional[str] = None
+    endereco: Optional[str] = None
+    cidade: Optional[str] = None
+    estado: Optional[str] = None
+    cep: Optional[str] = None
+
+class ClienteImportacao(CadastroImportacao):
+    regime_tributario: Optional[str] = None
+    percentual_retencao: Optional[float] = None
+
+class FornecedorImportacao(CadastroImportacao):
+    categoria: Optional[str] = None
+    banco: Optional[str] = None
+    agencia: Optional[str] = None
+    conta: Optional[str] = None
+    pix: Optional[str] = None
+
+class ResultadoImportacaoCadastros(BaseModel):
+    total: int
+    criados: int
+    atualizados: int
+    erros: int
+    linhas: List[ResultadoLinha]
\ No newline at end of file
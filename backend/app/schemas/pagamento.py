@@ -0,0 +1,37 @@
+from datetime import date
+from decimal import Decimal
+from typing import List, Optional
+from pydantic import BaseModel, condecimal
+
+class PagamentoImportacao(BaseModel):
+    numero_nota: str
+    data_emissao: date
+    data_vencimento: date
+    valor_total: condecimal(gt=0, max_digits=10, decimal_places=2)
+    fornecedor_id: int
+    cliente_id: Optional[int] = None
+    status: str = "PENDENTE"
+    observacoes: Optional[str] = None
+
+class ResultadoLinha(BaseModel):
+    linha: int
+    status: str  # criado, atualizado (cadastros), erro
+    id: Optional[int] = None
+    erros: List[str] = []
+
+class ResultadoImportacao(BaseModel):
+    total: int
+    criados: int
+    erros: int
+    linhas: List[ResultadoLinha]
+
+class LinhaResumo(BaseModel):
+    # Só as dimensões pedidas em ``agrupar`` vêm preenchidas
+    status: Optional[str] = None
+    mes: Optional[date] = None
+    fornecedor_id: Optional[int] = None
+    cliente_id: Optional[int] = None
+    quantidade: int
+    valor_total: Decimal
+    valor_retencao: Decimal
+    valor_liquido: Decimal
\ No newline at end of file
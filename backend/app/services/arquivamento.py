@@ -0,0 +1,119 @@
+"""
+Arquivamento dos pagamentos quitados.
+
+Pagamentos ``PAGO`` ou ``CANCELADO`` com vencimento anterior ao primeiro dia
+do mês de ``ARQUIVAMENTO_MESES`` meses atrás ficam com ``arquivado = True``.
+No Postgres a tabela é particionada por essa coluna (migração 0010): a linha
+arquivada muda para ``pagamentos_arquivo``, particionada por ano de
+vencimento, e as consultas com ``arquivado = false`` (o padrão dos endpoints,
+sem ``include_archived``) só leem a partição dos ativos. Em outros bancos a
+coluna funciona como um filtro comum.
+
+A tarefa periódica cria as partições anuais que faltam, arquiva em blocos de
+``lote`` linhas com um ``UPDATE`` por bloco e registra a execução em
+``execucoes_tarefas``. O ``updated_at`` não muda: o arquivamento não é uma
+alteração para a sincronização incremental, e os resumos continuam contando
+os arquivados.
+"""
+import logging
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Optional
+from sqlalchemy import event, func, inspect, text, update
+from sqlmodel import Session, select
+from ..core.config import settings
+from ..models.pagamento import Pagamento
+from ..models.tarefa import ExecucaoTarefa
+
+logger = logging.getLogger(__name__)
+
+TAREFA_ARQUIVAMENTO = "arquivar_pagamentos"
+LOTE_ARQUIVAMENTO = 5000
+STATUS_QUITADOS = ("PAGO", "CANCELADO")
+PARTICAO_ARQUIVO = "pagamentos_arquivo"
+
+def data_corte(hoje: date, meses: int) -> date:
+    """Primeiro dia do mês ``meses`` meses antes de ``hoje``; arquiva o que vence antes."""
+    total = hoje.year * 12 + hoje.month - 1 - meses
+    return date(total // 12, total % 12 + 1, 1)
+
+def _particionada(db: Session) -> bool:
+    if db.get_bind().dialect.name != "postgresql":
+        return False
+    return db.execute(text(f"SELECT to_regclass('{PARTICAO_ARQUIVO}') IS NOT NULL")).scalar()
+
+def criar_particoes(db: Session, primeiro_ano: int, ultimo_ano: int) -> None:
+    """Cria as partições anuais de ``pagamentos_arquivo`` que ainda não existem."""
+    for ano in range(primeiro_ano, ultimo_ano + 1):
+        db.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {PARTICAO_ARQUIVO}_{ano} PARTITION OF {PARTICAO_ARQUIVO} "
+            f"FOR VALUES FROM ('{ano}-01-01') TO ('{ano + 1}-01-01')"
+        ))
+    db.commit()
+
+def arquivar_pagamentos(
+    db: Session,
+    hoje: Optional[date] = None,
+    meses: Optional[int] = None,
+    lote: int = LOTE_ARQUIVAMENTO,
+) -> Dict[str, Any]:
+    """
+    Arquiva os quitados que venceram antes do corte, em blocos de ``lote``
+    linhas. Devolve as métricas da execução.
+    """
+    inicio = time.perf_counter()
+    corte = data_corte(hoje or date.today(), settings.ARQUIVAMENTO_MESES if meses is None else meses)
+    execucao = db.exec(
+        select(ExecucaoTarefa).where(ExecucaoTarefa.nome == TAREFA_ARQUIVAMENTO)
+    ).first() or ExecucaoTarefa(nome=TAREFA_ARQUIVAMENTO)
+
+    tabela = Pagamento.__table__
+    condicoes = (
+        tabela.c.arquivado.is_(False),
+        tabela.c.status.in_(STATUS_QUITADOS),
+        tabela.c.data_vencimento < corte,
+    )
+    if _particionada(db):
+        mais_antigo = db.execute(select(func.min(tabela.c.data_vencimento)).where(*condicoes)).scalar()
+        if mais_antigo is not None:
+            criar_particoes(db, mais_antigo.year, (corte - timedelta(days=1)).year)
+
+    candidatos = select(tabela.c.id).where(*condicoes).limit(lote)
+    linhas = lotes = 0
+    while True:
+        # arquivado = false também no UPDATE, para o Postgres só tocar a partição
+        # dos ativos; o updated_at é repetido para não disparar o onupdate
+        resultado = db.exec(
+            update(tabela)
+            .where(tabela.c.arquivado.is_(False), tabela.c.id.in_(candidatos))
+            .values(arquivado=True, updated_at=tabela.c.updated_at)
+        )
+        db.commit()
+        linhas += resultado.rowcount
+        lotes += 1
+        if resultado.rowcount < lote:
+            break
+
+    duracao_ms = round((time.perf_counter() - inicio) * 1000, 1)
+    execucao.linhas_afetadas = linhas
+    execucao.duracao_ms = duracao_ms
+    execucao.updated_at = datetime.utcnow()
+    db.add(execucao)
+    db.commit()
+
+    metricas = {"linhas": linhas, "lotes": lotes, "duracao_ms": duracao_ms, "corte": corte.isoformat()}
+    logger.info(
+        "Arquivamento de pagamentos: %(linhas)s linhas em %(lotes)s lotes, %(duracao_ms)s ms",
+        metricas,
+    )
+    return metricas
+
+
+def _manter_arquivado(mapper: Any, connection: Any, alvo: Pagamento) -> None:
+    # Só a tarefa arquiva: o que vier do cliente no corpo é ignorado
+    historico = inspect(alvo).attrs.arquivado.history
+    if historico.has_changes():
+        alvo.arquivado = historico.deleted[0] if historico.deleted else False
+
+event.listen(Pagamento, "before_insert", _manter_arquivado)
+event.listen(Pagamento, "before_update", _manter_arquivado)
\ No newline at end of file
@@ -0,0 +1,259 @@
+"""
+Busca textual de clientes e fornecedores.
+
+Cada registro guarda em ``termo_busca`` o nome e o email normalizados (sem
+acentos, em minúsculas) e o CNPJ só com dígitos. A consulta passa pela mesma
+normalização e é procurada como substring desse termo:
+
+- no Postgres com ``pg_trgm``, por ``LIKE`` servido pelo índice GIN de
+  trigramas e ordenado por ``word_similarity``;
+- nos demais casos (SQLite em desenvolvimento e testes), por um índice de
+  trigramas mantido em memória pelo próprio processo.
+
+Os cadastros desativados só entram no resultado com ``include_inactive``; no
+Postgres o índice de trigramas é parcial (``WHERE active``) e essa busca
+percorre a tabela.
+"""
+import heapq
+import logging
+import re
+import threading
+import unicodedata
+from array import array
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Type
+from sqlalchemy import event, func, literal, text, true
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select
+from ..core.campos import selecionar
+from ..models.cliente import Cliente
+from ..models.fornecedor import Fornecedor
+
+logger = logging.getLogger(__name__)
+
+LIMITE_PADRAO = 20
+
+# Índices GIN de trigramas, criados fora dos modelos porque dependem do pg_trgm;
+# parciais, só com os ativos, desde a migração 0011
+INDICES_TRIGRAMA = {
+    "clientes": "ix_clientes_termo_busca_trgm",
+    "fornecedores": "ix_fornecedores_termo_busca_trgm",
+}
+
+_SO_CNPJ = re.compile(r"[\d./\-\s]+")
+_NAO_DIGITO = re.compile(r"\D")
+_ESPACOS = re.compile(r"\s+")
+
+def normalizar(texto: Optional[str]) -> str:
+    """Remove acentos, converte para minúsculas e colapsa espaços."""
+    if not texto:
+        return ""
+    decomposto = unicodedata.normalize("NFKD", texto)
+    sem_acentos = "".join(c for c in decomposto if not unicodedata.combining(c))
+    return _ESPACOS.sub(" ", sem_acentos.casefold()).strip()
+
+def somente_digitos(texto: Optional[str]) -> str:
+    return _NAO_DIGITO.sub("", texto or "")
+
+def montar_termo(nome: Optional[str], cnpj: Optional[str], email: Optional[str]) -> str:
+    return " ".join(p for p in (normalizar(nome), normalizar(email), somente_digitos(cnpj)) if p)
+
+def normalizar_consulta(consulta: str) -> str:
+    """Consultas só com dígitos e pontuação de CNPJ são comparadas pelos dígitos."""
+    if _SO_CNPJ.fullmatch(consulta) and somente_digitos(consulta):
+        return somente_digitos(consulta)
+    return normalizar(consulta)
+
+def _trigramas(texto: str) -> set:
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+def _ordem(termo: str, consulta: str, id_: int) -> Tuple[int, int, int, int]:
+    """Início de palavra primeiro, depois ocorrência mais cedo e termo mais curto."""
+    posicao = termo.find(consulta)
+    inicio_palavra = posicao == 0 or termo[posicao - 1] in " @."
+    return (0 if inicio_palavra else 1, posicao, len(termo), id_)
+
+
+class IndiceNgrama:
+    """
+    Índice invertido de trigramas em memória para um modelo.
+
+    É carregado do banco na primeira busca e atualizado pelos eventos de
+    escrita do ORM deste processo. As listas de postagem só crescem; entradas
+    antigas são descartadas na verificação contra o termo atual.
+    """
+
+    def __init__(self, modelo: Type[Any]):
+        self.modelo = modelo
+        self._lock = threading.Lock()
+        self._carregado = False
+        self._termos: Dict[int, str] = {}
+        self._inativos: set = set()
+        self._postagens: Dict[str, array] = defaultdict(lambda: array("i"))
+
+    def _indexar(self, id_: int, termo: str, ativo: bool) -> None:
+        if ativo:
+            self._inativos.discard(id_)
+        else:
+            self._inativos.add(id_)
+        if self._termos.get(id_) == termo:
+            return
+        self._termos[id_] = termo
+        for trigrama in _trigramas(termo):
+            self._postagens[trigrama].append(id_)
+
+    def carregar(self, db: Session) -> None:
+        with self._lock:
+            if self._carregado:
+                return
+            tabela = self.modelo.__table__
+            linhas = db.exec(
+                select(tabela.c.id, tabela.c.termo_busca, tabela.c.active)
+                .where(tabela.c.termo_busca.is_not(None))
+                .execution_options(yield_per=10_000)
+            )
+            for id_, termo, ativo in linhas:
+                self._indexar(id_, termo, ativo)
+            self._carregado = True
+
+    def registrar(self, id_: int, termo: str, ativo: bool = True) -> None:
+        with self._lock:
+            if self._carregado:
+                self._indexar(id_, termo, ativo)
+
+    def remover(self, id_: int) -> None:
+        with self._lock:
+            self._termos.pop(id_, None)
+            self._inativos.discard(id_)
+
+    def invalidar(self) -> None:
+        with self._lock:
+            self._carregado = False
+            self._termos = {}
+            self._inativos = set()
+            self._postagens = defaultdict(lambda: array("i"))
+
+    def buscar(self, consulta: str, limit: int, include_inactive: bool = False) -> List[int]:
+        trigramas = _trigramas(consulta)
+        with self._lock:
+            if not trigramas:
+                candidatos: Iterable[int] = list(self._termos)
+            else:
+                postagens = [self._postagens.get(t) for t in trigramas]
+                if not all(postagens):
+                    return []
+                # A lista mais curta limita os candidatos a verificar
+                candidatos = set(min(postagens, key=len))
+            termos = self._termos
+            ignorados = set() if include_inactive else self._inativos
+            encontrados = [
+                _ordem(termos[id_], consulta, id_)
+                for id_ in candidatos
+                if id_ not in ignorados and consulta in termos.get(id_, "")
+            ]
+        return [ordem[-1] for ordem in heapq.nsmallest(limit, encontrados)]
+
+
+_indices: Dict[Type[Any], IndiceNgrama] = {
+    Cliente: IndiceNgrama(Cliente),
+    Fornecedor: IndiceNgrama(Fornecedor),
+}
+_trigrama_disponivel: Dict[str, bool] = {}
+
+def invalidar_indices() -> None:
+    """Descarta os índices em memória (o próximo uso recarrega do banco)."""
+    for indice in _indices.values():
+        indice.invalidar()
+
+def registrar_termos(modelo: Type[Any], termos: Iterable[Tuple[int, str]]) -> None:
+    """Leva ao índice em memória escritas que não passam pelo ORM (importação em lote)."""
+    indice = _indices[modelo]
+    for id_, termo in termos:
+        indice.registrar(id_, termo)
+
+def _usa_pg_trgm(db: Session) -> bool:
+    bind = db.get_bind()
+    if bind.dialect.name != "postgresql":
+        return False
+    chave = str(bind.url)
+    if chave not in _trigrama_disponivel:
+        _trigrama_disponivel[chave] = bool(db.exec(
+            text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        ).first())
+    return _trigrama_disponivel[chave]
+
+def criar_indices_trigrama(engine: Engine) -> bool:
+    """Cria a extensão pg_trgm e os índices GIN, se o servidor os oferecer."""
+    if engine.dialect.name != "postgresql":
+        return False
+    with engine.begin() as conn:
+        disponivel = conn.execute(
+            text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        ).first()
+        if not disponivel:
+            logger.warning("pg_trgm indisponível; a busca usará o índice em memória")
+            return False
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        for tabela, indice in INDICES_TRIGRAMA.items():
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS {indice} ON {tabela} "
+                "USING gin (termo_busca gin_trgm_ops) WHERE active"
+            ))
+    return True
+
+def _escapar_like(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def buscar(
+    db: Session,
+    modelo: Type[Any],
+    consulta: str,
+    limit: int = LIMITE_PADRAO,
+    campos: Optional[List[str]] = None,
+    include_inactive: bool = False,
+) -> List[Any]:
+    """
+    Devolve até ``limit`` registros de ``modelo`` que casam com ``consulta``, por
+    relevância. Com ``campos`` devolve linhas só com essas colunas (e o id);
+    com ``include_inactive``, também os desativados.
+    """
+    consulta = normalizar_consulta(consulta)
+    if not consulta:
+        return []
+
+    entidade = selecionar(modelo, campos, (modelo.id,)) if campos else select(modelo)
+    if _usa_pg_trgm(db):
+        coluna = modelo.termo_busca
+        if not include_inactive:
+            entidade = entidade.where(modelo.active == true())
+        return db.exec(
+            entidade
+            .where(coluna.like(f"%{_escapar_like(consulta)}%", escape="\\"))
+            .order_by(func.word_similarity(literal(consulta), coluna).desc(), modelo.id)
+            .limit(limit)
+        ).all()
+
+    indice = _indices[modelo]
+    indice.carregar(db)
+    ids = indice.buscar(consulta, limit, include_inactive)
+    if not ids:
+        return []
+    por_id = {r.id: r for r in db.exec(entidade.where(modelo.id.in_(ids))).all()}
+    return [por_id[id_] for id_ in ids if id_ in por_id]
+
+
+def _atualizar_termo(mapper: Any, connection: Any, alvo: Any) -> None:
+    alvo.termo_busca = montar_termo(alvo.nome, alvo.cnpj, alvo.email)
+
+def _registrar_no_indice(mapper: Any, connection: Any, alvo: Any) -> None:
+    _indices[type(alvo)].registrar(alvo.id, alvo.termo_busca, alvo.active)
+
+def _remover_do_indice(mapper: Any, connection: Any, alvo: Any) -> None:
+    _indices[type(alvo)].remover(alvo.id)
+
+for _modelo in _indices:
+    event.listen(_modelo, "before_insert", _atualizar_termo)
+    event.listen(_modelo, "before_update", _atualizar_termo)
+    event.listen(_modelo, "after_insert", _registrar_no_indice)
+    event.listen(_modelo, "after_update", _registrar_no_indice)
+    event.listen(_modelo, "after_delete", _remover_do_indice)
\ No newline at end of file
@@ -0,0 +1,84 @@
+"""
+Cache de leitura dos cadastros: clientes e fornecedores por id e
+fornecedores por categoria.
+
+São dados de referência que mudam pouco e são lidos a cada consulta de
+detalhe e a cada pagamento criado (verificação das chaves estrangeiras). As
+entradas guardam o cadastro já no formato da resposta. Os endpoints que
+escrevem invalidam as entradas depois do commit; escritas por outros caminhos
+valem após ``CADASTRO_CACHE_TTL`` segundos.
+
+As leituras ignoram os cadastros desativados (a exclusão só marca
+``active = false``), a não ser com ``include_inactive``. A lista da categoria
+em cache só tem os ativos; com os desativados ela é lida do banco.
+"""
+from typing import Any, AsyncContextManager, Callable, Dict, List, Optional, Type
+from fastapi import Query
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import true
+from sqlmodel import Session
+from ..core.cache import criar_cache
+from ..core.campos import campos_permitidos, projetar, selecionar
+from ..core.config import settings
+from ..models.cliente import Cliente
+from ..models.fornecedor import Fornecedor
+
+caches: Dict[Type[Any], Any] = {
+    Cliente: criar_cache("clientes", settings.CADASTRO_CACHE_TTL),
+    Fornecedor: criar_cache("fornecedores", settings.CADASTRO_CACHE_TTL),
+}
+cache_categorias = criar_cache("fornecedores_por_categoria", settings.CADASTRO_CACHE_TTL)
+
+INCLUIR_INATIVOS = Query(False, description="Inclui os cadastros desativados")
+
+def somente_ativos(modelo: Type[Any], consulta: Any, include_inactive: bool) -> Any:
+    """Filtra ``active`` como os índices parciais dos modelos, para que sejam usados."""
+    return consulta if include_inactive else consulta.where(modelo.active == true())
+
+def visivel(cadastro: Optional[dict], include_inactive: bool) -> Optional[dict]:
+    """O cadastro em cache, ou ``None`` se está desativado e não foi pedido."""
+    if cadastro is None or (not cadastro["active"] and not include_inactive):
+        return None
+    return cadastro
+
+def _cadastro(registro: Any) -> Optional[dict]:
+    return None if registro is None else jsonable_encoder(registro)
+
+def obter_cadastro(db: Session, modelo: Type[Any], id_: int) -> Optional[dict]:
+    """Cadastro ``id_`` de ``modelo`` como na resposta da API; ``None`` se não existe."""
+    return caches[modelo].obter(str(id_), lambda: _cadastro(db.get(modelo, id_)))
+
+async def obter_cadastro_async(
+    abrir_sessao: Callable[[], AsyncContextManager], modelo: Type[Any], id_: int
+) -> Optional[dict]:
+    """
+    Versão assíncrona de ``obter_cadastro``. A carga é compartilhada por todas
+    as requisições que esperam o mesmo id, então usa uma sessão própria, de
+    ``abrir_sessao``, e não a de quem a disparou: o cancelamento dessa
+    requisição não derruba a carga dos demais.
+    """
+    async def carregar() -> Optional[dict]:
+        async with abrir_sessao() as db:
+            return _cadastro(await db.get(modelo, id_))
+
+    return await caches[modelo].obter_async(str(id_), carregar)
+
+def fornecedores_da_categoria(db: Session, categoria: str, include_inactive: bool = False) -> List[dict]:
+    """Fornecedores da categoria, com todos os campos permitidos."""
+    def carregar() -> List[dict]:
+        campos = campos_permitidos(Fornecedor)
+        consulta = selecionar(Fornecedor, campos).where(Fornecedor.categoria == categoria)
+        linhas = db.exec(somente_ativos(Fornecedor, consulta, include_inactive)).all()
+        return jsonable_encoder(projetar(linhas, campos))
+
+    if include_inactive:
+        return carregar()
+    return cache_categorias.obter(categoria, carregar)
+
+def invalidar_cadastro(modelo: Type[Any], id_: int) -> None:
+    caches[modelo].delete(str(id_))
+
+def invalidar_categorias(*categorias: Optional[str]) -> None:
+    for categoria in set(categorias):
+        if categoria is not None:
+            cache_categorias.delete(categoria)
\ No newline at end of file
@@ -0,0 +1,58 @@
+import csv
+import io
+from typing import Any, Iterator, List
+from sqlmodel import Session, select
+from ..core.serializacao import dumps
+from ..models.pagamento import Pagamento
+
+# Linhas buscadas por ida ao cursor do servidor e escritas por bloco da resposta
+LINHAS_POR_BLOCO = 1000
+
+COLUNAS_EXPORTACAO = [
+    "id",
+    "numero_nota",
+    "fornecedor_id",
+    "cliente_id",
+    "data_emissao",
+    "data_vencimento",
+    "valor_total",
+    "valor_retencao",
+    "valor_liquido",
+    "status",
+    "vencido",
+    "arquivado",
+    "data_pagamento",
+    "processado_por",
+    "observacoes",
+]
+
+def _linhas(db: Session, filtros: List[Any]) -> Iterator[List[Any]]:
+    """
+    Percorre os pagamentos em blocos por um cursor do lado do servidor.
+
+    Com ``yield_per`` o driver busca ``LINHAS_POR_BLOCO`` linhas por vez
+    (cursor nomeado no Postgres), então a memória não cresce com o resultado.
+    """
+    tabela = Pagamento.__table__
+    statement = (
+        select(*[tabela.c[nome] for nome in COLUNAS_EXPORTACAO])
+        .where(*filtros)
+        .order_by(tabela.c.id)
+        .execution_options(yield_per=LINHAS_POR_BLOCO)
+    )
+    yield from db.exec(statement).partitions()
+
+def gerar_csv(db: Session, filtros: List[Any]) -> Iterator[str]:
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(COLUNAS_EXPORTACAO)
+    for bloco in _linhas(db, filtros):
+        escritor.writerows(bloco)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+def gerar_ndjson(db: Session, filtros: List[Any]) -> Iterator[bytes]:
+    for bloco in _linhas(db, filtros):
+        yield b"".join(dumps(dict(zip(COLUNAS_EXPORTACAO, linha))) + b"\n" for linha in bloco)
\ No newline at end of file
@@ -0,0 +1,238 @@
+"""
+Chaves de idempotência nas criações (cabeçalho ``Idempotency-Key``).
+
+A primeira requisição com a chave a reivindica inserindo a linha em
+``chaves_idempotencia``: a restrição única garante um dono só, mesmo entre
+processos. Ao terminar, a resposta (status e corpo) é gravada na chave no
+mesmo commit do que o endpoint escreveu, e fica guardada por
+``IDEMPOTENCIA_TTL`` segundos; as repetições são respondidas dali, sem tocar
+nas tabelas de pagamentos, com o cabeçalho ``Idempotent-Replayed``.
+
+Requisições simultâneas com a mesma chave esperam a primeira terminar (até
+``IDEMPOTENCIA_ESPERA`` segundos; depois, 409) e recebem a mesma resposta. Se
+a execução falha antes do commit, a chave é liberada e a repetição executa de
+novo; se o processo morre no meio, nada foi gravado e a reivindicação expira
+em ``IDEMPOTENCIA_EXECUCAO_MAX`` segundos. A mesma chave com outro corpo é
+recusada com 422.
+"""
+import asyncio
+import hashlib
+import time
+from datetime import datetime, timedelta
+from typing import Any, AsyncGenerator, Callable, Optional
+from fastapi import Depends, HTTPException, Request, Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from ..core.config import settings
+from ..core.deps import get_async_db, get_current_user
+from ..core.serializacao import dumps
+from ..models.idempotencia import ChaveIdempotencia
+from ..models.usuario import Usuario
+
+CABECALHO = "Idempotency-Key"
+CABECALHO_REPETIDA = "Idempotent-Replayed"
+TAMANHO_MAXIMO_CHAVE = 255
+# Intervalo entre consultas enquanto outra requisição executa a mesma chave
+INTERVALO_ESPERA = 0.05
+
+def _filtro(usuario_id: int, operacao: str, chave: str) -> list:
+    return [
+        ChaveIdempotencia.usuario_id == usuario_id,
+        ChaveIdempotencia.operacao == operacao,
+        ChaveIdempotencia.chave == chave,
+    ]
+
+def reivindicar(
+    db: Session, usuario_id: int, operacao: str, chave: str, hash_requisicao: str
+) -> Optional[ChaveIdempotencia]:
+    """
+    Reivindica a chave para esta requisição. Devolve ``None`` se conseguiu, ou
+    a linha existente (em execução ou concluída) de outra requisição.
+    """
+    while True:
+        agora = datetime.utcnow()
+        db.add(ChaveIdempotencia(
+            usuario_id=usuario_id,
+            operacao=operacao,
+            chave=chave,
+            hash_requisicao=hash_requisicao,
+            expira_em=agora + timedelta(seconds=settings.IDEMPOTENCIA_EXECUCAO_MAX),
+        ))
+        try:
+            db.commit()
+            return None
+        except IntegrityError:
+            db.rollback()
+
+        existente = db.exec(select(ChaveIdempotencia).where(*_filtro(usuario_id, operacao, chave))).first()
+        if existente is None:
+            continue  # liberada entre o insert e a leitura
+        if existente.expira_em > agora:
+            return existente
+        # Expirada: apaga só se ninguém a renovou nesse meio-tempo e tenta de novo
+        db.execute(delete(ChaveIdempotencia).where(
+            ChaveIdempotencia.id == existente.id,
+            ChaveIdempotencia.expira_em == existente.expira_em,
+        ))
+        db.commit()
+        db.expunge_all()
+
+def consultar(db: Session, usuario_id: int, operacao: str, chave: str) -> Optional[ChaveIdempotencia]:
+    db.expunge_all()
+    return db.exec(select(ChaveIdempotencia).where(*_filtro(usuario_id, operacao, chave))).first()
+
+def gravar_resposta(
+    db: Session, usuario_id: int, operacao: str, chave: str, status_code: int, corpo: bytes
+) -> None:
+    """Grava a resposta na chave, sem commit: vai junto com a transação de ``db``."""
+    db.execute(
+        update(ChaveIdempotencia)
+        .where(*_filtro(usuario_id, operacao, chave))
+        .values(
+            status_code=status_code,
+            resposta=corpo,
+            expira_em=datetime.utcnow() + timedelta(seconds=settings.IDEMPOTENCIA_TTL),
+        )
+    )
+
+def liberar(db: Session, usuario_id: int, operacao: str, chave: str) -> None:
+    """
+    Apaga a reivindicação de uma execução que falhou. Só a chave ainda sem
+    resposta é apagada: como a resposta é gravada no mesmo commit dos efeitos,
+    uma chave cujos efeitos já estão no banco nunca é liberada.
+    """
+    db.rollback()
+    db.execute(delete(ChaveIdempotencia).where(
+        *_filtro(usuario_id, operacao, chave), ChaveIdempotencia.status_code.is_(None)
+    ))
+    db.commit()
+
+def limpar_expiradas(db: Session) -> int:
+    """Apaga as chaves vencidas; usada pela tarefa periódica."""
+    resultado = db.execute(delete(ChaveIdempotencia).where(ChaveIdempotencia.expira_em < datetime.utcnow()))
+    db.commit()
+    return resultado.rowcount
+
+def _serializar(conteudo: Any, status_code: int) -> Response:
+    if isinstance(conteudo, Response):
+        return conteudo
+    return Response(
+        content=dumps(jsonable_encoder(conteudo)),
+        status_code=status_code,
+        media_type="application/json",
+    )
+
+def _repeticao(registro: ChaveIdempotencia) -> Response:
+    return Response(
+        content=registro.resposta,
+        status_code=registro.status_code,
+        media_type="application/json",
+        headers={CABECALHO_REPETIDA: "true"},
+    )
+
+
+class Execucao:
+    """
+    Estado da chave na requisição corrente. Com ``repeticao`` preenchida, o
+    endpoint a devolve sem executar nada; senão executa, só com flush, e
+    entrega o resultado a ``concluir``, que faz o único commit.
+    """
+
+    def __init__(self, db: AsyncSession, usuario_id: int, operacao: str, chave: Optional[str]):
+        self.db = db
+        self.usuario_id = usuario_id
+        self.operacao = operacao
+        self.chave = chave
+        self.repeticao: Optional[Response] = None
+        self.concluida = False
+
+    async def concluir(self, conteudo: Any, status_code: int = 200) -> Response:
+        """
+        Grava a resposta da chave e faz o commit de ``self.db``, com o que o
+        endpoint escreveu nela; devolve a resposta já serializada.
+        """
+        resposta = _serializar(conteudo, status_code)
+        await self.db.run_sync(self._gravar, resposta)
+        return resposta
+
+    def concluir_sincrono(self, db: Session, conteudo: Any, status_code: int = 200) -> Response:
+        """``concluir`` para endpoints que escrevem numa ``Session`` síncrona (no threadpool)."""
+        resposta = _serializar(conteudo, status_code)
+        self._gravar(db, resposta)
+        return resposta
+
+    def _gravar(self, db: Session, resposta: Response) -> None:
+        try:
+            if self.chave is not None:
+                gravar_resposta(
+                    db, self.usuario_id, self.operacao, self.chave, resposta.status_code, resposta.body
+                )
+            db.commit()
+        except Exception:
+            # Desfaz os efeitos antes de ``liberar`` soltar a chave
+            db.rollback()
+            raise
+        self.concluida = True
+
+    async def liberar(self) -> None:
+        if self.chave is not None and not self.concluida and self.repeticao is None:
+            await self.db.run_sync(liberar, self.usuario_id, self.operacao, self.chave)
+
+
+def idempotencia(operacao: str) -> Callable[..., AsyncGenerator[Execucao, None]]:
+    """
+    Dependência que aplica o ``Idempotency-Key`` ao endpoint. Sem o
+    cabeçalho, a execução segue normal e ``concluir`` só serializa e faz o
+    commit.
+    """
+    async def dependencia(
+        request: Request,
+        db: AsyncSession = Depends(get_async_db),
+        current_user: Usuario = Depends(get_current_user),
+    ) -> AsyncGenerator[Execucao, None]:
+        chave = request.headers.get(CABECALHO)
+        if not chave:
+            yield Execucao(db, current_user.id, operacao, None)
+            return
+        if len(chave) > TAMANHO_MAXIMO_CHAVE:
+            raise HTTPException(
+                status_code=400,
+                detail=f"{CABECALHO} deve ter no máximo {TAMANHO_MAXIMO_CHAVE} caracteres"
+            )
+
+        hash_requisicao = hashlib.sha256(await request.body()).hexdigest()
+        execucao = Execucao(db, current_user.id, operacao, chave)
+        limite = time.monotonic() + settings.IDEMPOTENCIA_ESPERA
+        existente = await db.run_sync(reivindicar, current_user.id, operacao, chave, hash_requisicao)
+        while existente is not None:
+            if existente.hash_requisicao != hash_requisicao:
+                raise HTTPException(
+                    status_code=422,
+                    detail=f"{CABECALHO} já usada com outro corpo de requisição"
+                )
+            if existente.status_code is not None:
+                execucao.repeticao = _repeticao(existente)
+                break
+            if time.monotonic() >= limite:
+                raise HTTPException(
+                    status_code=409,
+                    detail=f"Requisição com a mesma {CABECALHO} ainda em execução"
+                )
+            await asyncio.sleep(INTERVALO_ESPERA)
+            existente = await db.run_sync(consultar, current_user.id, operacao, chave)
+            if existente is None:
+                # A outra execução falhou e liberou a chave: tenta reivindicar
+                existente = await db.run_sync(reivindicar, current_user.id, operacao, chave, hash_requisicao)
+
+        try:
+            yield execucao
+        finally:
+            # Erro no endpoint (inclusive HTTPException e falha no commit) ou
+            # retorno sem concluir: nada foi gravado, e a chave volta a ficar
+            # livre para uma nova tentativa
+            await execucao.liberar()
+
+    return dependencia
\ No newline at end of file
@@ -0,0 +1,172 @@
+"""
+Importação de pagamentos em lote, a partir de JSON ou CSV.
+
+As linhas são validadas uma a uma, mas fornecedores e clientes (só os ativos)
+são conferidos com uma única consulta ``IN`` por tabela, a retenção é calculada
+para o lote inteiro e a inserção é feita em blocos de ``INSERT`` em massa, numa
+única transação. O resultado informa, para cada linha, o id criado ou os erros.
+"""
+import csv
+import io
+import json
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Tuple
+from fastapi import Request
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlmodel import Session, select
+from ..models.fornecedor import Fornecedor
+from ..models.pagamento import Pagamento
+from ..schemas.pagamento import PagamentoImportacao
+from .cadastros import somente_ativos
+from .resumo import DeltasResumo, aplicar_deltas
+from .retencao import calcular_lote, carregar_regras
+from .vencimento import esta_vencido
+
+LOTE_INSERCAO = 1000
+LIMITE_LINHAS = 100_000
+
+
+class ErroImportacao(ValueError):
+    """Conteúdo que não pode ser lido como lista de registros."""
+
+
+async def ler_requisicao(request: Request) -> Tuple[bytes, bool]:
+    """
+    Conteúdo enviado no corpo ou no campo ``arquivo`` de um
+    ``multipart/form-data``, e se ele é JSON (senão, CSV).
+    """
+    tipo = request.headers.get("content-type", "")
+    if tipo.startswith("multipart/form-data"):
+        form = await request.form()
+        arquivo = form.get("arquivo")
+        if arquivo is None or isinstance(arquivo, str):
+            raise ErroImportacao("Envie o arquivo no campo 'arquivo'")
+        return await arquivo.read(), (arquivo.filename or "").lower().endswith(".json")
+    return await request.body(), not tipo.startswith("text/csv")
+
+def ler_json(conteudo: bytes, nome: str = "pagamentos") -> List[Dict[str, Any]]:
+    try:
+        linhas = json.loads(conteudo)
+    except ValueError as e:
+        raise ErroImportacao(f"JSON inválido: {e}")
+    if not isinstance(linhas, list) or not all(isinstance(l, dict) for l in linhas):
+        raise ErroImportacao(f"O corpo deve ser uma lista de {nome}")
+    return linhas
+
+def _valor_csv(valor: str) -> str:
+    """Aceita ``1234.56`` e o formato brasileiro ``1.234,56``."""
+    if "," in valor:
+        return valor.replace(".", "").replace(",", ".")
+    return valor
+
+def ler_csv(conteudo: bytes, decimais: Iterable[str] = ("valor_total",)) -> List[Dict[str, Any]]:
+    try:
+        texto = conteudo.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise ErroImportacao("O CSV deve estar em UTF-8")
+    primeira_linha = texto.split("\n", 1)[0]
+    delimitador = ";" if primeira_linha.count(";") > primeira_linha.count(",") else ","
+    leitor = csv.DictReader(io.StringIO(texto), delimiter=delimitador)
+    if not leitor.fieldnames:
+        raise ErroImportacao("CSV sem cabeçalho")
+    linhas = []
+    for registro in leitor:
+        # Células vazias ficam de fora para valerem os padrões do esquema
+        linha = {k.strip(): v.strip() for k, v in registro.items() if k and v and v.strip()}
+        for campo in decimais:
+            if campo in linha:
+                linha[campo] = _valor_csv(linha[campo])
+        linhas.append(linha)
+    return linhas
+
+def mensagens(erro: ValidationError) -> List[str]:
+    return [f"{'.'.join(str(p) for p in e['loc'])}: {e['msg']}" for e in erro.errors()]
+
+def _existentes(db: Session, modelo: Any, ids: set) -> set:
+    if not ids:
+        return set()
+    consulta = select(modelo.id).where(modelo.id.in_(ids))
+    return set(db.exec(somente_ativos(modelo, consulta, False)).all())
+
+def importar_pagamentos(
+    db: Session, linhas: List[Dict[str, Any]], processado_por: str, commit: bool = True
+) -> Tuple[Dict[str, Any], List[int]]:
+    """
+    Valida e insere ``linhas``; devolve o relatório por linha e os ids dos
+    pagamentos pendentes criados, para processamento. Com ``commit=False`` a
+    transação fica aberta para quem chama gravar mais coisas no mesmo commit.
+    """
+    if len(linhas) > LIMITE_LINHAS:
+        raise ErroImportacao(f"No máximo {LIMITE_LINHAS} pagamentos por importação")
+
+    resultados: List[Dict[str, Any]] = []
+    validas: List[Tuple[int, PagamentoImportacao]] = []
+    for numero, linha in enumerate(linhas, start=1):
+        try:
+            validas.append((numero, PagamentoImportacao.parse_obj(linha)))
+        except ValidationError as e:
+            resultados.append({"linha": numero, "status": "erro", "erros": mensagens(e)})
+
+    fornecedores = _existentes(db, Fornecedor, {p.fornecedor_id for _, p in validas})
+    # Os clientes encontrados são os que têm regras
+    regras = carregar_regras(db, (p.cliente_id for _, p in validas if p.cliente_id))
+
+    aceitas: List[Tuple[int, PagamentoImportacao]] = []
+    for numero, pagamento in validas:
+        erros = []
+        if pagamento.fornecedor_id not in fornecedores:
+            erros.append("Fornecedor não encontrado")
+        if pagamento.cliente_id and pagamento.cliente_id not in regras:
+            erros.append("Cliente não encontrado")
+        if erros:
+            resultados.append({"linha": numero, "status": "erro", "erros": erros})
+        else:
+            aceitas.append((numero, pagamento))
+
+    retencoes = calcular_lote([
+        (pagamento.valor_total, regras.get(pagamento.cliente_id)) for _, pagamento in aceitas
+    ])
+    agora = datetime.utcnow()
+    hoje = date.today()
+    inserir: List[Tuple[int, Dict[str, Any]]] = [
+        (numero, {
+            **pagamento.dict(),
+            "valor_retencao": valor_retencao,
+            "valor_liquido": pagamento.valor_total - valor_retencao,
+            "processado_por": processado_por,
+            "vencido": esta_vencido(pagamento.status, pagamento.data_vencimento, hoje),
+            "created_at": agora,
+            "updated_at": agora,
+            "active": True,
+        })
+        for (numero, pagamento), valor_retencao in zip(aceitas, retencoes)
+    ]
+
+    tabela = Pagamento.__table__
+    conexao = db.connection()
+    pendentes = []
+    deltas = DeltasResumo()
+    for inicio in range(0, len(inserir), LOTE_INSERCAO):
+        bloco = inserir[inicio:inicio + LOTE_INSERCAO]
+        ids = conexao.execute(
+            insert(tabela).returning(tabela.c.id, sort_by_parameter_order=True),
+            [valores for _, valores in bloco],
+        ).scalars().all()
+        for (numero, valores), id_ in zip(bloco, ids):
+            resultados.append({"linha": numero, "status": "criado", "id": id_})
+            deltas.adicionar(valores)
+            if valores["status"] == "PENDENTE":
+                pendentes.append(id_)
+    aplicar_deltas(conexao, deltas)
+    if commit:
+        db.commit()
+
+    resultados.sort(key=lambda r: r["linha"])
+    criados = len(inserir)
+    return {
+        "total": len(linhas),
+        "criados": criados,
+        "erros": len(linhas) - criados,
+        "linhas": resultados,
+    }, pendentes
\ No newline at end of file
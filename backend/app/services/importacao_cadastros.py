@@ -0,0 +1,153 @@
+"""
+Importação de clientes e fornecedores em lote, com upsert pelo CNPJ.
+
+Cada bloco de ``LOTE_UPSERT`` linhas válidas é gravado numa transação própria
+com ``INSERT ... ON CONFLICT (cnpj) DO UPDATE``: o CNPJ novo é criado e o
+existente é atualizado (e reativado, se estava desativado) com os campos
+enviados na linha; os que faltam mantêm o valor gravado. Um bloco que falha
+não desfaz os anteriores, e as suas linhas voltam como erro.
+
+O upsert não passa pelo ORM: o ``termo_busca`` é calculado aqui, e depois de
+cada commit os caches de cadastros e o índice de busca em memória deste
+processo são atualizados, como fazem os endpoints de escrita.
+"""
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, FrozenSet, List, Tuple, Type
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import SQLAlchemyError
+from sqlmodel import Session, select
+from ..models.cliente import Cliente
+from ..models.fornecedor import Fornecedor
+from ..schemas.cadastro import ClienteImportacao, FornecedorImportacao
+from .busca import montar_termo, registrar_termos
+from .cadastros import invalidar_cadastro, invalidar_categorias
+from .importacao import LIMITE_LINHAS, ErroImportacao, ler_csv, ler_json, mensagens
+
+logger = logging.getLogger(__name__)
+
+LOTE_UPSERT = 1000
+ESQUEMAS: Dict[Type[Any], Type[BaseModel]] = {
+    Cliente: ClienteImportacao,
+    Fornecedor: FornecedorImportacao,
+}
+# Campos numéricos do CSV que aceitam o formato brasileiro (``1,5``)
+DECIMAIS_CSV: Dict[Type[Any], Tuple[str, ...]] = {
+    Cliente: ("percentual_retencao",),
+    Fornecedor: (),
+}
+
+def ler_cadastros(modelo: Type[Any], conteudo: bytes, json_enviado: bool) -> List[Dict[str, Any]]:
+    if json_enviado:
+        return ler_json(conteudo, modelo.__tablename__)
+    return ler_csv(conteudo, DECIMAIS_CSV[modelo])
+
+def _upsert(
+    conexao: Any, tabela: Any, linhas: List[Dict[str, Any]], atualizar: FrozenSet[str]
+) -> Dict[str, int]:
+    """Grava ``linhas`` e devolve o id de cada CNPJ; no conflito só ``atualizar`` muda."""
+    dialeto = postgresql if conexao.dialect.name == "postgresql" else sqlite
+    instrucao = dialeto.insert(tabela)
+    instrucao = instrucao.on_conflict_do_update(
+        index_elements=[tabela.c.cnpj],
+        set_={coluna: instrucao.excluded[coluna] for coluna in atualizar},
+    )
+    return dict(conexao.execute(instrucao.returning(tabela.c.cnpj, tabela.c.id), linhas).all())
+
+def _gravar_bloco(db: Session, modelo: Type[Any], bloco: List[Tuple[int, BaseModel]]) -> List[Dict[str, Any]]:
+    tabela = modelo.__table__
+    anteriores = {
+        linha.cnpj: linha
+        for linha in db.execute(select(tabela).where(tabela.c.cnpj.in_([c.cnpj for _, c in bloco])))
+    }
+
+    # Linhas com os mesmos campos informados vão no mesmo executemany; no
+    # conflito só esses campos são atualizados, como no PUT
+    agora = datetime.utcnow()
+    grupos: Dict[FrozenSet[str], List[Dict[str, Any]]] = defaultdict(list)
+    termos: Dict[str, str] = {}
+    for _, cadastro in bloco:
+        informados = frozenset(cadastro.dict(exclude_unset=True)) | {"termo_busca", "updated_at", "active"}
+        termos[cadastro.cnpj] = montar_termo(cadastro.nome, cadastro.cnpj, cadastro.email)
+        grupos[informados].append({
+            **cadastro.dict(),
+            "termo_busca": termos[cadastro.cnpj],
+            "created_at": agora,
+            "updated_at": agora,
+            "active": True,
+        })
+    conexao = db.connection()
+    ids: Dict[str, int] = {}
+    for atualizar, linhas in grupos.items():
+        ids.update(_upsert(conexao, tabela, linhas, atualizar))
+    db.commit()
+
+    for anterior in anteriores.values():
+        invalidar_cadastro(modelo, anterior.id)
+    if modelo is Fornecedor:
+        invalidar_categorias(
+            *(a.categoria for a in anteriores.values()), *(c.categoria for _, c in bloco)
+        )
+    registrar_termos(modelo, ((ids[cnpj], termo) for cnpj, termo in termos.items()))
+    return [
+        {
+            "linha": numero,
+            "status": "atualizado" if cadastro.cnpj in anteriores else "criado",
+            "id": ids[cadastro.cnpj],
+        }
+        for numero, cadastro in bloco
+    ]
+
+def importar_cadastros(db: Session, modelo: Type[Any], linhas: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Valida ``linhas`` e faz o upsert em ``modelo``; devolve o relatório por linha."""
+    if len(linhas) > LIMITE_LINHAS:
+        raise ErroImportacao(f"No máximo {LIMITE_LINHAS} cadastros por importação")
+
+    esquema = ESQUEMAS[modelo]
+    resultados: List[Dict[str, Any]] = []
+    validas: List[Tuple[int, BaseModel]] = []
+    primeira_linha: Dict[str, int] = {}
+    for numero, linha in enumerate(linhas, start=1):
+        try:
+            cadastro = esquema.parse_obj(linha)
+        except ValidationError as e:
+            resultados.append({"linha": numero, "status": "erro", "erros": mensagens(e)})
+            continue
+        # O mesmo CNPJ duas vezes no mesmo INSERT é rejeitado pelo ON CONFLICT
+        if cadastro.cnpj in primeira_linha:
+            resultados.append({
+                "linha": numero,
+                "status": "erro",
+                "erros": [f"CNPJ repetido na linha {primeira_linha[cadastro.cnpj]}"],
+            })
+            continue
+        primeira_linha[cadastro.cnpj] = numero
+        validas.append((numero, cadastro))
+
+    for inicio in range(0, len(validas), LOTE_UPSERT):
+        bloco = validas[inicio:inicio + LOTE_UPSERT]
+        try:
+            resultados.extend(_gravar_bloco(db, modelo, bloco))
+        except SQLAlchemyError:
+            db.rollback()
+            logger.exception(
+                "Falha ao importar o bloco de %s a partir da linha %s", modelo.__tablename__, bloco[0][0]
+            )
+            resultados.extend(
+                {"linha": numero, "status": "erro", "erros": ["Erro ao gravar o bloco desta linha"]}
+                for numero, _ in bloco
+            )
+
+    resultados.sort(key=lambda r: r["linha"])
+    contagem = defaultdict(int)
+    for resultado in resultados:
+        contagem[resultado["status"]] += 1
+    return {
+        "total": len(linhas),
+        "criados": contagem["criado"],
+        "atualizados": contagem["atualizado"],
+        "erros": contagem["erro"],
+        "linhas": resultados,
+    }
\ No newline at end of file
@@ -1,98 +1,285 @@
-from decimal import Decimal
-from typing import Optional
-from celery import Celery
-from sqlmodel import Session, select
-from ..core.config import settings
-from ..models.pagamento import Pagamento
-
-celery = Celery(
-    "pagamentos",
-    broker=f"redis://{settings.REDIS_HOST}:{settings.REDIS_PORT}/0"
-)
-
-def calcular_retencao(valor_total: Decimal, percentual_retencao: float) -> Decimal:
-    """
-    Calcula o valor da retenção baseado no percentual definido.
-    """
-    return Decimal(str(float(valor_total) * (percentual_retencao / 100)))
-
-@celery.task
-def processar_pagamento(pagamento_id: int) -> None:
-    """
-    Processa o pagamento de forma assíncrona.
-    
-    Este é um exemplo simplificado. Em produção, você deve:
-    1. Integrar com um gateway de pagamento
-    2. Implementar retry em caso de falhas
-    3. Notificar os interessados sobre o status
-    4. Gerar comprovantes
-    5. Registrar logs detalhados
-    """
-    from ..core.database import get_session
-    
-    db = next(get_session())
-    try:
-        pagamento = db.get(Pagamento, pagamento_id)
-        if not pagamento:
-            raise ValueError(f"Pagamento {pagamento_id} não encontrado")
-        
-        # Atualiza status para processando
-        pagamento.status = "PROCESSANDO"
-        db.add(pagamento)
-        db.commit()
-        
-        # Aqui você implementaria a integração com o gateway de pagamento
-        # Por enquanto, vamos apenas simular um processamento bem-sucedido
-        import time
-        time.sleep(2)  # Simula processamento
-        
-        # Atualiza para pago
-        pagamento.status = "PAGO"
-        db.add(pagamento)
-        db.commit()
-        
-    except Exception as e:
-        # Em caso de erro, marca como pendente novamente
-        pagamento = db.get(Pagamento, pagamento_id)
-        if pagamento:
-            pagamento.status = "PENDENTE"
-            pagamento.observacoes = f"Erro no processamento: {str(e)}"
-            db.add(pagamento)
-            db.commit()
-        raise
-    finally:
-        db.close()
-
-@celery.task
-def verificar_pagamentos_vencidos() -> None:
-    """
-    Tarefa periódica para verificar pagamentos vencidos.
-    """
-    from ..core.database import get_session
-    from datetime import date
-    
-    db = next(get_session())
-    try:
-        hoje = date.today()
-        pagamentos_vencidos = db.exec(
-            select(Pagamento).where(
-                (Pagamento.status == "PENDENTE") &
-                (Pagamento.data_vencimento < hoje)
-            )
-        ).all()
-        
-        for pagamento in pagamentos_vencidos:
-            pagamento.observacoes = f"Pagamento vencido em {pagamento.data_vencimento}"
-            db.add(pagamento)
-        
-        db.commit()
-    finally:
-        db.close()
-
-# Configuração das tarefas periódicas
-celery.conf.beat_schedule = {
-    'verificar-pagamentos-vencidos': {
-        'task': 'app.services.pagamento.verificar_pagamentos_vencidos',
-        'schedule': 3600.0,  # Executa a cada hora
-    },
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Any, Collection, Dict, List, Optional, Sequence
+from celery import Celery
+from sqlalchemy import and_, bindparam, update
+from sqlmodel import Session, select
+from ..core.config import settings
+from ..models.pagamento import Pagamento
+from .arquivamento import arquivar_pagamentos
+from .idempotencia import limpar_expiradas
+from .resumo import colunas_retorno, mover_no_resumo
+from .retencao import regras_para
+from .vencimento import varrer_vencidos
+
+logger = logging.getLogger(__name__)
+
+celery = Celery(
+    "pagamentos",
+    broker=f"redis://{settings.REDIS_HOST}:{settings.REDIS_PORT}/0"
+)
+
+# Latência simulada de uma chamada ao gateway de pagamento
+LATENCIA_GATEWAY_S = 2.0
+
+def calcular_retencao(valor_total: Decimal, percentual_retencao: float) -> Decimal:
+    """
+    Calcula o valor da retenção baseado no percentual definido.
+
+    Mantida por compatibilidade; as regras por regime tributário ficam em
+    ``services.retencao``.
+    """
+    return regras_para(None, percentual_retencao).total(valor_total)
+
+def enviar_ao_gateway(pagamento: Any) -> None:
+    """
+    Envia um pagamento ao gateway; erros de envio levantam exceção.
+
+    Por enquanto apenas simula a latência da chamada.
+    """
+    time.sleep(LATENCIA_GATEWAY_S)
+
+def reivindicar_pendentes(
+    db: Session,
+    limite: int,
+    ids: Optional[Sequence[int]] = None,
+    excluir: Collection[int] = (),
+) -> List[Any]:
+    """
+    Marca como ``PROCESSANDO`` até ``limite`` pagamentos pendentes, numa única
+    instrução, e devolve ``id``, ``valor_liquido``, ``fornecedor_id`` e os
+    demais campos do resumo de cada um.
+
+    No Postgres a subconsulta trava as linhas com ``FOR UPDATE SKIP LOCKED``:
+    workers concorrentes pulam as linhas já reivindicadas por outro, sem
+    esperar por elas nem processá-las em dobro. No SQLite, que ignora o
+    ``FOR UPDATE``, a escrita já é serializada pelo próprio banco.
+    """
+    tabela = Pagamento.__table__
+    candidatos = select(tabela.c.id).where(tabela.c.status == "PENDENTE")
+    if ids is not None:
+        candidatos = candidatos.where(tabela.c.id.in_(ids))
+    if excluir:
+        candidatos = candidatos.where(tabela.c.id.not_in(excluir))
+    candidatos = (
+        candidatos
+        .order_by(tabela.c.data_vencimento, tabela.c.id)
+        .limit(limite)
+        .with_for_update(skip_locked=True)
+    )
+    reivindicados = db.exec(
+        update(tabela)
+        .where(tabela.c.id.in_(candidatos), tabela.c.status == "PENDENTE")
+        .values(status="PROCESSANDO", vencido=False, updated_at=datetime.utcnow())
+        .returning(tabela.c.id, *colunas_retorno())
+    ).all()
+    mover_no_resumo(db.connection(), reivindicados, "PENDENTE", "PROCESSANDO")
+    db.commit()
+    return reivindicados
+
+def _devolver_pendentes(conexao: Any, condicao: Any, agora: datetime) -> List[Any]:
+    """
+    Volta a ``PENDENTE`` os pagamentos ``PROCESSANDO`` que atendem ``condicao``,
+    já marcando ``vencido``: o vencimento pode ter passado durante o envio.
+    """
+    tabela = Pagamento.__table__
+    devolvidos = conexao.execute(
+        update(tabela)
+        .where(condicao, tabela.c.status == "PROCESSANDO")
+        .values(status="PENDENTE", vencido=tabela.c.data_vencimento < date.today(), updated_at=agora)
+        .returning(tabela.c.id, *colunas_retorno())
+    ).all()
+    mover_no_resumo(conexao, devolvidos, "PROCESSANDO", "PENDENTE")
+    return devolvidos
+
+def devolver_reivindicacoes_expiradas(db: Session, agora: Optional[datetime] = None) -> int:
+    """
+    Devolve a ``PENDENTE`` os pagamentos reivindicados há mais de
+    ``PAGAMENTO_REIVINDICACAO_MAX`` segundos, deixados em ``PROCESSANDO`` por
+    um worker que caiu no meio do lote. O ``updated_at`` gravado na
+    reivindicação marca o início do prazo.
+    """
+    agora = agora or datetime.utcnow()
+    limite = agora - timedelta(seconds=settings.PAGAMENTO_REIVINDICACAO_MAX)
+    tabela = Pagamento.__table__
+    # Em processamento nunca é arquivado; no Postgres só lê a partição dos ativos
+    devolvidos = _devolver_pendentes(
+        db.connection(),
+        and_(tabela.c.arquivado.is_(False), tabela.c.updated_at < limite),
+        agora,
+    )
+    db.commit()
+    if devolvidos:
+        logger.warning("%s pagamentos em PROCESSANDO expirados voltaram a PENDENTE", len(devolvidos))
+    return len(devolvidos)
+
+def _processar_reivindicados(db: Session, reivindicados: List[Any]) -> List[int]:
+    """
+    Envia os pagamentos ao gateway em paralelo e grava os resultados em
+    massa: os enviados ficam ``PAGO``, os com erro voltam a ``PENDENTE``.
+    Devolve os ids que falharam.
+    """
+    pagos, falhas = [], []
+    concorrencia = max(1, min(settings.PAGAMENTO_CONCORRENCIA, len(reivindicados)))
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        futuros = {executor.submit(enviar_ao_gateway, p): p.id for p in reivindicados}
+        for futuro in as_completed(futuros):
+            try:
+                futuro.result()
+                pagos.append(futuros[futuro])
+            except Exception as e:
+                falhas.append({"_id": futuros[futuro], "observacoes": f"Erro no processamento: {str(e)}"})
+
+    tabela = Pagamento.__table__
+    conexao = db.connection()
+    agora = datetime.utcnow()
+    # Só os que continuam PROCESSANDO mudam (e entram no resumo): um
+    # cancelamento no meio do envio prevalece
+    if pagos:
+        alterados = conexao.execute(
+            update(tabela)
+            .where(tabela.c.id.in_(pagos), tabela.c.status == "PROCESSANDO")
+            .values(status="PAGO", vencido=False, data_pagamento=agora.date(), updated_at=agora)
+            .returning(*colunas_retorno())
+        ).all()
+        mover_no_resumo(conexao, alterados, "PROCESSANDO", "PAGO")
+    if falhas:
+        devolvidos = _devolver_pendentes(conexao, tabela.c.id.in_([f["_id"] for f in falhas]), agora)
+        devolvidos_ids = {d.id for d in devolvidos}
+        observacoes = [f for f in falhas if f["_id"] in devolvidos_ids]
+        if observacoes:
+            conexao.execute(
+                update(tabela)
+                .where(tabela.c.id == bindparam("_id"))
+                .values(observacoes=bindparam("observacoes")),
+                observacoes,
+            )
+    db.commit()
+    return [f["_id"] for f in falhas]
+
+@celery.task
+def processar_pendentes(limite: Optional[int] = None, max_lotes: Optional[int] = None) -> Dict[str, int]:
+    """
+    Processa os pagamentos pendentes em lotes de ``limite`` até não restar
+    nenhum. Pode rodar em quantos workers forem necessários ao mesmo tempo.
+    Pagamentos que falham não são reivindicados de novo na mesma execução.
+    Antes, devolve a ``PENDENTE`` as reivindicações expiradas.
+    """
+    from ..core.database import get_session
+
+    limite = limite or settings.PAGAMENTO_LOTE
+    totais = {"devolvidos": 0, "lotes": 0, "processados": 0, "falhas": 0}
+    falhados: set = set()
+    db = next(get_session())
+    try:
+        totais["devolvidos"] = devolver_reivindicacoes_expiradas(db)
+        while max_lotes is None or totais["lotes"] < max_lotes:
+            reivindicados = reivindicar_pendentes(db, limite, excluir=falhados)
+            if not reivindicados:
+                break
+            falhas = _processar_reivindicados(db, reivindicados)
+            falhados.update(falhas)
+            totais["lotes"] += 1
+            totais["processados"] += len(reivindicados)
+            totais["falhas"] += len(falhas)
+    finally:
+        db.close()
+    return totais
+
+@celery.task
+def processar_pagamentos_lote(pagamento_ids: List[int]) -> None:
+    """
+    Processa os pagamentos pendentes de uma importação, em lotes.
+
+    Usa a mesma reivindicação de ``processar_pendentes``, então os ids que
+    outro worker já pegou são simplesmente pulados.
+    """
+    from ..core.database import get_session
+
+    db = next(get_session())
+    try:
+        for inicio in range(0, len(pagamento_ids), settings.PAGAMENTO_LOTE):
+            bloco = pagamento_ids[inicio:inicio + settings.PAGAMENTO_LOTE]
+            reivindicados = reivindicar_pendentes(db, len(bloco), ids=bloco)
+            if reivindicados:
+                _processar_reivindicados(db, reivindicados)
+    finally:
+        db.close()
+
+@celery.task
+def processar_pagamento(pagamento_id: int) -> None:
+    """
+    Processa um único pagamento pela mesma reivindicação dos lotes: só é
+    enviado se ainda estiver ``PENDENTE`` e nenhum worker o tiver pego.
+    """
+    from ..core.database import get_session
+
+    db = next(get_session())
+    try:
+        reivindicados = reivindicar_pendentes(db, 1, ids=[pagamento_id])
+        if reivindicados:
+            _processar_reivindicados(db, reivindicados)
+    finally:
+        db.close()
+
+@celery.task
+def verificar_pagamentos_vencidos() -> Dict[str, Any]:
+    """
+    Tarefa periódica que marca os pendentes vencidos ainda sem a marca (ver
+    ``services.vencimento``).
+    """
+    from ..core.database import get_session
+
+    db = next(get_session())
+    try:
+        return varrer_vencidos(db)
+    finally:
+        db.close()
+
+@celery.task
+def limpar_chaves_idempotencia() -> int:
+    """Tarefa periódica que apaga as chaves de idempotência vencidas."""
+    from ..core.database import get_session
+
+    db = next(get_session())
+    try:
+        return limpar_expiradas(db)
+    finally:
+        db.close()
+
+@celery.task
+def arquivar_pagamentos_quitados() -> Dict[str, Any]:
+    """
+    Tarefa periódica que arquiva os pagamentos quitados antigos (ver
+    ``services.arquivamento``).
+    """
+    from ..core.database import get_session
+
+    db = next(get_session())
+    try:
+        return arquivar_pagamentos(db)
+    finally:
+        db.close()
+
+# Configuração das tarefas periódicas
+celery.conf.beat_schedule = {
+    'verificar-pagamentos-vencidos': {
+        'task': 'app.services.pagamento.verificar_pagamentos_vencidos',
+        'schedule': 3600.0,  # Executa a cada hora
+    },
+    'processar-pagamentos-pendentes': {
+        'task': 'app.services.pagamento.processar_pendentes',
+        'schedule': 60.0,  # Executa a cada minuto
+    },
+    'limpar-chaves-idempotencia': {
+        'task': 'app.services.pagamento.limpar_chaves_idempotencia',
+        'schedule': 3600.0,  # Executa a cada hora
+    },
+    'arquivar-pagamentos-quitados': {
+        'task': 'app.services.pagamento.arquivar_pagamentos_quitados',
+        'schedule': 86400.0,  # Executa uma vez por dia
+    },
 } 
\ No newline at end of file
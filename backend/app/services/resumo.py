@@ -0,0 +1,287 @@
+"""
+Resumo dos pagamentos para o painel.
+
+As tabelas de resumo guardam a quantidade e as somas de ``valor_total``,
+``valor_retencao`` e ``valor_liquido`` por status e mês de vencimento, por
+status e fornecedor, por status e cliente, e pela combinação completa de
+status, mês, fornecedor e cliente. Toda escrita em ``pagamentos`` aplica às
+tabelas a diferença que causou, na mesma transação. As escritas feitas pelo
+ORM são tratadas por um evento da sessão. As instruções em massa
+(importação, processamento) chamam ``aplicar_deltas``. A consulta lê a menor
+tabela que tem as dimensões pedidas, em vez de percorrer os pagamentos.
+
+``reconstruir_resumo`` recalcula as tabelas a partir dos pagamentos, para
+reparos:
+
+    python -m app.services.resumo
+"""
+import logging
+import time
+from datetime import date, datetime
+from decimal import Decimal
+from functools import partial
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+from sqlalchemy import Date, cast, delete, event, func, insert, inspect, literal, literal_column, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session as SessaoOrm
+from sqlmodel import Session, select
+from ..models.pagamento import Pagamento
+from ..models.resumo import (
+    ResumoPagamento,
+    ResumoPagamentoCliente,
+    ResumoPagamentoFornecedor,
+    ResumoPagamentoMes,
+)
+
+logger = logging.getLogger(__name__)
+
+ZERO = Decimal("0.00")
+CAMPOS_VALOR = ("valor_total", "valor_retencao", "valor_liquido")
+# Campos de pagamentos que determinam a linha do resumo e os valores somados
+CAMPOS = ("status", "data_vencimento", "fornecedor_id", "cliente_id") + CAMPOS_VALOR
+DIMENSOES = ("status", "mes", "fornecedor_id", "cliente_id")
+# Da menor para a maior; a última tem todas as dimensões
+RESUMOS = (ResumoPagamentoMes, ResumoPagamentoFornecedor, ResumoPagamentoCliente, ResumoPagamento)
+
+Chave = Tuple[str, date, int, int]
+
+def inicio_do_mes(dia: date) -> date:
+    return dia.replace(day=1)
+
+def _decimal(valor: Any) -> Decimal:
+    return valor if isinstance(valor, Decimal) else Decimal(str(valor or 0))
+
+def dimensoes(modelo: Any) -> Tuple[str, ...]:
+    return tuple(d for d in DIMENSOES if d in modelo.__table__.c)
+
+
+class DeltasResumo:
+    """Diferenças a aplicar no resumo, acumuladas por chave."""
+
+    def __init__(self) -> None:
+        self._deltas: Dict[Chave, List[Any]] = {}
+
+    def adicionar(self, linha: Any, sinal: int = 1, status: Optional[str] = None) -> None:
+        """
+        Soma um pagamento ao resumo, ou o subtrai com ``sinal=-1``. ``linha``
+        é um dicionário ou um objeto com os ``CAMPOS``; ``status``, se
+        informado, substitui o da linha.
+        """
+        valor = linha.get if isinstance(linha, Mapping) else partial(getattr, linha)
+        chave = (
+            status or valor("status"),
+            inicio_do_mes(valor("data_vencimento")),
+            valor("fornecedor_id"),
+            valor("cliente_id") or 0,
+        )
+        totais = self._deltas.setdefault(chave, [0, ZERO, ZERO, ZERO])
+        totais[0] += sinal
+        for i, campo in enumerate(CAMPOS_VALOR, start=1):
+            totais[i] += sinal * _decimal(valor(campo))
+
+    def mover(self, linha: Any, de: str, para: str) -> None:
+        """Passa um pagamento do status ``de`` para ``para``."""
+        self.adicionar(linha, -1, de)
+        self.adicionar(linha, 1, para)
+
+    def linhas(self, modelo: Any, agora: datetime) -> List[Dict[str, Any]]:
+        """Diferenças projetadas nas dimensões da tabela de resumo ``modelo``."""
+        campos = dimensoes(modelo)
+        posicoes = [DIMENSOES.index(d) for d in campos]
+        projetados: Dict[tuple, List[Any]] = {}
+        for chave, totais in self._deltas.items():
+            alvo = projetados.setdefault(tuple(chave[i] for i in posicoes), [0, ZERO, ZERO, ZERO])
+            for i, valor in enumerate(totais):
+                alvo[i] += valor
+        # Em ordem de chave: transações concorrentes travam as linhas do
+        # resumo na mesma sequência e não entram em deadlock
+        return [
+            {
+                **dict(zip(campos, chave)),
+                "quantidade": totais[0],
+                **dict(zip(CAMPOS_VALOR, totais[1:])),
+                "created_at": agora,
+                "updated_at": agora,
+                "active": True,
+            }
+            for chave, totais in sorted(projetados.items())
+            if any(totais)
+        ]
+
+
+def colunas_retorno() -> list:
+    """Colunas de ``pagamentos`` que um ``RETURNING`` precisa trazer para ``mover_no_resumo``."""
+    tabela = Pagamento.__table__
+    return [tabela.c[campo] for campo in CAMPOS if campo != "status"]
+
+def aplicar_deltas(conexao: Connection, deltas: DeltasResumo) -> None:
+    """Soma as diferenças às tabelas de resumo, com um upsert por tabela."""
+    agora = datetime.utcnow()
+    dialeto = postgresql if conexao.dialect.name == "postgresql" else sqlite
+    for modelo in RESUMOS:
+        linhas = deltas.linhas(modelo, agora)
+        if not linhas:
+            continue
+        tabela = modelo.__table__
+        instrucao = dialeto.insert(tabela)
+        instrucao = instrucao.on_conflict_do_update(
+            index_elements=list(dimensoes(modelo)),
+            set_={
+                **{
+                    coluna: tabela.c[coluna] + instrucao.excluded[coluna]
+                    for coluna in ("quantidade",) + CAMPOS_VALOR
+                },
+                "updated_at": instrucao.excluded.updated_at,
+            },
+        )
+        # Com RETURNING o SQLAlchemy agrupa as linhas em poucos INSERTs de
+        # vários VALUES; sem ele o psycopg2 faria uma ida ao banco por linha
+        conexao.execute(instrucao.returning(tabela.c.id), linhas)
+
+def mover_no_resumo(conexao: Connection, linhas: Iterable[Any], de: str, para: str) -> None:
+    """Registra no resumo a mudança de status de ``linhas`` (ver ``colunas_retorno``)."""
+    deltas = DeltasResumo()
+    for linha in linhas:
+        deltas.mover(linha, de, para)
+    aplicar_deltas(conexao, deltas)
+
+def _mes(coluna: Any, dialeto: str) -> Any:
+    # Literais em vez de parâmetros: o GROUP BY precisa repetir a expressão exata
+    if dialeto == "postgresql":
+        return cast(func.date_trunc(literal_column("'month'"), coluna), Date)
+    return func.date(coluna, literal_column("'start of month'"))
+
+def reconstruir_resumo(db: Session) -> Dict[str, Any]:
+    """Recalcula as tabelas de resumo a partir de ``pagamentos``."""
+    inicio = time.perf_counter()
+    conexao = db.connection()
+    dialeto = conexao.dialect.name
+    if dialeto == "postgresql":
+        # Escritas concorrentes esperam o fim da reconstrução e aplicam sua
+        # diferença sobre as tabelas já recalculadas
+        tabelas = ", ".join(modelo.__tablename__ for modelo in RESUMOS)
+        conexao.execute(text(f"LOCK TABLE {tabelas} IN EXCLUSIVE MODE"))
+
+    pagamentos = Pagamento.__table__
+    expressoes = {
+        "status": pagamentos.c.status,
+        "mes": _mes(pagamentos.c.data_vencimento, dialeto),
+        "fornecedor_id": pagamentos.c.fornecedor_id,
+        "cliente_id": func.coalesce(pagamentos.c.cliente_id, literal_column("0")),
+    }
+    agora = datetime.utcnow()
+    linhas = {}
+    for modelo in RESUMOS:
+        campos = dimensoes(modelo)
+        chave = [expressoes[campo] for campo in campos]
+        origem = select(
+            *chave,
+            func.count(),
+            *(func.coalesce(func.sum(pagamentos.c[campo]), 0) for campo in CAMPOS_VALOR),
+            literal(agora),
+            literal(agora),
+            literal(True),
+        ).group_by(*chave)
+        conexao.execute(delete(modelo.__table__))
+        resultado = conexao.execute(insert(modelo.__table__).from_select(
+            [*campos, "quantidade", *CAMPOS_VALOR, "created_at", "updated_at", "active"],
+            origem,
+        ))
+        linhas[modelo.__tablename__] = resultado.rowcount
+    db.commit()
+
+    metricas = {"linhas": linhas, "duracao_ms": round((time.perf_counter() - inicio) * 1000, 1)}
+    logger.info("Resumo de pagamentos reconstruído em %(duracao_ms)s ms: %(linhas)s", metricas)
+    return metricas
+
+def consultar_resumo(
+    db: Session,
+    agrupar: Sequence[str] = ("status",),
+    status: Optional[str] = None,
+    fornecedor_id: Optional[int] = None,
+    cliente_id: Optional[int] = None,
+    mes_inicio: Optional[date] = None,
+    mes_fim: Optional[date] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Totais agrupados pelas ``agrupar`` (entre ``DIMENSOES``), lidos da menor
+    tabela de resumo que tem as dimensões pedidas e filtradas. O custo
+    depende do número de linhas dessa tabela, não do número de pagamentos.
+    """
+    filtros = {
+        "status": status or None,
+        "fornecedor_id": fornecedor_id,
+        "cliente_id": cliente_id,
+    }
+    necessarias = set(agrupar) | {campo for campo, valor in filtros.items() if valor is not None}
+    if mes_inicio or mes_fim:
+        necessarias.add("mes")
+    modelo = next(m for m in RESUMOS if necessarias <= set(dimensoes(m)))
+
+    tabela = modelo.__table__
+    colunas = [tabela.c[dimensao] for dimensao in agrupar]
+    quantidade = func.sum(tabela.c.quantidade)
+    consulta = select(
+        *colunas,
+        quantidade.label("quantidade"),
+        *(func.sum(tabela.c[campo]).label(campo) for campo in CAMPOS_VALOR),
+    )
+    for campo, valor in filtros.items():
+        if valor is not None:
+            consulta = consulta.where(tabela.c[campo] == valor)
+    if mes_inicio:
+        consulta = consulta.where(tabela.c.mes >= inicio_do_mes(mes_inicio))
+    if mes_fim:
+        consulta = consulta.where(tabela.c.mes <= inicio_do_mes(mes_fim))
+    consulta = consulta.group_by(*colunas).having(quantidade != 0).order_by(*colunas)
+
+    linhas = []
+    for linha in db.exec(consulta).all():
+        item = dict(linha._mapping)
+        if "cliente_id" in item:
+            item["cliente_id"] = item["cliente_id"] or None
+        linhas.append(item)
+    return linhas
+
+
+def _estado_anterior(pagamento: Pagamento, sempre: bool = False) -> Optional[Dict[str, Any]]:
+    """Valores dos ``CAMPOS`` antes das alterações pendentes; ``None`` se nenhum mudou."""
+    estado = inspect(pagamento)
+    anterior, alterado = {}, False
+    for campo in CAMPOS:
+        historico = estado.attrs[campo].history
+        alterado = alterado or bool(historico.added or historico.deleted)
+        anterior[campo] = (historico.deleted or historico.unchanged or (None,))[0]
+    return anterior if alterado or sempre else None
+
+def _atualizar_resumo(sessao: SessaoOrm, contexto: Any) -> None:
+    deltas = DeltasResumo()
+    for alvo in sessao.new:
+        if isinstance(alvo, Pagamento):
+            deltas.adicionar(alvo)
+    for alvo in sessao.dirty:
+        if isinstance(alvo, Pagamento):
+            anterior = _estado_anterior(alvo)
+            if anterior is not None:
+                deltas.adicionar(anterior, -1)
+                deltas.adicionar(alvo)
+    for alvo in sessao.deleted:
+        if isinstance(alvo, Pagamento):
+            deltas.adicionar(_estado_anterior(alvo, sempre=True), -1)
+    aplicar_deltas(sessao.connection(), deltas)
+
+def _carregar_valor_anterior(alvo: Any, valor: Any, anterior: Any, iniciador: Any) -> None:
+    """Sem efeito; registrado com ``active_history`` para o histórico trazer o valor anterior."""
+
+# Sem active_history, alterar um atributo expirado (depois de um commit)
+# não carrega o valor anterior e o resumo não saberia de onde subtrair
+for _campo in CAMPOS:
+    event.listen(getattr(Pagamento, _campo), "set", _carregar_valor_anterior, active_history=True)
+event.listen(SessaoOrm, "after_flush", _atualizar_resumo)
+
+
+if __name__ == "__main__":
+    from ..core.database import get_session
+
+    print(reconstruir_resumo(next(get_session())))
\ No newline at end of file
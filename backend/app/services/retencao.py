@@ -0,0 +1,146 @@
+"""
+Retenção de tributos na fonte sobre os pagamentos.
+
+Cada regime tributário do cliente tem uma tabela de regras (IR, PIS, COFINS,
+CSLL, ISS) com alíquota, base mínima (valor total a partir do qual o tributo é
+retido) e valor mínimo de retenção, abaixo do qual ela é dispensada. Regras do
+mesmo grupo (PIS, COFINS e CSLL, recolhidos juntos) têm o valor mínimo
+aplicado à soma do grupo.
+
+A tabela do regime só vale para clientes sem ``percentual_retencao``: um
+percentual configurado, inclusive zero, substitui as regras do regime. O INSS
+de 11% depende do serviço (cessão de mão de obra), não do regime, e por isso
+não entra nas tabelas; quem o retém configura o percentual.
+
+Toda a conta é feita em ``Decimal``, com arredondamento por tributo para
+centavos. As regras são compiladas uma vez por combinação de regime e
+percentual e reaproveitadas entre clientes e requisições.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from sqlmodel import Session, select
+from ..models.cliente import Cliente
+from .cadastros import somente_ativos
+
+CENTAVO = Decimal("0.01")
+ZERO = Decimal("0.00")
+# Valor mínimo de DARF: retenções menores são dispensadas
+MINIMO_DARF = Decimal("10.00")
+
+
+class Regra(NamedTuple):
+    tributo: str
+    aliquota: Decimal  # fração do valor total: 0.015 = 1,5%
+    base_minima: Decimal = ZERO
+    valor_minimo: Decimal = ZERO
+    grupo: Optional[str] = None
+
+
+class Retencao(NamedTuple):
+    total: Decimal
+    por_tributo: Dict[str, Decimal]
+
+
+_CSRF = (
+    Regra("PIS", Decimal("0.0065"), valor_minimo=MINIMO_DARF, grupo="CSRF"),
+    Regra("COFINS", Decimal("0.03"), valor_minimo=MINIMO_DARF, grupo="CSRF"),
+    Regra("CSLL", Decimal("0.01"), valor_minimo=MINIMO_DARF, grupo="CSRF"),
+)
+
+REGRAS_POR_REGIME: Dict[str, Tuple[Regra, ...]] = {
+    "SIMPLES": (
+        Regra("ISS", Decimal("0.02")),
+    ),
+    "LUCRO_PRESUMIDO": (
+        Regra("IR", Decimal("0.015"), valor_minimo=MINIMO_DARF),
+        *_CSRF,
+        Regra("ISS", Decimal("0.05")),
+    ),
+    "LUCRO_REAL": (
+        Regra("IR", Decimal("0.015"), valor_minimo=MINIMO_DARF),
+        *_CSRF,
+        Regra("ISS", Decimal("0.05")),
+    ),
+}
+
+
+class RegrasRetencao:
+    """Regras de um cliente, agrupadas para o cálculo."""
+
+    def __init__(self, regras: Iterable[Regra]):
+        grupos: Dict[str, List[Regra]] = {}
+        for regra in regras:
+            grupos.setdefault(regra.grupo or regra.tributo, []).append(regra)
+        self._grupos = []
+        for nome, membros in grupos.items():
+            minimos = {r.valor_minimo for r in membros}
+            if len(minimos) > 1:
+                raise ValueError(f"Regras do grupo {nome} com valores mínimos diferentes")
+            self._grupos.append((
+                minimos.pop(),
+                tuple((r.tributo, r.aliquota, r.base_minima) for r in membros),
+            ))
+
+    def calcular(self, valor_total: Decimal) -> Retencao:
+        por_tributo: Dict[str, Decimal] = {}
+        total = ZERO
+        for valor_minimo, regras in self._grupos:
+            soma = ZERO
+            retidos = {}
+            for tributo, aliquota, base_minima in regras:
+                if valor_total >= base_minima:
+                    valor = (valor_total * aliquota).quantize(CENTAVO, ROUND_HALF_UP)
+                    retidos[tributo] = valor
+                    soma += valor
+            if soma and soma >= valor_minimo:
+                por_tributo.update(retidos)
+                total += soma
+        return Retencao(total, por_tributo)
+
+    def total(self, valor_total: Decimal) -> Decimal:
+        """Mesmo total de ``calcular``, sem montar o detalhamento por tributo."""
+        total = ZERO
+        for valor_minimo, regras in self._grupos:
+            soma = ZERO
+            for _, aliquota, base_minima in regras:
+                if valor_total >= base_minima:
+                    soma += (valor_total * aliquota).quantize(CENTAVO, ROUND_HALF_UP)
+            if soma and soma >= valor_minimo:
+                total += soma
+        return total
+
+
+@lru_cache(maxsize=1024)
+def regras_para(regime_tributario: Optional[str], percentual_retencao: Optional[float]) -> RegrasRetencao:
+    if percentual_retencao is not None:
+        percentual = Decimal(str(percentual_retencao))
+        regras = (Regra("RETENCAO", percentual / 100),) if percentual else ()
+    else:
+        regras = REGRAS_POR_REGIME.get((regime_tributario or "").upper(), ())
+    return RegrasRetencao(regras)
+
+def regras_do_cliente(cliente: Optional[Cliente]) -> RegrasRetencao:
+    """
+    Regras compiladas do cliente. O cache é pela combinação de regime e
+    percentual, então mudar o cadastro do cliente não exige invalidação.
+    """
+    if cliente is None:
+        return regras_para(None, None)
+    return regras_para(cliente.regime_tributario, cliente.percentual_retencao)
+
+def carregar_regras(db: Session, cliente_ids: Iterable[int]) -> Dict[int, RegrasRetencao]:
+    """Regras dos clientes ativos entre ``cliente_ids``, numa única consulta."""
+    ids = set(cliente_ids)
+    if not ids:
+        return {}
+    consulta = (
+        select(Cliente.id, Cliente.regime_tributario, Cliente.percentual_retencao)
+        .where(Cliente.id.in_(ids))
+    )
+    linhas = db.exec(somente_ativos(Cliente, consulta, False)).all()
+    return {id_: regras_para(regime, percentual) for id_, regime, percentual in linhas}
+
+def calcular_lote(itens: Iterable[Tuple[Decimal, Optional[RegrasRetencao]]]) -> List[Decimal]:
+    """Valor retido de cada ``(valor_total, regras)``; sem regras, nada é retido."""
+    return [regras.total(valor) if regras is not None else ZERO for valor, regras in itens]
\ No newline at end of file
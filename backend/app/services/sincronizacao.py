@@ -0,0 +1,48 @@
+"""
+Sincronização incremental ("changes since") de clientes, fornecedores e
+pagamentos.
+
+Toda escrita atualiza ``updated_at`` (``onupdate`` em ``BaseModel`` e os
+``UPDATE`` em lote dos serviços) e cada tabela tem o índice
+``(updated_at, id)``. O token é um cursor sobre essa chave: cada chamada
+devolve, em ordem, as linhas alteradas depois dele, inclusive as desativadas
+(``active = false``) e as canceladas, e o token da última linha entregue.
+
+``updated_at`` é atribuído antes do commit, e até o commit a linha é
+invisível; uma leitura nesse intervalo poderia entregar linhas posteriores e
+avançar o token além dela. Por isso só são entregues as alterações mais
+antigas que ``SINCRONIZACAO_MARGEM`` segundos: elas chegam com esse atraso,
+mas não se perdem enquanto nenhuma transação de escrita durar mais que isso.
+"""
+from datetime import datetime, timedelta
+from typing import Any, List, Optional, Type
+from sqlmodel import Session
+from ..core.campos import projetar, selecionar
+from ..core.config import settings
+from ..core.paginacao import codificar_cursor, paginar
+
+def alteracoes(
+    db: Session,
+    modelo: Type[Any],
+    token: Optional[str],
+    limit: int,
+    campos: List[str],
+) -> dict:
+    """
+    Até ``limit`` linhas de ``modelo`` alteradas depois de ``token`` (todas,
+    sem token). ``mais`` indica que há outra página disponível agora.
+    """
+    ordem = f"alteracoes:{modelo.__tablename__}"
+    chave = (modelo.updated_at, modelo.id)
+    limite = datetime.utcnow() - timedelta(seconds=settings.SINCRONIZACAO_MARGEM)
+    linhas, proximo = paginar(
+        db,
+        selecionar(modelo, campos, chave).where(modelo.updated_at <= limite),
+        ordem=ordem,
+        colunas=chave,
+        limit=limit,
+        cursor=token,
+    )
+    if linhas:
+        token = codificar_cursor(ordem, [linhas[-1].updated_at, linhas[-1].id])
+    return {"itens": projetar(linhas, campos), "token": token, "mais": proximo is not None}
\ No newline at end of file
@@ -0,0 +1,91 @@
+"""
+Marcação dos pagamentos vencidos.
+
+Um pagamento ``PENDENTE`` com vencimento anterior a hoje fica com
+``vencido = True``; ao sair de ``PENDENTE`` a marca é desfeita. Os que já
+nascem vencidos, ou passam a vencer por edição, são marcados na escrita pelos
+eventos do ORM; a importação em lote e as transições em massa do
+processamento marcam explicitamente. Os que vencem com a passagem do tempo são
+marcados pela varredura periódica, que só percorre os pendentes ainda não
+marcados, pelo índice parcial ``ix_pagamentos_pendentes_nao_vencidos``: os já
+marcados não são lidos de novo. As métricas da última execução ficam em
+``execucoes_tarefas`` e no Prometheus (``core.metricas``).
+"""
+import logging
+import time
+from datetime import date, datetime
+from typing import Any, Dict, Optional
+from sqlalchemy import event, update
+from sqlmodel import Session, select
+from ..core.metricas import varredura_vencidos_linhas, varredura_vencidos_segundos
+from ..models.pagamento import Pagamento
+from ..models.tarefa import ExecucaoTarefa
+
+logger = logging.getLogger(__name__)
+
+TAREFA_VARREDURA = "verificar_pagamentos_vencidos"
+LOTE_VARREDURA = 5000
+
+def esta_vencido(status: str, data_vencimento: date, hoje: Optional[date] = None) -> bool:
+    return status == "PENDENTE" and data_vencimento < (hoje or date.today())
+
+def varrer_vencidos(db: Session, hoje: Optional[date] = None, lote: int = LOTE_VARREDURA) -> Dict[str, Any]:
+    """
+    Marca os pendentes vencidos ainda não marcados, em blocos de ``lote``
+    linhas com um ``UPDATE`` por bloco. Devolve as métricas da execução.
+    """
+    inicio = time.perf_counter()
+    hoje = hoje or date.today()
+    execucao = db.exec(
+        select(ExecucaoTarefa).where(ExecucaoTarefa.nome == TAREFA_VARREDURA)
+    ).first() or ExecucaoTarefa(nome=TAREFA_VARREDURA)
+
+    tabela = Pagamento.__table__
+    candidatos = select(tabela.c.id).where(
+        # Pendentes nunca são arquivados; no Postgres evita ler as partições do arquivo
+        tabela.c.arquivado.is_(False),
+        tabela.c.status == "PENDENTE",
+        tabela.c.data_vencimento < hoje,
+        # Mesmo predicado do índice parcial. Sem limite inferior pela data da
+        # última varredura: um pagamento pode voltar a PENDENTE já vencido
+        ~tabela.c.vencido,
+    ).limit(lote)
+
+    linhas = lotes = 0
+    while True:
+        resultado = db.exec(
+            update(tabela)
+            .where(tabela.c.arquivado.is_(False), tabela.c.id.in_(candidatos))
+            .values(vencido=True, updated_at=datetime.utcnow())
+        )
+        db.commit()
+        linhas += resultado.rowcount
+        lotes += 1
+        if resultado.rowcount < lote:
+            break
+
+    segundos = time.perf_counter() - inicio
+    duracao_ms = round(segundos * 1000, 1)
+    varredura_vencidos_linhas.inc(linhas)
+    varredura_vencidos_segundos.observe(segundos)
+    execucao.linhas_afetadas = linhas
+    execucao.duracao_ms = duracao_ms
+    execucao.updated_at = datetime.utcnow()
+    db.add(execucao)
+    db.commit()
+
+    metricas = {"linhas": linhas, "lotes": lotes, "duracao_ms": duracao_ms}
+    logger.info(
+        "Varredura de vencidos: %(linhas)s linhas em %(lotes)s lotes, %(duracao_ms)s ms",
+        metricas,
+    )
+    return metricas
+
+
+def _marcar_vencido(mapper: Any, connection: Any, alvo: Pagamento) -> None:
+    # Fora de PENDENTE (pago, cancelado) esta_vencido é sempre falso
+    if alvo.data_vencimento:
+        alvo.vencido = esta_vencido(alvo.status, alvo.data_vencimento)
+
+event.listen(Pagamento, "before_insert", _marcar_vencido)
+event.listen(Pagamento, "before_update", _marcar_vencido)
\ No newline at end of file
@@ -1,114 +1,1194 @@
-from fastapi.testclient import TestClient
-from sqlmodel import Session, SQLModel, create_engine
-from sqlmodel.pool import StaticPool
-import pytest
-from ..main import app
-from ..core.deps import get_db
-from ..models.usuario import Usuario
-from ..core.security import get_password_hash
-
-# Criar banco de dados em memória para testes
-SQLALCHEMY_DATABASE_URL = "sqlite://"
-
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
-)
-
-def override_get_db():
-    try:
-        db = Session(engine)
-        yield db
-    finally:
-        db.close()
-
-app.dependency_overrides[get_db] = override_get_db
-
-@pytest.fixture
-def client():
-    SQLModel.metadata.create_all(engine)
-    with TestClient(app) as c:
-        yield c
-    SQLModel.metadata.drop_all(engine)
-
-@pytest.fixture
-def db():
-    db = Session(engine)
-    try:
-        yield db
-    finally:
-        db.close()
-
-@pytest.fixture
-def usuario_teste(db: Session):
-    usuario = Usuario(
-        email="teste@exemplo.com",
-        nome="Usuário Teste",
-        senha_hash=get_password_hash("senha123"),
-        is_active=True
-    )
-    db.add(usuario)
-    db.commit()
-    db.refresh(usuario)
-    return usuario
-
-def test_read_main(client: TestClient):
-    response = client.get("/")
-    assert response.status_code == 200
-    assert "message" in response.json()
-
-def test_create_user(client: TestClient):
-    response = client.post(
-        "/api/v1/auth/signup",
-        json={
-            "email": "novo@exemplo.com",
-            "password": "senha123",
-            "nome": "Novo Usuário"
-        }
-    )
-    assert response.status_code == 200
-    data = response.json()
-    assert "access_token" in data
-    assert data["token_type"] == "bearer"
-
-def test_login_user(client: TestClient, usuario_teste: Usuario):
-    response = client.post(
-        "/api/v1/auth/login",
-        data={
-            "username": usuario_teste.email,
-            "password": "senha123"
-        }
-    )
-    assert response.status_code == 200
-    data = response.json()
-    assert "access_token" in data
-    assert data["token_type"] == "bearer"
-
-def test_login_user_wrong_password(client: TestClient, usuario_teste: Usuario):
-    response = client.post(
-        "/api/v1/auth/login",
-        data={
-            "username": usuario_teste.email,
-            "password": "senha_errada"
-        }
-    )
-    assert response.status_code == 400
-
-def test_read_users_me(client: TestClient, usuario_teste: Usuario):
-    # Primeiro fazer login
-    login_response = client.post(
-        "/api/v1/auth/login",
-        data={
-            "username": usuario_teste.email,
-            "password": "senha123"
-        }
-    )
-    token = login_response.json()["access_token"]
-    
-    # Tentar acessar um endpoint protegido
-    response = client.get(
-        "/api/v1/clientes",
-        headers={"Authorization": f"Bearer {token}"}
-    )
-    assert response.status_code == 200 
\ No newline at end of file
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from fastapi.testclient import TestClient
+from passlib.context import CryptContext
+from sqlalchemy import event, update
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session, SQLModel, create_engine, select
+from sqlmodel.pool import StaticPool
+from prometheus_client import REGISTRY
+import pytest
+from ..main import app
+from ..api.v1.endpoints import pagamentos as endpoints_pagamentos
+from ..core import cache, limite, metricas_banco, security
+from ..core.config import settings
+from ..core.database import SessaoEmThreadpool
+from ..core.deps import get_async_db, get_db
+from ..models.usuario import Usuario
+from ..models.cliente import Cliente
+from ..models.fornecedor import Fornecedor
+from ..models.pagamento import Pagamento
+from ..models.idempotencia import ChaveIdempotencia
+from ..core.security import get_password_hash, pwd_context
+from ..services import busca, idempotencia
+from ..services.resumo import reconstruir_resumo
+
+# Criar banco de dados em memória para testes
+SQLALCHEMY_DATABASE_URL = "sqlite://"
+
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+metricas_banco.instrumentar_sql(engine)
+
+def override_get_db():
+    try:
+        db = Session(engine)
+        yield db
+    finally:
+        db.close()
+
+async def override_get_async_db():
+    with Session(engine, expire_on_commit=False) as db:
+        yield SessaoEmThreadpool(db)
+
+app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_async_db] = override_get_async_db
+
+@pytest.fixture
+def client():
+    SQLModel.metadata.create_all(engine)
+    cache.limpar_caches()
+    limite.limpar_limitadores()
+    with TestClient(app) as c:
+        yield c
+    SQLModel.metadata.drop_all(engine)
+    busca.invalidar_indices()
+    cache.limpar_caches()
+    limite.limpar_limitadores()
+
+@pytest.fixture
+def db():
+    db = Session(engine)
+    try:
+        yield db
+    finally:
+        db.close()
+
+@pytest.fixture
+def usuario_teste(db: Session):
+    usuario = Usuario(
+        email="teste@exemplo.com",
+        nome="Usuário Teste",
+        senha_hash=get_password_hash("senha123"),
+        is_active=True
+    )
+    db.add(usuario)
+    db.commit()
+    db.refresh(usuario)
+    return usuario
+
+@pytest.fixture
+def auth_headers(client: TestClient, usuario_teste: Usuario):
+    response = client.post(
+        "/api/v1/auth/login",
+        data={
+            "username": usuario_teste.email,
+            "password": "senha123"
+        }
+    )
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+@pytest.fixture
+def pagamentos_teste(db: Session):
+    fornecedor = Fornecedor(
+        nome="Fornecedor Teste",
+        cnpj="98.765.432/0001-10",
+        email="financeiro@teste.com"
+    )
+    db.add(fornecedor)
+    db.commit()
+    db.refresh(fornecedor)
+    hoje = date.today()
+    pagamentos = [
+        Pagamento(
+            fornecedor_id=fornecedor.id,
+            numero_nota=f"NF-{i}",
+            data_emissao=hoje,
+            # Vencimentos fora da ordem dos ids, com empates
+            data_vencimento=hoje + timedelta(days=(7 - i) // 2),
+            valor_total=Decimal("100.00"),
+            valor_liquido=Decimal("100.00"),
+        )
+        for i in range(7)
+    ]
+    db.add_all(pagamentos)
+    db.commit()
+    return pagamentos
+
+def test_read_main(client: TestClient):
+    response = client.get("/")
+    assert response.status_code == 200
+    assert "message" in response.json()
+
+def test_create_user(client: TestClient):
+    response = client.post(
+        "/api/v1/auth/signup",
+        json={
+            "email": "novo@exemplo.com",
+            "password": "senha123",
+            "nome": "Novo Usuário"
+        }
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert "access_token" in data
+    assert data["token_type"] == "bearer"
+
+def test_login_user(client: TestClient, usuario_teste: Usuario):
+    response = client.post(
+        "/api/v1/auth/login",
+        data={
+            "username": usuario_teste.email,
+            "password": "senha123"
+        }
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert "access_token" in data
+    assert data["token_type"] == "bearer"
+
+def test_login_user_wrong_password(client: TestClient, usuario_teste: Usuario):
+    response = client.post(
+        "/api/v1/auth/login",
+        data={
+            "username": usuario_teste.email,
+            "password": "senha_errada"
+        }
+    )
+    assert response.status_code == 400
+
+def test_login_regrava_hash_desatualizado(client: TestClient, db: Session):
+    # Hash gerado com custo menor que o configurado
+    hash_antigo = CryptContext(schemes=["bcrypt"]).hash("senha123", rounds=4)
+    usuario = Usuario(email="antigo@exemplo.com", nome="Antigo", senha_hash=hash_antigo)
+    db.add(usuario)
+    db.commit()
+
+    response = client.post(
+        "/api/v1/auth/login",
+        data={"username": "antigo@exemplo.com", "password": "senha123"}
+    )
+    assert response.status_code == 200
+
+    db.refresh(usuario)
+    assert usuario.senha_hash != hash_antigo
+    assert not pwd_context.needs_update(usuario.senha_hash)
+    assert pwd_context.verify("senha123", usuario.senha_hash)
+
+def test_read_users_me(client: TestClient, usuario_teste: Usuario):
+    # Primeiro fazer login
+    login_response = client.post(
+        "/api/v1/auth/login",
+        data={
+            "username": usuario_teste.email,
+            "password": "senha123"
+        }
+    )
+    token = login_response.json()["access_token"]
+    
+    # Tentar acessar um endpoint protegido
+    response = client.get(
+        "/api/v1/clientes",
+        headers={"Authorization": f"Bearer {token}"}
+    )
+    assert response.status_code == 200 
+
+def test_usuario_autenticado_em_cache_e_invalidado(
+    client: TestClient, db: Session, usuario_teste: Usuario, auth_headers: dict
+):
+    for _ in range(3):
+        assert client.get("/api/v1/clientes", headers=auth_headers).status_code == 200
+    stats = cache.estatisticas()["principais"]
+    assert stats["faltas"] == 1
+    assert stats["acertos"] == 2
+
+    # Desativar pelo ORM invalida o cache no commit
+    usuario_teste.is_active = False
+    db.add(usuario_teste)
+    db.commit()
+    response = client.get("/api/v1/clientes", headers=auth_headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Usuário inativo"
+
+def test_estatisticas_cache_exige_superusuario(
+    client: TestClient, db: Session, usuario_teste: Usuario, auth_headers: dict
+):
+    assert client.get("/api/v1/sistema/cache", headers=auth_headers).status_code == 400
+
+    usuario_teste.is_superuser = True
+    db.add(usuario_teste)
+    db.commit()
+    client.get("/api/v1/sistema/cache", headers=auth_headers)
+    response = client.get("/api/v1/sistema/cache", headers=auth_headers)
+    assert response.status_code == 200
+    stats = response.json()["principais"]
+    assert stats["backend"] == "memoria"
+    assert 0 < stats["taxa_acerto"] < 1
+
+def _percorrer_com_cursor(client: TestClient, url: str, headers: dict) -> list:
+    vistos = []
+    cursor = None
+    while True:
+        params = {"limit": 3}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get(url, params=params, headers=headers)
+        assert response.status_code == 200
+        vistos.extend(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return vistos
+
+def test_read_pagamentos_cursor(client: TestClient, auth_headers: dict, pagamentos_teste: list):
+    pagina = _percorrer_com_cursor(client, "/api/v1/pagamentos/", auth_headers)
+    assert [p["id"] for p in pagina] == sorted(p.id for p in pagamentos_teste)
+
+    pagina = _percorrer_com_cursor(
+        client, "/api/v1/pagamentos/?ordem=vencimento", auth_headers
+    )
+    esperado = sorted(pagamentos_teste, key=lambda p: (p.data_vencimento, p.id))
+    assert [p["id"] for p in pagina] == [p.id for p in esperado]
+
+def test_read_pagamentos_filtros_combinados(
+    client: TestClient, db: Session, auth_headers: dict, pagamentos_teste: list
+):
+    pagamentos_teste[1].status = "PAGO"
+    pagamentos_teste[2].status = "CANCELADO"
+    pagamentos_teste[4].valor_total = Decimal("300.00")
+    db.add_all(pagamentos_teste)
+    db.commit()
+    hoje = date.today()
+
+    url = (
+        "/api/v1/pagamentos/?status=PENDENTE,PAGO&ordem=-vencimento"
+        f"&vencimento_de={hoje + timedelta(days=1)}"
+    )
+    pagina = _percorrer_com_cursor(client, url, auth_headers)
+    esperado = sorted(
+        (p for p in pagamentos_teste
+         if p.status in ("PENDENTE", "PAGO") and p.data_vencimento >= hoje + timedelta(days=1)),
+        key=lambda p: (p.data_vencimento, p.id),
+        reverse=True,
+    )
+    assert [p["id"] for p in pagina] == [p.id for p in esperado]
+
+    response = client.get(
+        "/api/v1/pagamentos/",
+        params={
+            "status": ["PENDENTE", "CANCELADO"],
+            "fornecedor_id": pagamentos_teste[0].fornecedor_id,
+            "valor_min": "200",
+            "emissao_ate": hoje.isoformat(),
+        },
+        headers=auth_headers,
+    )
+    assert [p["id"] for p in response.json()] == [pagamentos_teste[4].id]
+
+    # A exportação aceita os mesmos filtros
+    response = client.get(
+        "/api/v1/pagamentos/export",
+        params={"format": "ndjson", "status": "PAGO,CANCELADO"},
+        headers=auth_headers,
+    )
+    assert [json.loads(l)["id"] for l in response.text.splitlines()] == [
+        pagamentos_teste[1].id, pagamentos_teste[2].id
+    ]
+
+@pytest.fixture
+def consultas():
+    """Instruções SQL executadas no banco de teste enquanto a fixture está ativa."""
+    executadas = []
+
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        executadas.append(statement)
+
+    event.listen(engine, "before_cursor_execute", registrar)
+    yield executadas
+    event.remove(engine, "before_cursor_execute", registrar)
+
+def test_read_pagamentos_expand_numero_fixo_de_consultas(
+    client: TestClient, db: Session, auth_headers: dict, consultas: list
+):
+    fornecedores = [Fornecedor(nome=f"F{i}", cnpj=f"F{i}", email=f"f{i}@f.com") for i in range(4)]
+    clientes = [Cliente(nome=f"C{i}", cnpj=f"C{i}", email=f"c{i}@c.com") for i in range(3)]
+    db.add_all(fornecedores + clientes)
+    db.commit()
+    hoje = date.today()
+    db.add_all([
+        Pagamento(
+            fornecedor_id=fornecedores[i % 4].id,
+            cliente_id=clientes[i % 3].id if i % 5 else None,
+            numero_nota=f"NF-{i}",
+            data_emissao=hoje,
+            data_vencimento=hoje,
+            valor_total=Decimal("10.00"),
+            valor_liquido=Decimal("10.00"),
+        )
+        for i in range(30)
+    ])
+    db.commit()
+    # Usuário autenticado já em cache
+    client.get("/api/v1/pagamentos/", params={"limit": 1}, headers=auth_headers)
+
+    for limit in (5, 30):
+        consultas.clear()
+        response = client.get(
+            "/api/v1/pagamentos/",
+            params={"expand": "fornecedor,cliente", "limit": limit},
+            headers=auth_headers,
+        )
+        assert response.status_code == 200
+        # Página, fornecedores e clientes, qualquer que seja o tamanho da página
+        assert len(consultas) == 3
+    pagamentos = response.json()
+    assert len(pagamentos) == 30
+    assert all(p["fornecedor"]["id"] == p["fornecedor_id"] for p in pagamentos)
+    assert all((p["cliente"] or {}).get("id") == p["cliente_id"] for p in pagamentos)
+    assert "termo_busca" not in pagamentos[0]["fornecedor"]
+
+    consultas.clear()
+    response = client.get(
+        f"/api/v1/pagamentos/{pagamentos[1]['id']}",
+        params={"expand": "fornecedor"},
+        headers=auth_headers,
+    )
+    assert response.json()["fornecedor"]["nome"] == pagamentos[1]["fornecedor"]["nome"]
+    assert "cliente" not in response.json()
+    assert len(consultas) == 2
+
+    # Sem expand a resposta continua a mesma
+    response = client.get("/api/v1/pagamentos/", params={"limit": 1}, headers=auth_headers)
+    assert "fornecedor" not in response.json()[0]
+    response = client.get("/api/v1/pagamentos/", params={"expand": "usuario"}, headers=auth_headers)
+    assert response.status_code == 400
+
+def test_listagens_com_fields_projetam_colunas(
+    client: TestClient, db: Session, auth_headers: dict, pagamentos_teste: list, consultas: list
+):
+    db.add(Cliente(nome="Cliente Teste", cnpj="11.222.333/0001-44", email="cliente@teste.com"))
+    db.commit()
+    fornecedor_id = pagamentos_teste[0].fornecedor_id
+    consultas.clear()
+    response = client.get(
+        "/api/v1/fornecedores/", params={"fields": "id,nome"}, headers=auth_headers
+    )
+    assert response.status_code == 200
+    assert response.json() == [{"id": fornecedor_id, "nome": "Fornecedor Teste"}]
+    # Só as colunas pedidas são lidas do banco
+    [consulta] = [c for c in consultas if "FROM fornecedores" in c]
+    assert "banco" not in consulta and "nome" in consulta
+
+    # A chave de ordenação entra na consulta para o cursor, mas não na resposta
+    url = "/api/v1/pagamentos/?fields=numero_nota,valor_total&ordem=-vencimento"
+    pagina = _percorrer_com_cursor(client, url, auth_headers)
+    esperado = sorted(pagamentos_teste, key=lambda p: (p.data_vencimento, p.id), reverse=True)
+    assert pagina == [
+        {"numero_nota": p.numero_nota, "valor_total": float(p.valor_total)} for p in esperado
+    ]
+
+    response = client.get(
+        "/api/v1/pagamentos/",
+        params={"fields": "id", "expand": "fornecedor", "limit": 1},
+        headers=auth_headers,
+    )
+    assert set(response.json()[0]) == {"id", "fornecedor"}
+    assert response.json()[0]["fornecedor"]["nome"] == "Fornecedor Teste"
+
+    response = client.get(
+        "/api/v1/clientes/search/",
+        params={"query": "cliente", "fields": "nome"},
+        headers=auth_headers,
+    )
+    assert response.json() == [{"nome": "Cliente Teste"}]
+
+    for url, fields in (
+        ("/api/v1/clientes/", "id,termo_busca"),
+        ("/api/v1/fornecedores/search/?query=x", "senha"),
+        ("/api/v1/pagamentos/", "fornecedor"),
+        ("/api/v1/pagamentos/status/PENDENTE", ","),
+    ):
+        response = client.get(url, params={"fields": fields}, headers=auth_headers)
+        assert response.status_code == 400
+
+def test_listagem_decimal_exato_e_compressao(
+    client: TestClient, auth_headers: dict, pagamentos_teste: list
+):
+    identidade = {**auth_headers, "Accept-Encoding": "identity"}
+    response = client.get("/api/v1/pagamentos/", params={"limit": 1}, headers=identidade)
+    assert "content-encoding" not in response.headers
+    # Decimal sai com as casas do banco, sem passar por float
+    assert b'"valor_total":100.00' in response.content
+    assert response.json()[0]["data_vencimento"] == pagamentos_teste[0].data_vencimento.isoformat()
+    completa = client.get("/api/v1/pagamentos/", headers=identidade)
+
+    for aceita, esperada in (("gzip", "gzip"), ("gzip, br", "br"), ("br;q=0, gzip", "gzip")):
+        response = client.get(
+            "/api/v1/pagamentos/", headers={**auth_headers, "Accept-Encoding": aceita}
+        )
+        assert response.headers["content-encoding"] == esperada
+        assert int(response.headers["content-length"]) < len(completa.content)
+        assert response.json() == completa.json()
+
+    # Abaixo do mínimo a resposta vai sem compressão
+    response = client.get(
+        "/api/v1/pagamentos/", params={"limit": 1, "fields": "id"},
+        headers={**auth_headers, "Accept-Encoding": "br"},
+    )
+    assert "content-encoding" not in response.headers
+
+    # Streaming: cada bloco da exportação é comprimido e descarregado
+    response = client.get(
+        "/api/v1/pagamentos/export",
+        params={"format": "ndjson"},
+        headers={**auth_headers, "Accept-Encoding": "gzip"},
+    )
+    assert response.headers["content-encoding"] == "gzip"
+    assert len(response.text.splitlines()) == len(pagamentos_teste)
+
+def test_read_pagamentos_skip_continua_funcionando(
+    client: TestClient, auth_headers: dict, pagamentos_teste: list
+):
+    response = client.get(
+        "/api/v1/pagamentos/", params={"skip": 5, "limit": 3}, headers=auth_headers
+    )
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+    assert "X-Next-Cursor" not in response.headers
+
+def test_read_pagamentos_cursor_invalido(client: TestClient, auth_headers: dict):
+    response = client.get(
+        "/api/v1/pagamentos/", params={"cursor": "invalido"}, headers=auth_headers
+    )
+    assert response.status_code == 400
+
+def test_export_pagamentos_csv(client: TestClient, auth_headers: dict, pagamentos_teste: list):
+    response = client.get(
+        "/api/v1/pagamentos/export", params={"format": "csv"}, headers=auth_headers
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    linhas = response.text.strip().splitlines()
+    assert linhas[0].startswith("id,numero_nota")
+    assert len(linhas) == len(pagamentos_teste) + 1
+
+def test_export_pagamentos_ndjson_filtrado(
+    client: TestClient, auth_headers: dict, pagamentos_teste: list
+):
+    vencimento = pagamentos_teste[0].data_vencimento
+    response = client.get(
+        "/api/v1/pagamentos/export",
+        params={"format": "ndjson", "data_vencimento": vencimento.isoformat()},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+    linhas = [json.loads(linha) for linha in response.text.splitlines()]
+    esperados = [p.id for p in pagamentos_teste if p.data_vencimento == vencimento]
+    assert [linha["id"] for linha in linhas] == esperados
+    assert linhas[0]["valor_total"] == 100.0
+
+def test_arquivados_so_com_include_archived(
+    client: TestClient, auth_headers: dict, pagamentos_teste: list, db: Session
+):
+    arquivado = pagamentos_teste[0]
+    db.exec(update(Pagamento).where(Pagamento.id == arquivado.id).values(status="PAGO", arquivado=True))
+    db.commit()
+    ativos = {p.id for p in pagamentos_teste} - {arquivado.id}
+    vencimento = arquivado.data_vencimento.isoformat()
+
+    def ids(url: str, **params) -> set:
+        response = client.get(url, params=params, headers=auth_headers)
+        assert response.status_code == 200
+        return {item["id"] for item in response.json()}
+
+    assert ids("/api/v1/pagamentos/") == ativos
+    assert ids("/api/v1/pagamentos/", include_archived=True) == ativos | {arquivado.id}
+    assert arquivado.id not in ids(f"/api/v1/pagamentos/vencimento/{vencimento}")
+    assert arquivado.id in ids(f"/api/v1/pagamentos/vencimento/{vencimento}", include_archived=True)
+    assert ids("/api/v1/pagamentos/status/PAGO") == set()
+    assert ids("/api/v1/pagamentos/status/PAGO", include_archived=True) == {arquivado.id}
+
+    url = f"/api/v1/pagamentos/{arquivado.id}"
+    assert client.get(url, headers=auth_headers).status_code == 404
+    response = client.get(url, params={"include_archived": True}, headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["arquivado"] is True
+
+    response = client.get(
+        "/api/v1/pagamentos/export",
+        params={"format": "ndjson", "include_archived": True},
+        headers=auth_headers,
+    )
+    assert len(response.text.splitlines()) == len(pagamentos_teste)
+
+def test_search_clientes_normalizada_e_ordenada(client: TestClient, auth_headers: dict):
+    clientes = [
+        ("Padaria São José", "11.111.111/0001-11", "contato@padaria.com"),
+        ("Construtora Josefina", "22.222.222/0001-22", "obras@josefina.com"),
+        ("Mercado Central", "12.345.678/0001-90", "vendas@superjose.com"),
+    ]
+    for nome, cnpj, email in clientes:
+        response = client.post(
+            "/api/v1/clientes/",
+            json={"nome": nome, "cnpj": cnpj, "email": email},
+            headers=auth_headers,
+        )
+        assert response.status_code == 200
+        assert "termo_busca" not in response.json()
+
+    response = client.get(
+        "/api/v1/clientes/search/", params={"query": "JOSÉ"}, headers=auth_headers
+    )
+    assert response.status_code == 200
+    nomes = [c["nome"] for c in response.json()]
+    assert set(nomes) == {"Padaria São José", "Construtora Josefina", "Mercado Central"}
+    # Ocorrências no início de uma palavra vêm antes das do meio de uma palavra
+    assert nomes[-1] == "Mercado Central"
+
+    response = client.get(
+        "/api/v1/clientes/search/",
+        params={"query": "12.345.678/0001", "limit": 1},
+        headers=auth_headers,
+    )
+    assert [c["nome"] for c in response.json()] == ["Mercado Central"]
+
+    response = client.get(
+        "/api/v1/clientes/search/", params={"query": "12345678"}, headers=auth_headers
+    )
+    assert [c["nome"] for c in response.json()] == ["Mercado Central"]
+
+def test_search_fornecedores_reflete_atualizacao(
+    client: TestClient, auth_headers: dict, pagamentos_teste: list
+):
+    fornecedor_id = pagamentos_teste[0].fornecedor_id
+    response = client.get(
+        "/api/v1/fornecedores/search/", params={"query": "teste"}, headers=auth_headers
+    )
+    assert [f["id"] for f in response.json()] == [fornecedor_id]
+
+    response = client.put(
+        f"/api/v1/fornecedores/{fornecedor_id}",
+        json={"nome": "Ação Logística", "cnpj": "98.765.432/0001-10", "email": "log@acao.com"},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+    response = client.get(
+        "/api/v1/fornecedores/search/", params={"query": "acao log"}, headers=auth_headers
+    )
+    assert [f["id"] for f in response.json()] == [fornecedor_id]
+    response = client.get(
+        "/api/v1/fornecedores/search/", params={"query": "teste"}, headers=auth_headers
+    )
+    assert response.json() == []
+
+@pytest.fixture(autouse=True)
+def despachos(monkeypatch):
+    """Registra os lotes enfileirados no Celery em vez de publicá-los."""
+    enviados = []
+    monkeypatch.setattr(
+        endpoints_pagamentos.processar_pagamentos_lote, "delay", lambda ids: enviados.append(ids)
+    )
+    return enviados
+
+def test_pagamento_rejeita_cadastros_desativados(
+    client: TestClient, db: Session, auth_headers: dict, despachos: list
+):
+    fornecedor = Fornecedor(nome="Fornecedor Antigo", cnpj="44.444.444/0001-44", email="f@a.com")
+    cliente = Cliente(nome="Cliente Antigo", cnpj="55.555.555/0001-55", email="c@a.com")
+    ativo = Fornecedor(nome="Fornecedor Ativo", cnpj="66.666.666/0001-66", email="f@b.com")
+    db.add_all([fornecedor, cliente, ativo])
+    db.commit()
+    # Lidos antes da exclusão, para o cache de cadastros já estar preenchido
+    client.get(f"/api/v1/fornecedores/{fornecedor.id}", headers=auth_headers)
+    client.get(f"/api/v1/clientes/{cliente.id}", headers=auth_headers)
+    client.delete(f"/api/v1/fornecedores/{fornecedor.id}", headers=auth_headers)
+    client.delete(f"/api/v1/clientes/{cliente.id}", headers=auth_headers)
+
+    base = {
+        "numero_nota": "NF-X",
+        "data_emissao": "2024-05-01",
+        "data_vencimento": "2024-05-31",
+        "valor_total": "100.00",
+    }
+    response = client.post(
+        "/api/v1/pagamentos/", headers=auth_headers, json={**base, "fornecedor_id": fornecedor.id}
+    )
+    assert response.status_code == 404
+    response = client.post(
+        "/api/v1/pagamentos/",
+        headers=auth_headers,
+        json={**base, "fornecedor_id": ativo.id, "cliente_id": cliente.id},
+    )
+    assert response.status_code == 404
+
+    response = client.post(
+        "/api/v1/pagamentos/bulk",
+        headers=auth_headers,
+        json=[
+            {**base, "fornecedor_id": fornecedor.id},
+            {**base, "fornecedor_id": ativo.id, "cliente_id": cliente.id},
+        ],
+    )
+    assert [l["erros"] for l in response.json()["linhas"]] == [
+        ["Fornecedor não encontrado"], ["Cliente não encontrado"]
+    ]
+    assert db.exec(select(Pagamento)).all() == []
+    assert despachos == []
+
+@pytest.mark.parametrize(
+    "cliente, retencao",
+    [
+        # IR 15,00 + PIS/COFINS/CSLL 46,50 + ISS 50,00; sem INSS
+        ({"regime_tributario": "LUCRO_REAL"}, "111.50"),
+        ({"regime_tributario": "LUCRO_PRESUMIDO"}, "111.50"),
+        ({"regime_tributario": "SIMPLES"}, "20.00"),
+        # Percentual configurado, inclusive zero, substitui a tabela do regime
+        ({"regime_tributario": "SIMPLES", "percentual_retencao": 0.0}, "0.00"),
+        ({"regime_tributario": "LUCRO_REAL", "percentual_retencao": 11.0}, "110.00"),
+        ({"percentual_retencao": 4.65}, "46.50"),
+        ({}, "0.00"),
+    ],
+)
+def test_create_pagamento_retencao_por_regime(
+    client: TestClient, db: Session, auth_headers: dict, cliente: dict, retencao: str
+):
+    fornecedor = Fornecedor(nome="Fornecedor Retenção", cnpj="77.777.777/0001-77", email="f@r.com")
+    db.add(fornecedor)
+    db.commit()
+    response = client.post(
+        "/api/v1/clientes/",
+        headers=auth_headers,
+        json={"nome": "Cliente Retenção", "cnpj": "88.888.888/0001-88", "email": "c@r.com", **cliente},
+    )
+    assert response.status_code == 200
+    response = client.post(
+        "/api/v1/pagamentos/",
+        headers=auth_headers,
+        json={
+            "numero_nota": "NF-R",
+            "fornecedor_id": fornecedor.id,
+            "cliente_id": response.json()["id"],
+            "data_emissao": "2024-05-01",
+            "data_vencimento": "2024-05-31",
+            "valor_total": "1000.00",
+            "valor_liquido": "1000.00",
+        },
+    )
+    assert response.status_code == 200
+    pagamento = db.get(Pagamento, response.json()["id"])
+    assert pagamento.valor_retencao == Decimal(retencao)
+    assert pagamento.valor_liquido == Decimal("1000.00") - Decimal(retencao)
+
+def test_bulk_pagamentos_json(
+    client: TestClient, db: Session, auth_headers: dict, pagamentos_teste: list, despachos: list
+):
+    fornecedor_id = pagamentos_teste[0].fornecedor_id
+    cliente = Cliente(
+        nome="Cliente Retido", cnpj="11.111.111/0001-11", email="c@r.com", percentual_retencao=10.0
+    )
+    db.add(cliente)
+    db.commit()
+    base = {"data_emissao": "2024-05-01", "data_vencimento": "2024-05-31"}
+    linhas = [
+        {**base, "numero_nota": "NF-A", "valor_total": "100.00", "fornecedor_id": fornecedor_id},
+        {**base, "numero_nota": "NF-B", "valor_total": "200.00", "fornecedor_id": fornecedor_id,
+         "cliente_id": cliente.id},
+        {**base, "numero_nota": "NF-C", "valor_total": "50.00", "fornecedor_id": 9999},
+        {**base, "numero_nota": "NF-D", "valor_total": "-1", "fornecedor_id": fornecedor_id},
+        {**base, "numero_nota": "NF-E", "valor_total": "10.00", "fornecedor_id": fornecedor_id,
+         "status": "PAGO"},
+    ]
+    response = client.post("/api/v1/pagamentos/bulk", headers=auth_headers, json=linhas)
+    assert response.status_code == 200
+    relatorio = response.json()
+    assert (relatorio["total"], relatorio["criados"], relatorio["erros"]) == (5, 3, 2)
+    status = [(l["linha"], l["status"]) for l in relatorio["linhas"]]
+    assert status == [(1, "criado"), (2, "criado"), (3, "erro"), (4, "erro"), (5, "criado")]
+    assert relatorio["linhas"][2]["erros"] == ["Fornecedor não encontrado"]
+    assert relatorio["linhas"][3]["erros"][0].startswith("valor_total")
+
+    # Um único despacho, só com os pendentes
+    ids = [l["id"] for l in relatorio["linhas"] if l["status"] == "criado"]
+    assert despachos == [ids[:2]]
+
+    com_retencao = db.get(Pagamento, ids[1])
+    assert com_retencao.valor_retencao == Decimal("20.00")
+    assert com_retencao.valor_liquido == Decimal("180.00")
+    assert com_retencao.processado_por == "teste@exemplo.com"
+
+def test_bulk_pagamentos_csv(
+    client: TestClient, db: Session, auth_headers: dict, pagamentos_teste: list, despachos: list
+):
+    fornecedor_id = pagamentos_teste[0].fornecedor_id
+    conteudo = (
+        "numero_nota;data_emissao;data_vencimento;valor_total;fornecedor_id;cliente_id\n"
+        f"NF-X;2024-05-01;2024-05-31;1.234,56;{fornecedor_id};\n"
+        f"NF-Y;2024-05-01;data-ruim;10,00;{fornecedor_id};\n"
+    ).encode()
+    response = client.post(
+        "/api/v1/pagamentos/bulk",
+        headers=auth_headers,
+        files={"arquivo": ("notas.csv", conteudo, "text/csv")},
+    )
+    assert response.status_code == 200
+    relatorio = response.json()
+    assert (relatorio["criados"], relatorio["erros"]) == (1, 1)
+    assert relatorio["linhas"][1]["erros"][0].startswith("data_vencimento")
+    assert db.get(Pagamento, relatorio["linhas"][0]["id"]).valor_total == Decimal("1234.56")
+
+def test_bulk_pagamentos_corpo_invalido(client: TestClient, auth_headers: dict):
+    response = client.post(
+        "/api/v1/pagamentos/bulk", headers=auth_headers, json={"numero_nota": "NF-1"}
+    )
+    assert response.status_code == 400
+
+def test_bulk_fornecedores_upsert_por_cnpj(client: TestClient, db: Session, auth_headers: dict):
+    existente = client.post("/api/v1/fornecedores/", headers=auth_headers, json={
+        "nome": "Papelaria Antiga", "cnpj": "33.333.333/0001-33", "email": "a@p.com",
+        "categoria": "MATERIAIS", "pix": "chave-antiga",
+    }).json()
+    client.delete(f"/api/v1/fornecedores/{existente['id']}", headers=auth_headers)
+    # Carrega o índice de busca e o cache da categoria antes da importação
+    assert client.get("/api/v1/fornecedores/search/", params={"query": "papelaria"}, headers=auth_headers).json() == []
+    assert client.get("/api/v1/fornecedores/categoria/TI", headers=auth_headers).json() == []
+
+    linhas = [
+        {"nome": "Papelaria Nova", "cnpj": "33.333.333/0001-33", "email": "n@p.com", "categoria": "TI"},
+        {"nome": "Papelaria Filial", "cnpj": "44.444.444/0001-44", "email": "f@p.com", "categoria": "TI"},
+        {"nome": "Sem CNPJ", "email": "s@p.com"},
+        {"nome": "Repetida", "cnpj": "44.444.444/0001-44", "email": "r@p.com"},
+    ]
+    response = client.post("/api/v1/fornecedores/bulk", headers=auth_headers, json=linhas)
+    assert response.status_code == 200
+    relatorio = response.json()
+    assert (relatorio["total"], relatorio["criados"], relatorio["atualizados"], relatorio["erros"]) == (4, 1, 1, 2)
+    status = [(l["linha"], l["status"]) for l in relatorio["linhas"]]
+    assert status == [(1, "atualizado"), (2, "criado"), (3, "erro"), (4, "erro")]
+    assert relatorio["linhas"][0]["id"] == existente["id"]
+    assert relatorio["linhas"][2]["erros"][0].startswith("cnpj")
+    assert relatorio["linhas"][3]["erros"] == ["CNPJ repetido na linha 2"]
+
+    # Reativado, com os campos enviados e os demais mantidos
+    atualizado = client.get(f"/api/v1/fornecedores/{existente['id']}", headers=auth_headers).json()
+    assert (atualizado["nome"], atualizado["active"], atualizado["pix"]) == ("Papelaria Nova", True, "chave-antiga")
+    ids = sorted(l["id"] for l in relatorio["linhas"][:2])
+    assert sorted(f["id"] for f in client.get("/api/v1/fornecedores/categoria/TI", headers=auth_headers).json()) == ids
+    encontrados = client.get("/api/v1/fornecedores/search/", params={"query": "papelaria"}, headers=auth_headers)
+    assert sorted(f["id"] for f in encontrados.json()) == ids
+
+def test_bulk_clientes_csv(client: TestClient, db: Session, auth_headers: dict):
+    conteudo = (
+        "nome;cnpj;email;percentual_retencao;cidade\n"
+        "Cliente CSV;55.555.555/0001-55;c@csv.com;1,5;Campinas\n"
+    ).encode()
+    response = client.post(
+        "/api/v1/clientes/bulk", headers={**auth_headers, "Content-Type": "text/csv"}, content=conteudo
+    )
+    assert response.status_code == 200
+    assert response.json()["criados"] == 1
+    cliente_id = response.json()["linhas"][0]["id"]
+
+    # A célula vazia não apaga a cidade gravada
+    conteudo = "nome;cnpj;email;percentual_retencao;cidade\nCliente CSV;55.555.555/0001-55;c@csv.com;4,65;\n"
+    response = client.post(
+        "/api/v1/clientes/bulk",
+        headers=auth_headers,
+        files={"arquivo": ("clientes.csv", conteudo.encode(), "text/csv")},
+    )
+    assert response.json()["linhas"] == [{"linha": 1, "status": "atualizado", "id": cliente_id}]
+    cliente = db.get(Cliente, cliente_id)
+    db.refresh(cliente)
+    assert (cliente.percentual_retencao, cliente.cidade) == (4.65, "Campinas")
+    assert cliente.termo_busca == busca.montar_termo("Cliente CSV", "55.555.555/0001-55", "c@csv.com")
+
+    response = client.post("/api/v1/clientes/bulk", headers=auth_headers, json={"nome": "x"})
+    assert response.status_code == 400
+
+def test_resumo_pagamentos_acompanha_escritas(
+    client: TestClient, db: Session, auth_headers: dict, pagamentos_teste: list, despachos: list
+):
+    fornecedor_id = pagamentos_teste[0].fornecedor_id
+    base = {"data_emissao": "2024-05-01", "data_vencimento": "2024-05-31", "fornecedor_id": fornecedor_id}
+
+    response = client.post(
+        "/api/v1/pagamentos/", headers=auth_headers,
+        json={**base, "numero_nota": "NF-N", "valor_total": "40.00", "valor_liquido": "40.00"},
+    )
+    assert response.status_code == 200
+    client.post("/api/v1/pagamentos/bulk", headers=auth_headers, json=[
+        {**base, "numero_nota": "NF-P", "valor_total": "10.00", "status": "PAGO"},
+    ])
+    client.delete(f"/api/v1/pagamentos/{pagamentos_teste[0].id}", headers=auth_headers)
+    client.put(
+        f"/api/v1/pagamentos/{pagamentos_teste[1].id}", headers=auth_headers,
+        json={**base, "numero_nota": "NF-1", "valor_total": "150.00", "valor_liquido": "150.00"},
+    )
+
+    response = client.get("/api/v1/pagamentos/resumo", headers=auth_headers)
+    assert response.status_code == 200
+    por_status = {l["status"]: (l["quantidade"], Decimal(str(l["valor_total"]))) for l in response.json()}
+    assert por_status == {
+        "CANCELADO": (1, Decimal("100.00")),
+        "PAGO": (1, Decimal("10.00")),
+        "PENDENTE": (7, Decimal("690.00")),
+    }
+
+    # A manutenção incremental chega ao mesmo resultado que a reconstrução,
+    # em cada uma das tabelas de resumo
+    agrupamentos = ["status,mes", "status,fornecedor_id", "cliente_id", "status,mes,fornecedor_id,cliente_id"]
+    url = "/api/v1/pagamentos/resumo?agrupar="
+    incremental = [client.get(url + a, headers=auth_headers).json() for a in agrupamentos]
+    reconstruir_resumo(db)
+    assert [client.get(url + a, headers=auth_headers).json() for a in agrupamentos] == incremental
+
+    response = client.get(
+        "/api/v1/pagamentos/resumo", headers=auth_headers, params={"agrupar": "status,valor"}
+    )
+    assert response.status_code == 400
+
+def test_changes_entrega_alteracoes_e_desativacoes(
+    client: TestClient, auth_headers: dict, pagamentos_teste: list, monkeypatch
+):
+    monkeypatch.setattr(settings, "SINCRONIZACAO_MARGEM", 0)
+    ids = []
+    for i in range(3):
+        response = client.post(
+            "/api/v1/clientes/",
+            json={"nome": f"Cliente {i}", "cnpj": f"00.000.000/0001-0{i}", "email": f"c{i}@c.com"},
+            headers=auth_headers,
+        )
+        ids.append(response.json()["id"])
+
+    url = "/api/v1/clientes/changes"
+    carga = client.get(url, headers=auth_headers).json()
+    assert [c["id"] for c in carga["itens"]] == ids and not carga["mais"]
+    vazio = client.get(url, params={"since": carga["token"]}, headers=auth_headers).json()
+    assert vazio == {"itens": [], "token": carga["token"], "mais": False}
+
+    antes = carga["itens"][2]["updated_at"]
+    client.put(
+        f"/api/v1/clientes/{ids[2]}",
+        json={"nome": "Cliente 2 Alterado", "cnpj": "00.000.000/0001-02", "email": "c2@c.com"},
+        headers=auth_headers,
+    )
+    client.delete(f"/api/v1/clientes/{ids[0]}", headers=auth_headers)
+    response = client.get(
+        url, params={"since": carga["token"], "fields": "id,nome,active"}, headers=auth_headers
+    )
+    assert response.json()["itens"] == [
+        {"id": ids[2], "nome": "Cliente 2 Alterado", "active": True},
+        {"id": ids[0], "nome": "Cliente 0", "active": False},
+    ]
+    alterado = client.get(url, params={"since": carga["token"]}, headers=auth_headers).json()
+    assert alterado["itens"][0]["updated_at"] > antes
+
+    # Pagamentos: cancelamento e paginação do token
+    url = "/api/v1/pagamentos/changes"
+    carga = client.get(url, params={"limit": 5}, headers=auth_headers).json()
+    assert len(carga["itens"]) == 5 and carga["mais"]
+    resto = client.get(url, params={"since": carga["token"], "limit": 5}, headers=auth_headers).json()
+    assert len(resto["itens"]) == 2 and not resto["mais"]
+    client.delete(f"/api/v1/pagamentos/{pagamentos_teste[0].id}", headers=auth_headers)
+    response = client.get(url, params={"since": resto["token"]}, headers=auth_headers)
+    assert [(p["id"], p["status"]) for p in response.json()["itens"]] == [
+        (pagamentos_teste[0].id, "CANCELADO")
+    ]
+
+    # Dentro da margem a alteração ainda não é entregue
+    monkeypatch.setattr(settings, "SINCRONIZACAO_MARGEM", 60)
+    client.delete(f"/api/v1/clientes/{ids[1]}", headers=auth_headers)
+    response = client.get(
+        "/api/v1/clientes/changes", params={"since": alterado["token"]}, headers=auth_headers
+    )
+    assert response.json()["itens"] == []
+    response = client.get(url, params={"since": "invalido"}, headers=auth_headers)
+    assert response.status_code == 400
+def test_cadastros_em_cache_e_invalidados_nas_escritas(
+    client: TestClient, auth_headers: dict, pagamentos_teste: list, consultas: list
+):
+    fornecedor_id = pagamentos_teste[0].fornecedor_id
+    url = f"/api/v1/fornecedores/{fornecedor_id}"
+    consultas.clear()
+    for _ in range(3):
+        response = client.get(url, headers=auth_headers)
+        assert response.json()["nome"] == "Fornecedor Teste"
+    assert len([c for c in consultas if "FROM fornecedores" in c]) == 1
+    stats = cache.estatisticas()["fornecedores"]
+    assert (stats["cargas"], stats["acertos"]) == (1, 2)
+
+    # A verificação do fornecedor ao criar pagamento também usa o cache
+    consultas.clear()
+    response = client.post(
+        "/api/v1/pagamentos/",
+        json={
+            "fornecedor_id": fornecedor_id,
+            "numero_nota": "NF-C",
+            "data_emissao": str(date.today()),
+            "data_vencimento": str(date.today()),
+            "valor_total": "10.00",
+            "valor_liquido": "10.00",
+        },
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+    assert not [c for c in consultas if "FROM fornecedores" in c]
+
+    response = client.get(
+        "/api/v1/fornecedores/categoria/TI", params={"fields": "id"}, headers=auth_headers
+    )
+    assert response.json() == []
+    client.put(
+        url,
+        json={"nome": "Renomeado", "cnpj": "98.765.432/0001-10", "email": "r@r.com", "categoria": "TI"},
+        headers=auth_headers,
+    )
+    assert client.get(url, headers=auth_headers).json()["nome"] == "Renomeado"
+    response = client.get(
+        "/api/v1/fornecedores/categoria/TI", params={"fields": "id,nome"}, headers=auth_headers
+    )
+    assert response.json() == [{"id": fornecedor_id, "nome": "Renomeado"}]
+
+    response = client.post(
+        "/api/v1/clientes/",
+        json={"nome": "Cliente", "cnpj": "11.111.111/0001-11", "email": "c@c.com"},
+        headers=auth_headers,
+    )
+    cliente_url = f"/api/v1/clientes/{response.json()['id']}"
+    assert client.get(cliente_url, headers=auth_headers).json()["active"] is True
+    client.delete(cliente_url, headers=auth_headers)
+    assert client.get(cliente_url, headers=auth_headers).status_code == 404
+    response = client.get(cliente_url, params={"include_inactive": True}, headers=auth_headers)
+    assert response.json()["active"] is False
+    assert client.get("/api/v1/clientes/999", headers=auth_headers).status_code == 404
+
+def test_desativados_so_com_include_inactive(client: TestClient, auth_headers: dict):
+    ids = []
+    for i in range(3):
+        response = client.post(
+            "/api/v1/fornecedores/",
+            json={
+                "nome": f"Gráfica {i}",
+                "cnpj": f"22.222.222/000{i}-22",
+                "email": f"g{i}@g.com",
+                "categoria": "TI",
+            },
+            headers=auth_headers,
+        )
+        ids.append(response.json()["id"])
+    # Carrega o índice de busca e o cache da categoria antes da exclusão
+    assert len(client.get("/api/v1/fornecedores/search/", params={"query": "grafica"}, headers=auth_headers).json()) == 3
+    assert len(client.get("/api/v1/fornecedores/categoria/TI", headers=auth_headers).json()) == 3
+    client.delete(f"/api/v1/fornecedores/{ids[0]}", headers=auth_headers)
+
+    def ids_em(url: str, **params) -> list:
+        response = client.get(url, params=params, headers=auth_headers)
+        assert response.status_code == 200
+        return sorted(item["id"] for item in response.json())
+
+    for url, params in (
+        ("/api/v1/fornecedores/", {}),
+        ("/api/v1/fornecedores/search/", {"query": "grafica", "limit": 2}),
+        ("/api/v1/fornecedores/categoria/TI", {}),
+    ):
+        assert ids_em(url, **params) == ids[1:]
+        assert ids[0] in ids_em(url, include_inactive=True, **params)
+
+def test_estatisticas_pool_exige_superusuario(
+    client: TestClient, db: Session, usuario_teste: Usuario, auth_headers: dict
+):
+    assert client.get("/api/v1/sistema/pool", headers=auth_headers).status_code == 400
+
+    usuario_teste.is_superuser = True
+    db.add(usuario_teste)
+    db.commit()
+    response = client.get("/api/v1/sistema/pool", headers=auth_headers)
+    assert response.status_code == 200
+    stats = response.json()["api"]
+    assert stats["tamanho"] == settings.DB_POOL_SIZE
+    assert {"em_uso", "overflow", "espera_media_ms", "espera_max_ms", "timeouts"} <= set(stats)
+def test_metrics_por_rota_com_consultas_sql(
+    client: TestClient, auth_headers: dict, pagamentos_teste: list
+):
+    rota = "/api/v1/pagamentos/{pagamento_id}"
+
+    def amostra(nome: str, **labels) -> float:
+        return REGISTRY.get_sample_value(nome, {"metodo": "GET", "rota": rota, **labels}) or 0.0
+
+    # Carrega o usuário autenticado no cache
+    client.get("/api/v1/clientes", headers=auth_headers)
+    antes = amostra("http_requisicao_segundos_count", status="200")
+    consultas = amostra("http_requisicao_sql_consultas_sum")
+    for pagamento in pagamentos_teste[:2]:
+        client.get(f"/api/v1/pagamentos/{pagamento.id}", headers=auth_headers)
+    client.get("/api/v1/pagamentos/999999", headers=auth_headers)
+
+    assert amostra("http_requisicao_segundos_count", status="200") == antes + 2
+    assert amostra("http_requisicao_segundos_count", status="404") >= 1
+    # Uma consulta do pagamento por requisição
+    assert amostra("http_requisicao_sql_consultas_sum") == consultas + 3
+
+    response = client.get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'rota="/api/v1/pagamentos/{pagamento_id}"' in response.text
+    client.get("/api/v1/nao-existe/123")
+    assert 'rota="desconhecida"' in client.get("/metrics").text
+def test_idempotency_key_repete_resposta_sem_novo_pagamento(
+    client: TestClient, auth_headers: dict, pagamentos_teste: list, consultas: list, despachos: list
+):
+    corpo = {
+        "fornecedor_id": pagamentos_teste[0].fornecedor_id,
+        "numero_nota": "NF-IDEM",
+        "data_emissao": str(date.today()),
+        "data_vencimento": str(date.today()),
+        "valor_total": "10.00",
+        "valor_liquido": "10.00",
+    }
+    headers = {**auth_headers, "Idempotency-Key": "chave-1"}
+    primeira = client.post("/api/v1/pagamentos/", json=corpo, headers=headers)
+    assert primeira.status_code == 200
+    assert "Idempotent-Replayed" not in primeira.headers
+
+    consultas.clear()
+    repetida = client.post("/api/v1/pagamentos/", json=corpo, headers=headers)
+    assert repetida.status_code == 200
+    assert repetida.headers["Idempotent-Replayed"] == "true"
+    assert repetida.json() == primeira.json()
+    assert not [c for c in consultas if "pagamentos" in c or "fornecedores" in c]
+    assert despachos == [[primeira.json()["id"]]]
+
+    outro = client.post("/api/v1/pagamentos/", json={**corpo, "valor_total": "20.00"}, headers=headers)
+    assert outro.status_code == 422
+    # Sem a chave, ou com outra, é um pagamento novo
+    assert client.post("/api/v1/pagamentos/", json=corpo, headers=auth_headers).json()["id"] != primeira.json()["id"]
+
+    # Uma execução que falha libera a chave para a próxima tentativa
+    headers = {**auth_headers, "Idempotency-Key": "chave-2"}
+    invalido = {**corpo, "fornecedor_id": 9999}
+    assert client.post("/api/v1/pagamentos/", json=invalido, headers=headers).status_code == 404
+    response = client.post("/api/v1/pagamentos/", json=invalido, headers=headers)
+    assert response.status_code == 404
+    assert "Idempotent-Replayed" not in response.headers
+
+def test_idempotency_key_falha_ao_gravar_resposta_nao_duplica(
+    client: TestClient, db: Session, auth_headers: dict, pagamentos_teste: list,
+    despachos: list, monkeypatch,
+):
+    gravar = idempotencia.gravar_resposta
+
+    def falhar(*args):
+        raise OperationalError("UPDATE chaves_idempotencia", {}, Exception("conexão perdida"))
+
+    monkeypatch.setattr(idempotencia, "gravar_resposta", falhar)
+    corpo = {
+        "fornecedor_id": pagamentos_teste[0].fornecedor_id,
+        "numero_nota": "NF-ATOMICA",
+        "data_emissao": str(date.today()),
+        "data_vencimento": str(date.today()),
+        "valor_total": "10.00",
+        "valor_liquido": "10.00",
+    }
+    headers = {**auth_headers, "Idempotency-Key": "atomica"}
+    with pytest.raises(OperationalError):
+        client.post("/api/v1/pagamentos/", json=corpo, headers=headers)
+    with pytest.raises(OperationalError):
+        client.post("/api/v1/pagamentos/bulk", json=[corpo], headers={**headers, "Idempotency-Key": "lote"})
+    # Sem a resposta gravada, o pagamento também não foi: nada a duplicar
+    assert db.exec(select(Pagamento).where(Pagamento.numero_nota == "NF-ATOMICA")).all() == []
+    assert despachos == []
+
+    monkeypatch.setattr(idempotencia, "gravar_resposta", gravar)
+    primeira = client.post("/api/v1/pagamentos/", json=corpo, headers=headers)
+    repetida = client.post("/api/v1/pagamentos/", json=corpo, headers=headers)
+    assert repetida.headers["Idempotent-Replayed"] == "true"
+    assert repetida.json()["id"] == primeira.json()["id"]
+    assert len(db.exec(select(Pagamento).where(Pagamento.numero_nota == "NF-ATOMICA")).all()) == 1
+    assert despachos == [[primeira.json()["id"]]]
+
+def test_idempotency_key_simultaneas_executam_uma_vez(
+    client: TestClient, db: Session, auth_headers: dict, pagamentos_teste: list, monkeypatch
+):
+    obter = endpoints_pagamentos.obter_cadastro_async
+
+    async def obter_devagar(*args):
+        await asyncio.sleep(0.2)
+        return await obter(*args)
+
+    monkeypatch.setattr(endpoints_pagamentos, "obter_cadastro_async", obter_devagar)
+    corpo = {
+        "fornecedor_id": pagamentos_teste[0].fornecedor_id,
+        "numero_nota": "NF-SIMULTANEA",
+        "data_emissao": str(date.today()),
+        "data_vencimento": str(date.today()),
+        "valor_total": "10.00",
+        "valor_liquido": "10.00",
+    }
+    headers = {**auth_headers, "Idempotency-Key": "simultanea"}
+    with ThreadPoolExecutor(4) as executor:
+        respostas = list(executor.map(
+            lambda _: client.post("/api/v1/pagamentos/", json=corpo, headers=headers), range(4)
+        ))
+
+    assert {r.status_code for r in respostas} == {200}
+    assert len({r.json()["id"] for r in respostas}) == 1
+    assert sum(r.headers.get("Idempotent-Replayed") == "true" for r in respostas) == 3
+    assert len(db.exec(select(Pagamento).where(Pagamento.numero_nota == "NF-SIMULTANEA")).all()) == 1
+
+def test_chave_idempotencia_expirada_e_reivindicada_e_limpa(client: TestClient, db: Session):
+    assert idempotencia.reivindicar(db, 1, "teste", "k", "h1") is None
+    em_execucao = idempotencia.reivindicar(db, 1, "teste", "k", "h1")
+    assert em_execucao.status_code is None
+
+    # Execução abandonada: depois de expirar, outra requisição assume a chave
+    db.execute(update(ChaveIdempotencia).values(expira_em=datetime.utcnow() - timedelta(seconds=1)))
+    db.commit()
+    assert idempotencia.reivindicar(db, 1, "teste", "k", "h2") is None
+    idempotencia.gravar_resposta(db, 1, "teste", "k", 201, b"{}")
+    db.commit()
+    concluida = idempotencia.reivindicar(db, 1, "teste", "k", "h2")
+    assert (concluida.status_code, concluida.resposta) == (201, b"{}")
+
+    assert idempotencia.limpar_expiradas(db) == 0
+    db.execute(update(ChaveIdempotencia).values(expira_em=datetime.utcnow() - timedelta(seconds=1)))
+    db.commit()
+    assert idempotencia.limpar_expiradas(db) == 1
+def test_login_limitado_por_conta_antes_do_hash(
+    client: TestClient, db: Session, usuario_teste: Usuario, monkeypatch
+):
+    verificar = security.verify_and_update_password_async
+    hashes = []
+
+    async def contar_hash(*args):
+        hashes.append(1)
+        return await verificar(*args)
+
+    monkeypatch.setattr(security, "verify_and_update_password_async", contar_hash)
+    errada = {"username": usuario_teste.email, "password": "errada"}
+    # Logins certos devolvem a ficha
+    for _ in range(settings.LOGIN_LIMITE_CONTA + 2):
+        assert client.post("/api/v1/auth/login", data={**errada, "password": "senha123"}).status_code == 200
+    for _ in range(settings.LOGIN_LIMITE_CONTA):
+        assert client.post("/api/v1/auth/login", data=errada).status_code == 400
+
+    hashes.clear()
+    response = client.post("/api/v1/auth/login", data={**errada, "username": usuario_teste.email.upper()})
+    assert response.status_code == 429
+    # O balde repõe uma ficha por minuto, contando desde as falhas
+    assert 0 < int(response.headers["Retry-After"]) <= 60 / settings.LOGIN_LIMITE_CONTA_POR_MINUTO
+    assert hashes == []
+    # Outra conta, do mesmo IP, segue liberada
+    assert client.post("/api/v1/auth/login", data={**errada, "username": "outro@x.com"}).status_code == 400
+
+    assert 'limite_tentativas_total{limite="login_conta",resultado="recusada"}' in client.get("/metrics").text
+    usuario_teste.is_superuser = True
+    db.add(usuario_teste)
+    db.commit()
+    monkeypatch.setattr(security, "verify_and_update_password_async", verificar)
+    limite.limpar_limitadores()
+    token = client.post("/api/v1/auth/login", data={**errada, "password": "senha123"}).json()["access_token"]
+    stats = client.get("/api/v1/sistema/limites", headers={"Authorization": f"Bearer {token}"}).json()
+    assert stats["login_conta"]["capacidade"] == settings.LOGIN_LIMITE_CONTA
\ No newline at end of file
@@ -0,0 +1,91 @@
+import asyncio
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+import pytest
+from ..main import app
+from ..core import cache
+from ..core.database import fabrica_sessoes_async
+from ..core.deps import get_async_db
+from ..models.fornecedor import Fornecedor
+from ..services.cadastros import obter_cadastro_async
+
+@pytest.fixture
+def client_async(tmp_path):
+    """Cliente com os endpoints assíncronos em um AsyncSession real (aiosqlite)."""
+    caminho = tmp_path / "async.db"
+    SQLModel.metadata.create_all(create_engine(f"sqlite:///{caminho}"))
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{caminho}")
+
+    async def override_get_async_db():
+        async with AsyncSession(async_engine, expire_on_commit=False) as db:
+            yield db
+
+    anterior = app.dependency_overrides.get(get_async_db)
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    cache.limpar_caches()
+    try:
+        with TestClient(app) as c:
+            yield c
+    finally:
+        app.dependency_overrides[get_async_db] = anterior
+        cache.limpar_caches()
+
+def test_fluxo_auth_com_async_session(client_async: TestClient):
+    response = client_async.post(
+        "/api/v1/auth/signup",
+        json={"email": "async@exemplo.com", "password": "senha123", "nome": "Async"}
+    )
+    assert response.status_code == 200
+
+    response = client_async.post(
+        "/api/v1/auth/login",
+        data={"username": "async@exemplo.com", "password": "senha123"}
+    )
+    assert response.status_code == 200
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    response = client_async.post("/api/v1/auth/2fa/enable", headers=headers)
+    assert response.status_code == 200
+    assert "async%40exemplo.com" in response.json()["qr_code"]
+
+    response = client_async.post("/api/v1/auth/2fa/enable", headers=headers)
+    assert response.status_code == 400
+
+def test_carga_de_cadastro_nao_usa_a_sessao_de_quem_a_disparou(tmp_path):
+    caminho = tmp_path / "carga.db"
+    engine = create_engine(f"sqlite:///{caminho}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as db:
+        fornecedor = Fornecedor(nome="Fornecedor Carga", cnpj="99.999.999/0001-99", email="f@c.com")
+        db.add(fornecedor)
+        db.commit()
+        id_ = fornecedor.id
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{caminho}")
+    cache.limpar_caches()
+
+    async def cenario():
+        primeira = AsyncSession(async_engine)
+        segunda = AsyncSession(async_engine)
+        disparou = asyncio.create_task(
+            obter_cadastro_async(fabrica_sessoes_async(primeira), Fornecedor, id_)
+        )
+        await asyncio.sleep(0)
+        esperando = asyncio.create_task(
+            obter_cadastro_async(fabrica_sessoes_async(segunda), Fornecedor, id_)
+        )
+        await asyncio.sleep(0)
+        # Quem disparou a carga desiste (cliente desconectou) e a sessão fecha
+        disparou.cancel()
+        assert not primeira.in_transaction()
+        await primeira.close()
+        cadastro = await esperando
+        await segunda.close()
+        await async_engine.dispose()
+        return cadastro
+
+    try:
+        assert asyncio.run(cenario())["nome"] == "Fornecedor Carga"
+    finally:
+        cache.limpar_caches()
\ No newline at end of file
@@ -0,0 +1,29 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parents[2]
+
+def test_suite_roda_no_sqlite_em_volume_minimo(tmp_path):
+    # Execução de fumaça: o padrão documentado da suíte é SQLite
+    saida = tmp_path / "suite.json"
+    subprocess.run(
+        [
+            sys.executable, "-m", "benchmarks.suite",
+            "--url", f"sqlite:///{tmp_path / 'benchmark.db'}",
+            "--clientes", "5", "--fornecedores", "5", "--pagamentos", "50",
+            "--cenarios", "pagamentos_lista,create_pagamento,processamento",
+            "--concorrencia", "2", "--duracao", "0.2",
+            "--workers", "1", "--latencia-ms", "0",
+            "--saida", str(saida),
+        ],
+        cwd=BACKEND,
+        check=True,
+        timeout=300,
+    )
+    resultado = json.loads(saida.read_text())
+    assert resultado["banco"] == "sqlite"
+    assert set(resultado["cenarios"]) == {"pagamentos_lista", "create_pagamento", "processamento"}
+    assert resultado["cenarios"]["pagamentos_lista"]["erros"] == 0
+    assert resultado["cenarios"]["create_pagamento"]["erros"] == 0
\ No newline at end of file
@@ -0,0 +1,114 @@
+import asyncio
+import fnmatch
+import threading
+import time
+import pytest
+from ..core.cache import CacheMemoria, CacheRedis
+
+class RedisMemoria:
+    """Dublê do cliente Redis com os comandos usados pelo cache."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._dados = {}
+
+    def _vivo(self, chave):
+        item = self._dados.get(chave)
+        if item is not None and item[1] is not None and item[1] <= time.monotonic():
+            del self._dados[chave]
+            return None
+        return item
+
+    def get(self, chave):
+        with self._lock:
+            item = self._vivo(chave)
+            return None if item is None else item[0]
+
+    def set(self, chave, valor, ex=None, px=None, nx=False):
+        with self._lock:
+            if nx and self._vivo(chave) is not None:
+                return None
+            expira = ex if ex is not None else (px / 1000 if px is not None else None)
+            self._dados[chave] = (
+                str(valor).encode(), None if expira is None else time.monotonic() + expira
+            )
+            return True
+
+    def delete(self, *chaves):
+        with self._lock:
+            return sum(self._dados.pop(chave, None) is not None for chave in chaves)
+
+    def scan_iter(self, match="*"):
+        with self._lock:
+            return [chave for chave in list(self._dados) if fnmatch.fnmatch(chave, match)]
+
+def _carga_lenta(resultado, cargas):
+    def carregar():
+        cargas.append(1)
+        time.sleep(0.05)
+        return resultado
+    return carregar
+
+def _em_paralelo(funcoes):
+    resultados = [None] * len(funcoes)
+
+    def executar(i):
+        resultados[i] = funcoes[i]()
+
+    threads = [threading.Thread(target=executar, args=(i,)) for i in range(len(funcoes))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return resultados
+
+@pytest.mark.parametrize("backend", ["memoria", "redis"])
+def test_obter_le_do_cache_depois_da_carga(backend):
+    cache = CacheMemoria("t", 60) if backend == "memoria" else CacheRedis("t", 60, RedisMemoria())
+    cargas = []
+    assert cache.obter("1", _carga_lenta({"id": 1}, cargas)) == {"id": 1}
+    assert cache.obter("1", _carga_lenta({"id": 2}, cargas)) == {"id": 1}
+    cache.delete("1")
+    assert cache.obter("1", _carga_lenta({"id": 3}, cargas)) == {"id": 3}
+    # Ausências não ficam em cache
+    assert cache.obter("2", _carga_lenta(None, cargas)) is None
+    assert cache.obter("2", _carga_lenta(None, cargas)) is None
+    assert len(cargas) == 4
+    stats = cache.estatisticas.como_dict()
+    assert (stats["acertos"], stats["cargas"], stats["invalidacoes"]) == (1, 4, 1)
+
+def test_faltas_simultaneas_fazem_uma_carga():
+    cache = CacheMemoria("t", 60)
+    cargas = []
+    resultados = _em_paralelo([lambda: cache.obter("1", _carga_lenta("v", cargas))] * 8)
+    assert resultados == ["v"] * 8
+    assert len(cargas) == 1
+
+def test_faltas_simultaneas_em_workers_diferentes_fazem_uma_carga():
+    # Dois caches sobre o mesmo Redis fazem o papel de dois processos
+    redis = RedisMemoria()
+    workers = [CacheRedis("t", 60, redis), CacheRedis("t", 60, redis)]
+    cargas = []
+    resultados = _em_paralelo(
+        [lambda w=w: w.obter("1", _carga_lenta("v", cargas)) for w in workers * 4]
+    )
+    assert resultados == ["v"] * 8
+    assert len(cargas) == 1
+    assert redis.get("cache:t:carga:1") is None
+
+def test_obter_async_carrega_uma_vez_por_chave():
+    cache = CacheMemoria("t", 60)
+    cargas = []
+
+    async def carregar():
+        cargas.append(1)
+        await asyncio.sleep(0.05)
+        return "v"
+
+    async def cenario():
+        return await asyncio.gather(*[cache.obter_async("1", carregar) for _ in range(8)])
+
+    assert asyncio.run(cenario()) == ["v"] * 8
+    assert len(cargas) == 1
+    assert asyncio.run(cache.obter_async("1", carregar)) == "v"
+    assert len(cargas) == 1
\ No newline at end of file
@@ -0,0 +1,68 @@
+import redis
+import pytest
+from ..core.limite import Limitador, LimiteFila, LimitadorMemoria, LimitadorRedis
+
+class Relogio:
+    def __init__(self):
+        self.agora = 0.0
+
+    def __call__(self):
+        return self.agora
+
+def test_balde_esgota_e_repoe():
+    relogio = Relogio()
+    limitador = LimitadorMemoria("teste", capacidade=3, por_minuto=6, relogio=relogio)
+    assert [limitador.consumir("a") for _ in range(3)] == [0, 0, 0]
+    # Uma ficha a cada 10 s
+    assert limitador.consumir("a") == pytest.approx(10)
+    assert limitador.consumir("b") == 0
+
+    relogio.agora = 4
+    assert limitador.consumir("a") == pytest.approx(6)
+    relogio.agora = 10
+    assert limitador.consumir("a") == 0
+
+    # Devolver não passa da capacidade
+    for _ in range(5):
+        limitador.devolver("b")
+    assert [limitador.consumir("b") for _ in range(3)] == [0, 0, 0]
+    assert limitador.consumir("b") > 0
+
+    assert limitador.estatisticas.como_dict() == {"permitidas": 8, "recusadas": 3}
+
+def test_balde_descarta_chaves_menos_usadas():
+    limitador = LimitadorMemoria("teste", capacidade=1, por_minuto=1, maximo=2, relogio=Relogio())
+    limitador.consumir("a")
+    limitador.consumir("b")
+    limitador.consumir("c")
+    # "a" saiu e volta com o balde cheio
+    assert limitador.consumir("a") == 0
+    assert limitador.consumir("c") > 0
+
+class RedisFora:
+    def register_script(self, script):
+        def executar(keys, args):
+            raise redis.ConnectionError("fora do ar")
+        return executar
+
+def test_redis_indisponivel_libera_tentativa():
+    limitador = LimitadorRedis("teste", capacidade=1, por_minuto=1, cliente=RedisFora())
+    assert [limitador.consumir("a") for _ in range(3)] == [0, 0, 0]
+    assert limitador.estatisticas.como_dict()["permitidas"] == 3
+
+def test_limite_fila_acompanha_pendentes():
+    pendentes = [0]
+    limitador = LimiteFila("teste", maximo=2, pendentes=lambda: pendentes[0])
+    assert limitador.consumir() == 0
+    pendentes[0] = 2
+    assert limitador.consumir() == 1.0
+    pendentes[0] = 1
+    assert limitador.consumir() == 0
+    assert limitador.estatisticas.como_dict() == {"permitidas": 2, "recusadas": 1}
+
+def test_limitador_exige_atualizar():
+    class SemBackend(Limitador):
+        pass
+
+    with pytest.raises(TypeError):
+        SemBackend("teste", capacidade=1, por_minuto=1)
\ No newline at end of file
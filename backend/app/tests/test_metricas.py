@@ -0,0 +1,24 @@
+from celery import Celery
+from celery.contrib.testing.worker import start_worker
+from prometheus_client import REGISTRY
+from ..core import metricas  # noqa: F401 - conecta os sinais do Celery
+
+app_teste = Celery("metricas_teste", broker="memory://", backend="cache+memory://")
+app_teste.conf.broker_transport_options = {"polling_interval": 0.01}
+
+@app_teste.task(name="metricas_teste.somar")
+def somar(a: int, b: int) -> int:
+    return a + b
+
+def test_tarefas_celery_medem_duracao_e_espera_na_fila():
+    def amostra(nome: str, **labels) -> float:
+        return REGISTRY.get_sample_value(nome, {"tarefa": "metricas_teste.somar", **labels}) or 0.0
+
+    with start_worker(app_teste, pool="solo", perform_ping_check=False):
+        assert somar.delay(1, 2).get(timeout=10) == 3
+        assert somar.apply_async((2, 3), countdown=0.2).get(timeout=10) == 5
+
+    assert amostra("celery_tarefa_segundos_count", estado="SUCCESS") == 2
+    assert amostra("celery_tarefa_espera_fila_segundos_count") == 2
+    # A espera da agendada conta a partir do horário marcado, não do envio
+    assert amostra("celery_tarefa_espera_fila_segundos_sum") < 0.2
\ No newline at end of file
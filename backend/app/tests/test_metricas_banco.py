@@ -0,0 +1,57 @@
+import logging
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as TimeoutPool
+import pytest
+from ..core import metricas_banco
+from ..core.config import settings
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=metricas_banco.QueuePoolMedido,
+        pool_size=1,
+        max_overflow=1,
+        pool_timeout=0.05,
+    )
+    metricas_banco.instrumentar_sql(engine)
+    metricas_banco.registrar("teste", engine)
+    yield engine
+    metricas_banco.remover("teste")
+    engine.dispose()
+
+def test_estatisticas_do_pool(engine):
+    primeira = engine.connect()
+    segunda = engine.connect()
+    stats = metricas_banco.estatisticas()["teste"]
+    assert (stats["tamanho"], stats["em_uso"], stats["overflow"]) == (1, 2, 1)
+
+    with pytest.raises(TimeoutPool):
+        engine.connect()
+    stats = metricas_banco.estatisticas()["teste"]
+    assert (stats["checkouts"], stats["timeouts"]) == (2, 1)
+
+    primeira.close()
+    segunda.close()
+    # dispose() recria o pool sem perder as estatísticas
+    engine.dispose()
+    engine.connect().close()
+    stats = metricas_banco.estatisticas()["teste"]
+    assert (stats["em_uso"], stats["checkouts"], stats["timeouts"]) == (0, 3, 1)
+    assert stats["espera_max_ms"] >= 50
+
+def test_sql_lenta_e_amostra_no_log(engine, monkeypatch, caplog):
+    caplog.set_level(logging.INFO, logger="app.sql")
+    with engine.connect() as conn:
+        monkeypatch.setattr(settings, "DB_SQL_LENTO_MS", 0)
+        conn.execute(text("SELECT 1"))
+        monkeypatch.setattr(settings, "DB_SQL_LENTO_MS", None)
+        conn.execute(text("SELECT 2"))
+        monkeypatch.setattr(settings, "DB_SQL_AMOSTRA", 1.0)
+        conn.execute(text("SELECT 3"))
+
+    assert [(r.levelname, r.getMessage().split(": ")[1]) for r in caplog.records] == [
+        ("WARNING", "SELECT 1"),
+        ("INFO", "SELECT 3"),
+    ]
+    assert metricas_banco.estatisticas()["teste"]["sql_lentas"] == 1
\ No newline at end of file
@@ -0,0 +1,269 @@
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from sqlalchemy import update
+from sqlmodel import Session, SQLModel, create_engine, select
+from sqlmodel.pool import StaticPool
+from prometheus_client import REGISTRY
+import pytest
+from ..core import database
+from ..core.config import settings
+from ..models.fornecedor import Fornecedor
+from ..models.pagamento import Pagamento
+from ..models.tarefa import ExecucaoTarefa
+from ..services import pagamento as servico
+from ..services.arquivamento import arquivar_pagamentos, data_corte
+from ..services.resumo import RESUMOS, consultar_resumo, dimensoes, reconstruir_resumo
+from ..services.vencimento import varrer_vencidos
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    SQLModel.metadata.create_all(engine)
+    return engine
+
+@pytest.fixture
+def pendentes(engine):
+    with Session(engine) as db:
+        fornecedor = Fornecedor(nome="F", cnpj="1", email="f@f.com")
+        db.add(fornecedor)
+        db.commit()
+        hoje = date.today()
+        pagamentos = [
+            Pagamento(
+                fornecedor_id=fornecedor.id,
+                numero_nota=f"NF-{i}",
+                data_emissao=hoje,
+                data_vencimento=hoje + timedelta(days=10 - i),
+                valor_total=Decimal("10.00"),
+                valor_liquido=Decimal("10.00"),
+                status="PAGO" if i == 0 else "PENDENTE",
+            )
+            for i in range(10)
+        ]
+        db.add_all(pagamentos)
+        db.commit()
+        return [p.id for p in pagamentos]
+
+@pytest.fixture
+def gateway(monkeypatch):
+    """Gateway instantâneo que recusa os ids em ``recusados``."""
+    recusados = set()
+    enviados = []
+
+    def enviar(pagamento):
+        enviados.append(pagamento.id)
+        if pagamento.id in recusados:
+            raise RuntimeError("recusado")
+
+    monkeypatch.setattr(servico, "enviar_ao_gateway", enviar)
+    return recusados, enviados
+
+def _status(engine) -> dict:
+    with Session(engine) as db:
+        return {p.id: p.status for p in db.exec(select(Pagamento)).all()}
+
+def test_reivindicar_pendentes_sem_sobreposicao(engine, pendentes):
+    with Session(engine) as db:
+        primeiro = {p.id for p in servico.reivindicar_pendentes(db, 4)}
+        segundo = {p.id for p in servico.reivindicar_pendentes(db, 4)}
+        terceiro = {p.id for p in servico.reivindicar_pendentes(db, 4)}
+    # Vencimento mais próximo primeiro; o pagamento já pago nunca é pego
+    assert primeiro == set(pendentes[6:])
+    assert segundo == set(pendentes[2:6])
+    assert terceiro == {pendentes[1]}
+    status = _status(engine)
+    assert status[pendentes[0]] == "PAGO"
+    assert all(status[id_] == "PROCESSANDO" for id_ in pendentes[1:])
+
+def test_processar_pendentes_grava_resultados(engine, pendentes, gateway, monkeypatch):
+    recusados, enviados = gateway
+    recusados.add(pendentes[3])
+
+    def get_session():
+        with Session(engine) as session:
+            yield session
+
+    monkeypatch.setattr(database, "get_session", get_session)
+    totais = servico.processar_pendentes(limite=4)
+
+    assert totais == {"devolvidos": 0, "lotes": 3, "processados": 9, "falhas": 1}
+    # Cada pagamento enviado uma única vez, mesmo o recusado
+    assert sorted(enviados) == sorted(pendentes[1:])
+    with Session(engine) as db:
+        recusado = db.get(Pagamento, pendentes[3])
+        assert recusado.status == "PENDENTE"
+        assert recusado.observacoes == "Erro no processamento: recusado"
+        pago = db.get(Pagamento, pendentes[1])
+        assert pago.status == "PAGO"
+        assert pago.data_pagamento == date.today()
+
+def test_processar_lote_ignora_ids_ja_reivindicados(engine, pendentes, gateway, monkeypatch):
+    _, enviados = gateway
+
+    def get_session():
+        with Session(engine) as session:
+            yield session
+
+    monkeypatch.setattr(database, "get_session", get_session)
+    with Session(engine) as db:
+        outro_worker = [p.id for p in servico.reivindicar_pendentes(db, 1, ids=pendentes[1:3])]
+
+    servico.processar_pagamentos_lote(pendentes[:5])
+    assert sorted(enviados) == sorted(set(pendentes[1:5]) - set(outro_worker))
+    assert _status(engine)[outro_worker[0]] == "PROCESSANDO"
+
+def test_processar_pagamento_so_envia_pendente_nao_reivindicado(engine, pendentes, gateway, monkeypatch):
+    _, enviados = gateway
+
+    def get_session():
+        with Session(engine) as session:
+            yield session
+
+    monkeypatch.setattr(database, "get_session", get_session)
+    with Session(engine) as db:
+        servico.reivindicar_pendentes(db, 1, ids=[pendentes[1]])
+        cancelado = db.get(Pagamento, pendentes[2])
+        cancelado.status = "CANCELADO"
+        db.add(cancelado)
+        db.commit()
+
+    for id_ in pendentes[:4]:
+        servico.processar_pagamento(id_)
+    # Nem o já pago, nem o reivindicado por outro worker, nem o cancelado
+    assert enviados == [pendentes[3]]
+    status = _status(engine)
+    assert [status[id_] for id_ in pendentes[:4]] == ["PAGO", "PROCESSANDO", "CANCELADO", "PAGO"]
+    with Session(engine) as db:
+        assert db.get(Pagamento, pendentes[3]).data_pagamento == date.today()
+
+def test_reivindicacao_expirada_volta_a_pendente(engine, pendentes):
+    with Session(engine) as db:
+        reivindicados = {p.id for p in servico.reivindicar_pendentes(db, 2)}
+        agora = datetime.utcnow()
+        assert servico.devolver_reivindicacoes_expiradas(db, agora) == 0
+        limite = timedelta(seconds=settings.PAGAMENTO_REIVINDICACAO_MAX + 1)
+        assert servico.devolver_reivindicacoes_expiradas(db, agora + limite) == 2
+
+        assert {p.id for p in servico.reivindicar_pendentes(db, 2)} == reivindicados
+        incremental = consultar_resumo(db)
+        reconstruir_resumo(db)
+        assert consultar_resumo(db) == incremental
+
+def test_varredura_incremental_de_vencidos(engine, pendentes):
+    hoje = date.today()
+    marcados_antes = REGISTRY.get_sample_value("varredura_vencidos_linhas_total")
+    with Session(engine) as db:
+        metricas = varrer_vencidos(db, hoje=hoje + timedelta(days=5), lote=2)
+        assert (metricas["linhas"], metricas["lotes"]) == (4, 3)
+        # Nada novo a marcar na mesma data
+        assert varrer_vencidos(db, hoje=hoje + timedelta(days=5))["linhas"] == 0
+        assert varrer_vencidos(db, hoje=hoje + timedelta(days=8))["linhas"] == 3
+
+        vencidos = db.exec(select(Pagamento.id).where(Pagamento.vencido)).all()
+        assert sorted(vencidos) == sorted(pendentes[3:])
+        # A observação livre não é mais sobrescrita
+        assert all(p.observacoes is None for p in db.exec(select(Pagamento)).all())
+        assert db.exec(select(ExecucaoTarefa)).one().linhas_afetadas == 3
+        assert REGISTRY.get_sample_value("varredura_vencidos_linhas_total") - marcados_antes == 7
+
+def test_vencido_acompanha_transicoes_de_status(engine, pendentes, gateway):
+    recusados, _ = gateway
+    recusados.add(pendentes[9])
+    hoje = date.today()
+    tabela = Pagamento.__table__
+    with Session(engine) as db:
+        reivindicados = servico.reivindicar_pendentes(db, 2, ids=pendentes[8:])
+        # O vencimento passa enquanto o envio está em andamento
+        db.exec(
+            update(tabela).where(tabela.c.id.in_(pendentes[8:]))
+            .values(data_vencimento=hoje - timedelta(days=1))
+        )
+        db.commit()
+        assert varrer_vencidos(db)["linhas"] == 0
+        servico._processar_reivindicados(db, reivindicados)
+        db.expire_all()
+        pago, devolvido = db.get(Pagamento, pendentes[8]), db.get(Pagamento, pendentes[9])
+        assert (pago.status, pago.vencido) == ("PAGO", False)
+        assert (devolvido.status, devolvido.vencido) == ("PENDENTE", True)
+
+        devolvido.status = "CANCELADO"
+        db.add(devolvido)
+        db.commit()
+        assert not devolvido.vencido
+
+        # Vencido antes da data da última varredura e ainda sem a marca
+        db.exec(
+            update(tabela).where(tabela.c.id == pendentes[7])
+            .values(data_vencimento=hoje - timedelta(days=30), vencido=False)
+        )
+        db.commit()
+        assert varrer_vencidos(db)["linhas"] == 1
+        assert db.get(Pagamento, pendentes[7]).vencido
+
+def test_arquivamento_so_quitados_antigos(engine, pendentes):
+    assert data_corte(date(2024, 3, 15), 12) == date(2023, 3, 1)
+    assert data_corte(date(2024, 1, 31), 1) == date(2023, 12, 1)
+    hoje = date.today()
+    with Session(engine) as db:
+        cancelado = db.get(Pagamento, pendentes[1])
+        cancelado.status = "CANCELADO"
+        db.add(cancelado)
+        db.commit()
+        atualizado_em = cancelado.updated_at
+
+        # Vencidos há menos de um mês completo ainda não são arquivados
+        assert arquivar_pagamentos(db, hoje=hoje + timedelta(days=20), meses=1)["linhas"] == 0
+        metricas = arquivar_pagamentos(db, hoje=hoje + timedelta(days=100), meses=1, lote=1)
+        assert (metricas["linhas"], metricas["lotes"]) == (2, 3)
+        assert arquivar_pagamentos(db, hoje=hoje + timedelta(days=100), meses=1)["linhas"] == 0
+
+        arquivados = db.exec(select(Pagamento.id).where(Pagamento.arquivado)).all()
+        assert sorted(arquivados) == sorted(pendentes[:2])
+        # Não conta como alteração para a sincronização
+        db.expire_all()
+        assert db.get(Pagamento, pendentes[1]).updated_at == atualizado_em
+        assert db.exec(select(ExecucaoTarefa)).one().linhas_afetadas == 0
+
+def test_pagamento_ja_vencido_e_marcado_na_insercao(engine, pendentes):
+    with Session(engine) as db:
+        pagamento = Pagamento(
+            fornecedor_id=db.get(Pagamento, pendentes[0]).fornecedor_id,
+            numero_nota="NF-ATRASADA",
+            data_emissao=date.today() - timedelta(days=40),
+            data_vencimento=date.today() - timedelta(days=10),
+            valor_total=Decimal("10.00"),
+            valor_liquido=Decimal("10.00"),
+        )
+        db.add(pagamento)
+        db.commit()
+        assert pagamento.vencido
+
+        pagamento.data_vencimento = date.today() + timedelta(days=10)
+        db.add(pagamento)
+        db.commit()
+        assert not pagamento.vencido
+
+def test_resumo_acompanha_processamento(engine, pendentes, gateway, monkeypatch):
+    recusados, _ = gateway
+    recusados.add(pendentes[3])
+
+    def get_session():
+        with Session(engine) as session:
+            yield session
+
+    monkeypatch.setattr(database, "get_session", get_session)
+    servico.processar_pendentes(limite=4)
+    # O recusado é aceito na nova tentativa, feita pelo pagamento avulso
+    recusados.clear()
+    servico.processar_pagamento(pendentes[3])
+
+    with Session(engine) as db:
+        assert consultar_resumo(db) == [
+            {"status": "PAGO", "quantidade": 10, "valor_total": Decimal("100.00"),
+             "valor_retencao": Decimal("0.00"), "valor_liquido": Decimal("100.00")},
+        ]
+        incremental = [consultar_resumo(db, dimensoes(modelo)) for modelo in RESUMOS]
+        reconstruir_resumo(db)
+        assert [consultar_resumo(db, dimensoes(modelo)) for modelo in RESUMOS] == incremental
\ No newline at end of file
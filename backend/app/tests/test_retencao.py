@@ -0,0 +1,53 @@
+from decimal import Decimal
+import pytest
+from ..services.pagamento import calcular_retencao
+from ..services.retencao import Regra, RegrasRetencao, calcular_lote, regras_para
+
+def test_lucro_presumido_detalha_tributos():
+    retencao = regras_para("LUCRO_PRESUMIDO", None).calcular(Decimal("1000.00"))
+    assert retencao.por_tributo == {
+        "IR": Decimal("15.00"),
+        "PIS": Decimal("6.50"),
+        "COFINS": Decimal("30.00"),
+        "CSLL": Decimal("10.00"),
+        "ISS": Decimal("50.00"),
+    }
+    assert retencao.total == Decimal("111.50")
+
+def test_valor_minimo_aplicado_ao_grupo():
+    # IR (3,00) e PIS+COFINS+CSLL (9,30) abaixo de R$ 10: dispensados
+    retencao = regras_para("lucro_presumido", None).calcular(Decimal("200.00"))
+    assert retencao.por_tributo == {"ISS": Decimal("10.00")}
+    assert retencao.total == Decimal("10.00")
+
+def test_base_minima():
+    regras = RegrasRetencao([Regra("ISS", Decimal("0.1"), base_minima=Decimal("100.00"))])
+    assert regras.total(Decimal("99.99")) == Decimal("0")
+    assert regras.total(Decimal("100.00")) == Decimal("10.00")
+
+def test_grupo_com_minimos_diferentes_e_rejeitado():
+    with pytest.raises(ValueError):
+        RegrasRetencao([
+            Regra("PIS", Decimal("0.01"), valor_minimo=Decimal("10"), grupo="CSRF"),
+            Regra("CSLL", Decimal("0.01"), grupo="CSRF"),
+        ])
+
+def test_percentual_sem_regime_e_exato():
+    # Em float, 11,00 * 1,5% dá 0,16499999... e arredondava para 0,16
+    assert calcular_retencao(Decimal("11.00"), 1.5) == Decimal("0.17")
+    assert regras_para("DESCONHECIDO", 10.0).total(Decimal("200.00")) == Decimal("20.00")
+
+def test_percentual_configurado_substitui_regime():
+    assert regras_para("SIMPLES", 0.0).total(Decimal("1000.00")) == Decimal("0")
+    assert regras_para("LUCRO_PRESUMIDO", 1.5).calcular(Decimal("1000.00")).por_tributo == {
+        "RETENCAO": Decimal("15.00")
+    }
+    assert "INSS" not in regras_para("LUCRO_REAL", None).calcular(Decimal("1000.00")).por_tributo
+
+def test_calcular_lote():
+    simples = regras_para("SIMPLES", None)
+    assert calcular_lote([
+        (Decimal("100.00"), simples),
+        (Decimal("100.00"), None),
+        (Decimal("55.55"), simples),
+    ]) == [Decimal("2.00"), Decimal("0"), Decimal("1.11")]
\ No newline at end of file
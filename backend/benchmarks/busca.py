@@ -0,0 +1,76 @@
+"""
+Compara a busca de clientes original (``LIKE '%q%'`` em nome, CNPJ e email)
+com a busca normalizada e indexada de ``services.busca``.
+
+Uso (a partir de ``backend/``):
+
+    python -m benchmarks.busca --clientes 1000000
+"""
+import random
+import time
+from sqlmodel import Session, select
+from app.models.cliente import Cliente
+from app.services import busca
+from .comum import contar, criar_engine_benchmark, criar_parser, emitir, medir, semear_clientes
+
+CONSULTAS = [
+    "jose",             # comum, com acento no cadastro
+    "metalurgica 4217",  # nome + número, pouco seletiva em cada trigrama
+    "12.345",           # trecho de CNPJ formatado
+    "cliente987654@",   # rara
+    "inexistente",      # sem resultados
+]
+
+def main() -> None:
+    parser = criar_parser(__doc__)
+    parser.add_argument("--clientes", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=busca.LIMITE_PADRAO)
+    args = parser.parse_args()
+    random.seed(args.semente)
+
+    engine = criar_engine_benchmark(args.url)
+    semear_clientes(engine, args.clientes)
+    total = contar(engine, Cliente)
+
+    resultados = []
+    with Session(engine) as db:
+        inicio = time.perf_counter()
+        usa_trigrama = busca._usa_pg_trgm(db)
+        if not usa_trigrama:
+            busca._indices[Cliente].carregar(db)
+        carga_ms = (time.perf_counter() - inicio) * 1000
+
+        for consulta in CONSULTAS:
+            def original():
+                db.exec(
+                    select(Cliente).where(
+                        (Cliente.nome.contains(consulta)) |
+                        (Cliente.cnpj.contains(consulta)) |
+                        (Cliente.email.contains(consulta))
+                    ).limit(args.limit)
+                ).all()
+                db.expunge_all()
+
+            def indexada():
+                busca.buscar(db, Cliente, consulta, args.limit)
+                db.expunge_all()
+
+            resultados.append({
+                "consulta": consulta,
+                "encontrados": len(busca.buscar(db, Cliente, consulta, args.limit)),
+                "original": medir(original, args.repeticoes),
+                "indexada": medir(indexada, args.repeticoes),
+            })
+
+    emitir({
+        "benchmark": "busca",
+        "banco": engine.dialect.name,
+        "estrategia": "pg_trgm" if usa_trigrama else "indice_em_memoria",
+        "clientes": total,
+        "carga_indice_ms": round(carga_ms, 1),
+        "limit": args.limit,
+        "resultados": resultados,
+    }, args.saida)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
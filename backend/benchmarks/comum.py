@@ -0,0 +1,170 @@
+"""
+Utilitários compartilhados pelos benchmarks.
+
+Os benchmarks rodam contra um banco local (SQLite por padrão ou um Postgres
+informado em ``--url``) e reaproveitam os dados já semeados entre execuções.
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Any, Callable, Dict, Optional
+from sqlalchemy import func, insert, select
+from sqlalchemy.engine import Engine
+from sqlmodel import SQLModel, create_engine
+from app.models.usuario import Usuario
+from app.models.cliente import Cliente
+from app.models.fornecedor import Fornecedor
+from app.models.pagamento import Pagamento
+from app.services.busca import montar_termo
+
+URL_PADRAO = "sqlite:///benchmark.db"
+LOTE_INSERCAO = 10_000
+STATUS = ["PENDENTE", "PROCESSANDO", "PAGO", "CANCELADO"]
+PALAVRAS_NOME = [
+    "São", "José", "Açúcar", "Paulista", "Comércio", "Indústria", "Serviços", "Construtora",
+    "Logística", "Alimentos", "Tecnologia", "Médica", "Distribuidora", "Transportes", "Energia",
+    "Agropecuária", "Engenharia", "Consultoria", "Farmácia", "Gráfica", "Metalúrgica", "Têxtil",
+]
+SUFIXOS_NOME = ["Ltda", "S.A.", "ME", "EIRELI", "EPP"]
+
+def gerar_nome(i: int) -> str:
+    palavras = random.sample(PALAVRAS_NOME, 2)
+    return f"{palavras[0]} {palavras[1]} {i} {random.choice(SUFIXOS_NOME)}"
+
+def gerar_cadastro(i: int, prefixo: str, filial: int) -> Dict:
+    nome = gerar_nome(i)
+    cnpj = f"{i // 1000:02d}.{i % 1000:03d}.{filial:03d}/0001-{i % 100:02d}"
+    email = f"{prefixo}{i}@exemplo.com"
+    return {"nome": nome, "cnpj": cnpj, "email": email, "termo_busca": montar_termo(nome, cnpj, email)}
+
+def criar_parser(descricao: str) -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=descricao)
+    parser.add_argument("--url", default=URL_PADRAO, help="URL do banco de benchmark")
+    parser.add_argument("--repeticoes", type=int, default=20)
+    parser.add_argument("--saida", help="Arquivo JSON de saída (padrão: stdout)")
+    parser.add_argument("--semente", type=int, default=42)
+    return parser
+
+def criar_engine_benchmark(url: str) -> Engine:
+    engine = create_engine(url)
+    SQLModel.metadata.create_all(engine)
+    # create_all não cria índices novos em tabelas que já existem
+    for tabela in SQLModel.metadata.sorted_tables:
+        for indice in tabela.indexes:
+            indice.create(engine, checkfirst=True)
+    return engine
+
+def contar(engine: Engine, modelo: Any) -> int:
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(modelo.__table__)).scalar_one()
+
+def _inserir_em_lotes(engine: Engine, tabela: Any, gerar: Callable[[int], Dict], inicio: int, fim: int) -> None:
+    for lote in range(inicio, fim, LOTE_INSERCAO):
+        linhas = [gerar(i) for i in range(lote, min(lote + LOTE_INSERCAO, fim))]
+        with engine.begin() as conn:
+            conn.execute(insert(tabela), linhas)
+
+def semear_clientes(engine: Engine, total: int) -> None:
+    existentes = contar(engine, Cliente)
+    agora = datetime.utcnow()
+    _inserir_em_lotes(engine, Cliente.__table__, lambda i: {
+        "created_at": agora,
+        "updated_at": agora,
+        "active": True,
+        **gerar_cadastro(i, "cliente", 1),
+        "regime_tributario": random.choice(["SIMPLES", "LUCRO_PRESUMIDO", "LUCRO_REAL"]),
+        "percentual_retencao": random.choice([0.0, 1.5, 4.65, 11.0]),
+    }, existentes, total)
+
+def semear_fornecedores(engine: Engine, total: int) -> None:
+    existentes = contar(engine, Fornecedor)
+    agora = datetime.utcnow()
+    _inserir_em_lotes(engine, Fornecedor.__table__, lambda i: {
+        "created_at": agora,
+        "updated_at": agora,
+        "active": True,
+        **gerar_cadastro(i, "fornecedor", 2),
+        "categoria": random.choice(["SERVIÇOS", "MATERIAIS", "TI", "LOGÍSTICA"]),
+    }, existentes, total)
+
+def semear_pagamentos(engine: Engine, total: int, fornecedores: int = 1000, clientes: int = 100) -> None:
+    """Garante ``total`` pagamentos, semeando fornecedores e clientes se preciso."""
+    semear_fornecedores(engine, fornecedores)
+    semear_clientes(engine, clientes)
+    existentes = contar(engine, Pagamento)
+    agora = datetime.utcnow()
+    inicio = date.today() - timedelta(days=3 * 365)
+
+    def gerar(i: int) -> Dict:
+        valor = Decimal(random.randint(1_000, 5_000_000)) / 100
+        emissao = inicio + timedelta(days=random.randint(0, 4 * 365))
+        return {
+            "created_at": agora,
+            "updated_at": agora,
+            "active": True,
+            "fornecedor_id": random.randint(1, fornecedores),
+            "cliente_id": random.randint(1, clientes),
+            "numero_nota": f"NF-{i}",
+            "data_emissao": emissao,
+            "data_vencimento": emissao + timedelta(days=random.choice([15, 30, 45, 60])),
+            "valor_total": valor,
+            "valor_retencao": Decimal("0.00"),
+            "valor_liquido": valor,
+            "status": random.choice(STATUS),
+        }
+
+    _inserir_em_lotes(engine, Pagamento.__table__, gerar, existentes, total)
+
+def semear_usuario(engine: Engine, email: str, senha_hash: str) -> None:
+    with engine.begin() as conn:
+        existe = conn.execute(select(Usuario.__table__.c.id).where(Usuario.__table__.c.email == email)).first()
+        if not existe:
+            agora = datetime.utcnow()
+            conn.execute(insert(Usuario.__table__), {
+                "created_at": agora,
+                "updated_at": agora,
+                "active": True,
+                "email": email,
+                "nome": "Benchmark",
+                "senha_hash": senha_hash,
+                "is_active": True,
+                "is_superuser": True,
+                "two_factor_enabled": False,
+            })
+
+def percentil(amostras: list, p: float) -> float:
+    ordenadas = sorted(amostras)
+    indice = min(len(ordenadas) - 1, max(0, round(p / 100 * len(ordenadas)) - 1))
+    return ordenadas[indice]
+
+def resumir(amostras_ms: list) -> Dict[str, float]:
+    return {
+        "p50_ms": round(percentil(amostras_ms, 50), 3),
+        "p99_ms": round(percentil(amostras_ms, 99), 3),
+        "media_ms": round(statistics.fmean(amostras_ms), 3),
+        "amostras": len(amostras_ms),
+    }
+
+def medir(fn: Callable[[], Any], repeticoes: int, aquecimento: int = 1) -> Dict[str, float]:
+    """Executa ``fn`` repetidamente e devolve as latências em milissegundos."""
+    for _ in range(aquecimento):
+        fn()
+    amostras = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        fn()
+        amostras.append((time.perf_counter() - inicio) * 1000)
+    return resumir(amostras)
+
+def emitir(resultado: Dict[str, Any], saida: Optional[str] = None) -> None:
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False, default=str)
+    if saida:
+        with open(saida, "w", encoding="utf-8") as arquivo:
+            arquivo.write(texto)
+    else:
+        sys.stdout.write(texto + "\n")
\ No newline at end of file
@@ -0,0 +1,182 @@
+"""
+Teste de carga do limite de tentativas de login.
+
+Simula uma enxurrada de credenciais erradas contra ``--contas`` contas
+existentes (cada tentativa seria um bcrypt completo): ``--taxa`` tentativas
+por segundo, vindas de ``--ips`` endereços, no ritmo do atacante e não das
+respostas. Enquanto isso, ``--concorrencia`` clientes legítimos consultam
+pagamentos e um usuário legítimo faz login a cada ``--intervalo-login``
+segundos, disputando o pool de hash com o ataque. Roda primeiro sem o limite e depois com ele, pelo transporte
+ASGI, no mesmo event loop, como um worker do uvicorn. Para cada modo emite
+quantas tentativas chegaram ao hash, quantas foram recusadas com 429, quantas
+ainda esperavam resposta ao fim, a latência dos logins legítimos (os que
+não terminaram contam com a duração inteira) e a latência e a vazão das
+consultas legítimas.
+
+Uso (a partir de ``backend/``):
+
+    python -m benchmarks.limite_login --duracao 10 --taxa 50
+    python -m benchmarks.limite_login --ips 100  # ataque distribuído: só o limite por conta segura
+"""
+import asyncio
+import random
+import time
+from typing import Any, Dict, List, Set
+import httpx
+from app.core import limite, security
+from app.core.config import settings
+from app.main import app
+from .comum import criar_engine_benchmark, criar_parser, emitir, resumir, semear_pagamentos, semear_usuario
+from .suite import API, EMAIL, SENHA, configurar_app
+
+async def rodar(
+    contas: List[str],
+    ips: int,
+    taxa: float,
+    concorrencia: int,
+    duracao: float,
+    pagamentos: int,
+    intervalo_login: float,
+) -> Dict[str, Any]:
+    limite.limpar_limitadores()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        response = await client.post(f"{API}/auth/login", data={"username": EMAIL, "password": SENHA})
+        response.raise_for_status()
+        cabecalhos = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    hashes = 0
+    verificar = security.verify_and_update_password_async
+
+    async def contar_hash(*args: Any) -> Any:
+        nonlocal hashes
+        hashes += 1
+        return await verificar(*args)
+
+    security.verify_and_update_password_async = contar_hash
+    respostas: Dict[int, int] = {}
+    latencias: List[float] = []
+    logins: List[float] = []
+    status_logins: Dict[int, int] = {}
+    fim = time.perf_counter() + duracao
+
+    async def tentar(client: httpx.AsyncClient) -> None:
+        response = await client.post(
+            f"{API}/auth/login",
+            data={"username": random.choice(contas), "password": f"errada-{random.getrandbits(32)}"},
+        )
+        respostas[response.status_code] = respostas.get(response.status_code, 0) + 1
+
+    pendentes: Set["asyncio.Task"] = set()
+    logins_pendentes: Set["asyncio.Task"] = set()
+
+    async def atacante() -> None:
+        enviadas = 0
+        proxima = time.perf_counter()
+        while proxima < fim:
+            await asyncio.sleep(max(0.0, proxima - time.perf_counter()))
+            tarefa = asyncio.create_task(tentar(clientes[enviadas % ips]))
+            pendentes.add(tarefa)
+            tarefa.add_done_callback(pendentes.discard)
+            enviadas += 1
+            proxima += 1 / taxa
+
+    async def login_legitimo(client: httpx.AsyncClient) -> None:
+        inicio = time.perf_counter()
+        try:
+            response = await client.post(f"{API}/auth/login", data={"username": EMAIL, "password": SENHA})
+            status_logins[response.status_code] = status_logins.get(response.status_code, 0) + 1
+        finally:
+            logins.append((time.perf_counter() - inicio) * 1000)
+
+    async def usuario_legitimo(client: httpx.AsyncClient) -> None:
+        proximo = time.perf_counter()
+        while proximo < fim:
+            await asyncio.sleep(max(0.0, proximo - time.perf_counter()))
+            tarefa = asyncio.create_task(login_legitimo(client))
+            logins_pendentes.add(tarefa)
+            tarefa.add_done_callback(logins_pendentes.discard)
+            proximo += intervalo_login
+
+    async def legitimo(client: httpx.AsyncClient) -> None:
+        while time.perf_counter() < fim:
+            inicio = time.perf_counter()
+            await client.get(f"{API}/pagamentos/{random.randint(1, pagamentos)}", headers=cabecalhos)
+            latencias.append((time.perf_counter() - inicio) * 1000)
+
+    clientes = [
+        httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app, client=(f"10.0.{i // 256}.{i % 256}", 40000)),
+            base_url="http://bench",
+        )
+        for i in range(ips)
+    ]
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            inicio = time.perf_counter()
+            await asyncio.gather(
+                atacante(), usuario_legitimo(client), *(legitimo(client) for _ in range(concorrencia))
+            )
+            decorrido = time.perf_counter() - inicio
+            # As que ainda esperam o hash são canceladas para não invadir o próximo modo
+            sem_resposta = len(pendentes)
+            for tarefa in [*pendentes, *logins_pendentes]:
+                tarefa.cancel()
+            await asyncio.gather(*pendentes, *logins_pendentes, return_exceptions=True)
+    finally:
+        security.verify_and_update_password_async = verificar
+        for client in clientes:
+            await client.aclose()
+
+    return {
+        "tentativas": sum(respostas.values()) + sem_resposta,
+        "sem_resposta": sem_resposta,
+        "hashes": hashes,
+        "hashes_por_s": round(hashes / decorrido, 1),
+        "recusadas_429": respostas.get(429, 0),
+        "logins_legitimos": {**resumir(logins), "status": status_logins},
+        "consultas": {**resumir(latencias), "requisicoes_por_s": round(len(latencias) / decorrido, 1)},
+        "limites": {nome: stats["recusadas"] for nome, stats in limite.estatisticas().items()},
+    }
+
+def main() -> None:
+    parser = criar_parser(__doc__)
+    parser.add_argument("--contas", type=int, default=20)
+    parser.add_argument("--ips", type=int, default=1)
+    parser.add_argument("--taxa", type=float, default=50.0, help="tentativas por segundo")
+    parser.add_argument("--concorrencia", type=int, default=5)
+    parser.add_argument("--duracao", type=float, default=10.0, help="segundos por modo")
+    parser.add_argument("--pagamentos", type=int, default=10_000)
+    parser.add_argument("--intervalo-login", type=float, default=1.0, help="segundos entre logins legítimos")
+    args = parser.parse_args()
+    random.seed(args.semente)
+
+    engine = criar_engine_benchmark(args.url)
+    semear_pagamentos(engine, args.pagamentos)
+    senha_hash = security.get_password_hash(SENHA)
+    semear_usuario(engine, EMAIL, senha_hash)
+    contas = [f"vitima{i}@exemplo.com" for i in range(args.contas)]
+    for conta in contas:
+        semear_usuario(engine, conta, senha_hash)
+    engine.dispose()
+
+    configurar_app(args.url, args.concorrencia + 20)
+    resultados = {}
+    for modo, ativo in (("sem_limite", False), ("com_limite", True)):
+        settings.LOGIN_LIMITE_ATIVO = ativo
+        resultados[modo] = asyncio.run(rodar(
+            contas, args.ips, args.taxa, args.concorrencia, args.duracao, args.pagamentos, args.intervalo_login
+        ))
+
+    emitir({
+        "benchmark": "limite_login",
+        "contas": args.contas,
+        "ips": args.ips,
+        "tentativas_por_s": args.taxa,
+        "hash_workers": settings.PASSWORD_HASH_WORKERS,
+        "limite_ip": [settings.LOGIN_LIMITE_IP, settings.LOGIN_LIMITE_IP_POR_MINUTO],
+        "limite_conta": [settings.LOGIN_LIMITE_CONTA, settings.LOGIN_LIMITE_CONTA_POR_MINUTO],
+        "resultados": resultados,
+    }, args.saida)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
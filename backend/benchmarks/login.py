@@ -0,0 +1,112 @@
+"""
+Vazão de logins num worker e latência das demais requisições durante um pico
+de logins, comparando a verificação de senha no event loop (comportamento
+anterior) com a verificação no pool de ``core.security``.
+
+Monta um app mínimo com ``/{modo}/login``, que só verifica a senha, e
+``/ping``, que representa o restante do tráfego. Os clientes de login e de
+ping rodam juntos no mesmo event loop, como num worker do uvicorn. O esquema e
+o custo seguem as configurações (``PASSWORD_SCHEMES``, ``BCRYPT_ROUNDS``...).
+
+Uso (a partir de ``backend/``):
+
+    python -m benchmarks.login --concorrencia 50
+    PASSWORD_HASH_WORKERS=8 python -m benchmarks.login
+"""
+import asyncio
+import time
+import httpx
+from fastapi import FastAPI, HTTPException
+from app.core import security
+from app.core.config import settings
+from .comum import criar_parser, emitir, resumir
+
+SENHA = "senha-do-benchmark"
+INTERVALO_PING_S = 0.01
+
+def criar_app(senha_hash: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/inline/login")
+    async def login_inline():
+        if not security.verify_password(SENHA, senha_hash):
+            raise HTTPException(status_code=400)
+        return {"ok": True}
+
+    @app.post("/pool/login")
+    async def login_pool():
+        senha_ok, _ = await security.verify_and_update_password_async(SENHA, senha_hash)
+        if not senha_ok:
+            raise HTTPException(status_code=400)
+        return {"ok": True}
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    return app
+
+async def rodar(app: FastAPI, modo: str, concorrencia: int, pings: int, duracao: float) -> dict:
+    logins, latencias_ping = [], []
+    fim = time.perf_counter() + duracao
+    transporte = httpx.ASGITransport(app=app)
+
+    async def cliente_login(client: httpx.AsyncClient) -> None:
+        while time.perf_counter() < fim:
+            inicio = time.perf_counter()
+            response = await client.post(f"/{modo}/login")
+            response.raise_for_status()
+            logins.append((time.perf_counter() - inicio) * 1000)
+
+    async def cliente_ping(client: httpx.AsyncClient) -> None:
+        # Latência contada a partir do horário previsto de cada ping, para
+        # incluir o tempo em que o event loop ficou travado antes do envio
+        previsto = time.perf_counter()
+        while previsto < fim:
+            await asyncio.sleep(max(0.0, previsto - time.perf_counter()))
+            response = await client.get("/ping")
+            response.raise_for_status()
+            latencias_ping.append((time.perf_counter() - previsto) * 1000)
+            previsto += INTERVALO_PING_S
+
+    async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as client:
+        inicio = time.perf_counter()
+        await asyncio.gather(
+            *(cliente_ping(client) for _ in range(pings)),
+            *(cliente_login(client) for _ in range(concorrencia)),
+        )
+        decorrido = time.perf_counter() - inicio
+
+    return {
+        "modo": modo,
+        "logins": len(logins),
+        "logins_por_s": round(len(logins) / decorrido, 1),
+        "login": resumir(logins) if logins else None,
+        "pings": len(latencias_ping),
+        "ping": resumir(latencias_ping) if latencias_ping else None,
+    }
+
+def main() -> None:
+    parser = criar_parser(__doc__)
+    parser.add_argument("--concorrencia", type=int, default=50, help="clientes fazendo login")
+    parser.add_argument("--pings", type=int, default=5, help="clientes do restante do tráfego")
+    parser.add_argument("--duracao", type=float, default=10.0, help="segundos por modo")
+    args = parser.parse_args()
+
+    senha_hash = security.get_password_hash(SENHA)
+    app = criar_app(senha_hash)
+    resultados = [
+        asyncio.run(rodar(app, modo, args.concorrencia, args.pings, args.duracao))
+        for modo in ("inline", "pool")
+    ]
+    emitir({
+        "benchmark": "login",
+        "esquema": security.pwd_context.identify(senha_hash),
+        "bcrypt_rounds": settings.BCRYPT_ROUNDS,
+        "workers_hash": settings.PASSWORD_HASH_WORKERS,
+        "concorrencia": args.concorrencia,
+        "resultados": resultados,
+    }, args.saida)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
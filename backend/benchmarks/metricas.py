@@ -0,0 +1,72 @@
+"""
+Custo do ``MetricasMiddleware`` por requisição.
+
+Chama diretamente, sem servidor nem rede, um app ASGI mínimo que só responde
+(e marca a rota no scope, como o roteador do FastAPI), com e sem o middleware,
+e devolve o tempo médio por requisição de cada um e a diferença em
+microssegundos: o custo que o middleware soma a qualquer requisição. As
+consultas ao banco somam ainda o ``registrar_sql`` do hook de SQL, medido à
+parte.
+
+Uso (a partir de ``backend/``):
+
+    python -m benchmarks.metricas --requisicoes 200000
+"""
+import asyncio
+import time
+from app.core.metricas import ContextoSql, MetricasMiddleware, contexto_sql, registrar_sql
+from .comum import criar_parser, emitir
+
+class Rota:
+    path = "/itens/{item_id}"
+
+ROTA = Rota()
+INICIO = {"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]}
+CORPO = {"type": "http.response.body", "body": b'{"id":1}'}
+
+async def app_minimo(scope, receive, send):
+    scope["route"] = ROTA
+    await send(INICIO)
+    await send(CORPO)
+
+async def chamar(app, requisicoes: int) -> float:
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(mensagem):
+        pass
+
+    scope = {"type": "http", "method": "GET", "path": "/itens/1"}
+    inicio = time.perf_counter()
+    for _ in range(requisicoes):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - inicio) / requisicoes * 1_000_000
+
+def main() -> None:
+    parser = criar_parser(__doc__)
+    parser.add_argument("--requisicoes", type=int, default=200_000)
+    args = parser.parse_args()
+
+    resultados = {}
+    for nome, app in (("sem_metricas", app_minimo), ("com_metricas", MetricasMiddleware(app_minimo))):
+        asyncio.run(chamar(app, 1000))  # aquecimento
+        resultados[nome] = round(min(
+            asyncio.run(chamar(app, args.requisicoes)) for _ in range(5)
+        ), 2)
+
+    contexto_sql.set(ContextoSql())
+    inicio = time.perf_counter()
+    for _ in range(args.requisicoes):
+        registrar_sql(0.001)
+    hook_us = (time.perf_counter() - inicio) / args.requisicoes * 1_000_000
+
+    emitir({
+        "benchmark": "metricas",
+        "requisicoes": args.requisicoes,
+        "us_por_requisicao": resultados,
+        "custo_middleware_us": round(resultados["com_metricas"] - resultados["sem_metricas"], 2),
+        "custo_hook_sql_us": round(hook_us, 3),
+    }, args.saida)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,65 @@
+"""
+Micro-benchmark do cálculo de retenção: a função original (``float`` e volta
+para ``Decimal``, só com ``percentual_retencao``) contra as regras compiladas
+de ``services.retencao``, uma a uma e em lote. Não usa banco.
+
+Também conta em quantos valores o resultado original, arredondado para
+centavos, difere do cálculo exato.
+
+Uso (a partir de ``backend/``):
+
+    python -m benchmarks.retencao --pagamentos 10000
+"""
+import random
+from decimal import Decimal, ROUND_HALF_UP
+from app.services.retencao import CENTAVO, calcular_lote, regras_para
+from .comum import criar_parser, emitir, medir
+
+PERCENTUAIS = [1.5, 4.65, 11.0]
+REGIMES = ["SIMPLES", "LUCRO_PRESUMIDO", "LUCRO_REAL"]
+
+def calcular_retencao_original(valor_total: Decimal, percentual_retencao: float) -> Decimal:
+    return Decimal(str(float(valor_total) * (percentual_retencao / 100)))
+
+def main() -> None:
+    parser = criar_parser(__doc__)
+    parser.add_argument("--pagamentos", type=int, default=10_000)
+    args = parser.parse_args()
+    random.seed(args.semente)
+
+    valores = [Decimal(random.randint(1, 5_000_000)) / 100 for _ in range(args.pagamentos)]
+    percentuais = [random.choice(PERCENTUAIS) for _ in valores]
+    regimes = [random.choice(REGIMES) for _ in valores]
+
+    def original():
+        for valor, percentual in zip(valores, percentuais):
+            calcular_retencao_original(valor, percentual)
+
+    def percentual_um_a_um():
+        for valor, percentual in zip(valores, percentuais):
+            regras_para(None, percentual).total(valor)
+
+    def percentual_lote():
+        calcular_lote([(v, regras_para(None, p)) for v, p in zip(valores, percentuais)])
+
+    def regimes_lote():
+        calcular_lote([(v, regras_para(r, None)) for v, r in zip(valores, regimes)])
+
+    divergentes = sum(
+        calcular_retencao_original(v, p).quantize(CENTAVO, ROUND_HALF_UP)
+        != regras_para(None, p).total(v)
+        for v, p in zip(valores, percentuais)
+    )
+
+    emitir({
+        "benchmark": "retencao",
+        "pagamentos": args.pagamentos,
+        "divergencias_float": divergentes,
+        "original": medir(original, args.repeticoes),
+        "percentual_um_a_um": medir(percentual_um_a_um, args.repeticoes),
+        "percentual_lote": medir(percentual_lote, args.repeticoes),
+        "regimes_lote": medir(regimes_lote, args.repeticoes),
+    }, args.saida)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file